@@ -5,11 +5,12 @@ import os
 import sys
 import time
 import traceback
+from urllib.parse import urlparse
 
 from archinstall.lib.args import arch_config_handler
 from archinstall.lib.disk.utils import disk_layouts
 from archinstall.lib.network.wifi_handler import wifi_handler
-from archinstall.lib.networking import ping
+from archinstall.lib.networking import probe_connectivity
 from archinstall.lib.packages.packages import check_package_upgrade
 from archinstall.tui.ui.components import tui as ttui
 
@@ -39,15 +40,34 @@ def _log_sys_info() -> None:
 	debug(f'Disk states before installing:\n{disk_layouts()}')
 
 
+def _configured_mirror_hosts() -> list[str]:
+	mirror_config = arch_config_handler.config.mirror_config
+
+	if not mirror_config:
+		return []
+
+	urls = [server.url for server in mirror_config.custom_servers]
+	urls += [url for region in mirror_config.mirror_regions for url in region.urls]
+
+	return [hostname for url in urls if (hostname := urlparse(url).hostname)]
+
+
 def _check_online() -> None:
-	try:
-		ping('1.1.1.1')
-	except OSError as ex:
-		if 'Network is unreachable' in str(ex):
-			if not arch_config_handler.args.skip_wifi_check:
-				success = not wifi_handler.setup()
-				if not success:
-					exit(0)
+	status = probe_connectivity(_configured_mirror_hosts())
+
+	if not status.route:
+		if not arch_config_handler.args.skip_wifi_check:
+			success = not wifi_handler.setup()
+			if not success:
+				exit(0)
+	elif problem := status.problem():
+		warn(f'Connectivity check: {problem}')
+
+		if status.unresolved:
+			debug(f'Unable to resolve: {", ".join(status.unresolved)}')
+
+	if status.timed_out:
+		debug(f'Connectivity probes without a result: {", ".join(status.timed_out)}')
 
 
 def _fetch_arch_db() -> None:
@@ -1,22 +1,22 @@
 import argparse
 import json
 import os
-import urllib.error
 import urllib.parse
 from argparse import ArgumentParser, Namespace
 from dataclasses import dataclass, field
 from importlib.metadata import version
 from pathlib import Path
 from typing import Any
-from urllib.request import Request, urlopen
 
 from pydantic.dataclasses import dataclass as p_dataclass
 
 from archinstall.lib.crypt import decrypt
+from archinstall.lib.exceptions import HttpError
+from archinstall.lib.http_client import http_client
 from archinstall.lib.models.application import ApplicationConfiguration
 from archinstall.lib.models.authentication import AuthenticationConfiguration
 from archinstall.lib.models.bootloader import Bootloader, BootloaderConfiguration
-from archinstall.lib.models.device import DiskEncryption, DiskLayoutConfiguration
+from archinstall.lib.models.device import DiskEncryption, DiskLayoutConfiguration, WipeMethod
 from archinstall.lib.models.locale import LocaleConfiguration
 from archinstall.lib.models.mirrors import MirrorConfiguration
 from archinstall.lib.models.network import NetworkConfiguration
@@ -44,6 +44,10 @@ class Arguments:
 	skip_ntp: bool = False
 	skip_wkd: bool = False
 	skip_boot: bool = False
+	full_wipe: WipeMethod | None = None
+	dedup_copies: bool = False
+	iso_archive: Path | None = None
+	iso_archive_export: Path | None = None
 	debug: bool = False
 	offline: bool = False
 	no_pkg_lookups: bool = False
@@ -439,6 +443,30 @@ class ArchConfigHandler:
 			help='Disables installation of a boot loader (note: only use this when problems arise with the boot loader step).',
 			default=False,
 		)
+		parser.add_argument(
+			'--full-wipe',
+			choices=[method.value for method in WipeMethod],
+			default=None,
+			help='Wipe the entire content of devices that are wiped for partitioning, not only their metadata',
+		)
+		parser.add_argument(
+			'--dedup-copies',
+			action='store_true',
+			default=False,
+			help='Reflink or hardlink identical files copied to the target by install from ISO and Entropy',
+		)
+		parser.add_argument(
+			'--iso-archive',
+			type=Path,
+			default=None,
+			help='Apply install from ISO from a zstd compressed tar exported by --iso-archive-export instead of the live system',
+		)
+		parser.add_argument(
+			'--iso-archive-export',
+			type=Path,
+			default=None,
+			help='Also write everything install from ISO copies to a zstd compressed tar, to be applied with --iso-archive',
+		)
 		parser.add_argument(
 			'--debug',
 			action='store_true',
@@ -586,10 +614,8 @@ class ArchConfigHandler:
 	def _fetch_from_url(self, url: str) -> str:
 		if urllib.parse.urlparse(url).scheme:
 			try:
-				req = Request(url, headers={'User-Agent': 'ArchInstall'})
-				with urlopen(req) as resp:
-					return resp.read().decode('utf-8')
-			except urllib.error.HTTPError as err:
+				return http_client.get(url).text()
+			except HttpError as err:
 				error(f'Could not fetch JSON from {url}: {err}')
 		else:
 			error('Not a valid url')
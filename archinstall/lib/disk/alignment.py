@@ -0,0 +1,114 @@
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..models.device import DeviceModification, ModificationStatus, PartitionModification, Size, Unit
+from ..output import debug, warn
+from .tuning import queue_limits
+
+_MiB = 1024 * 1024
+
+# partitions are aligned to at least 1 MiB, which covers the erase block
+# and stripe sizes of most devices that don't report their topology
+_DEFAULT_GRAIN = _MiB
+
+# some USB bridges report bogus optimal I/O sizes (e.g. 0xFFFF sectors),
+# alignments above this are ignored rather than wasting space on them
+_MAX_GRAIN = 64 * _MiB
+
+
+@dataclass(frozen=True)
+class PartitionAlignment:
+	"""
+	Partition boundaries are aligned when they are at offset + n * grain bytes
+	"""
+
+	grain: int = _DEFAULT_GRAIN
+	offset: int = 0
+
+	def is_aligned(self, value: Size) -> bool:
+		return (value.convert(Unit.B).value - self.offset) % self.grain == 0
+
+	def align_up(self, value: Size) -> Size:
+		norm = value.convert(Unit.B).value
+		aligned = math.ceil((norm - self.offset) / self.grain) * self.grain + self.offset
+		return Size(aligned, Unit.B, value.sector_size)
+
+	def align_down(self, value: Size) -> Size:
+		norm = value.convert(Unit.B).value
+		aligned = (norm - self.offset) // self.grain * self.grain + self.offset
+		return Size(aligned, Unit.B, value.sector_size)
+
+
+def partition_alignment(dev_path: Path) -> PartitionAlignment:
+	"""
+	The alignment of partitions on a disk, combining the 1 MiB default
+	with the physical block size, the optimal I/O size (erase block or
+	stripe width) and the alignment offset the device reports.
+	"""
+	if (limits := queue_limits(dev_path)) is None:
+		return PartitionAlignment()
+
+	grain = _DEFAULT_GRAIN
+
+	for size in (limits.physical_block_size, limits.minimum_io_size, limits.optimal_io_size):
+		if size > 0:
+			grain = math.lcm(grain, size)
+
+	if grain > _MAX_GRAIN:
+		debug(f'Ignoring the I/O topology of {dev_path}, alignment of {grain} bytes is implausible')
+		return PartitionAlignment()
+
+	# a negative offset means the device can't be aligned at all
+	offset = max(limits.alignment_offset, 0) % grain
+
+	alignment = PartitionAlignment(grain, offset)
+	debug(f'Partition alignment of {dev_path}: {alignment}')
+
+	return alignment
+
+
+def _straddle_warning(part_mod: PartitionModification, alignment: PartitionAlignment) -> str:
+	return (
+		f'Partition {part_mod.start.format_highest()} - {part_mod.end.format_highest()} is not aligned '
+		f'to the {Size(alignment.grain, Unit.B, part_mod.start.sector_size).format_highest()} '
+		'erase block or stripe size of the device, this will reduce the I/O throughput'
+	)
+
+
+def align_partitions(
+	modification: DeviceModification,
+	alignment: PartitionAlignment | None = None,
+	warn_misaligned: bool = False,
+) -> None:
+	"""
+	Move the start of the partitions to be created up, and their end down,
+	to the next aligned boundary so they stay within the requested space.
+	Existing partitions are never moved, only reported if misaligned.
+	"""
+	alignment = alignment or partition_alignment(modification.device_path)
+
+	for part_mod in modification.partitions:
+		if part_mod.is_delete():
+			continue
+
+		if alignment.is_aligned(part_mod.start) and alignment.is_aligned(part_mod.end):
+			continue
+
+		if part_mod.status != ModificationStatus.Create:
+			if warn_misaligned:
+				warn(_straddle_warning(part_mod, alignment))
+			continue
+
+		start = alignment.align_up(part_mod.start)
+		end = alignment.align_down(part_mod.end)
+
+		if end <= start:
+			warn(_straddle_warning(part_mod, alignment))
+			continue
+
+		if warn_misaligned:
+			warn(_straddle_warning(part_mod, alignment) + f', adjusting it to {start.format_highest()} - {end.format_highest()}')
+
+		part_mod.start = start
+		part_mod.length = end - start
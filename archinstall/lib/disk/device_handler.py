@@ -3,12 +3,14 @@ from __future__ import annotations
 import json
 import logging
 import os
+import re
+import struct
 import time
 from collections.abc import Iterable
 from pathlib import Path
 from typing import Literal, overload
 
-from parted import Device, Disk, DiskException, FileSystem, Geometry, IOException, Partition, PartitionException, freshDisk, getAllDevices, getDevice, newDisk
+from parted import Device, Disk, DiskException, FileSystem, Geometry, IOException, Partition, PartitionException, freshDisk, getDevice, newDisk
 
 from ..exceptions import DiskError, SysCallError, UnknownFilesystemFormat
 from ..general import SysCommand, SysCommandWorker
@@ -35,6 +37,7 @@ from ..models.device import (
 	Size,
 	SubvolumeModification,
 	Unit,
+	WipeMethod,
 	_BtrfsSubvolumeInfo,
 	_DeviceInfo,
 	_PartitionInfo,
@@ -42,116 +45,149 @@ from ..models.device import (
 from ..models.users import Password
 from ..output import debug, error, info, log
 from ..utils.util import is_subpath
+from .alignment import align_partitions
+from .tuning import tuned_mkfs_options, tuned_mount_options
+from .udev import UdevMonitor, udev_settle
 from .utils import (
-	find_lsblk_info,
-	get_all_lsblk_info,
+	LsblkSnapshot,
 	get_lsblk_info,
 	umount,
 )
+from .wipe import wipe_device, wipe_signatures
+
+# the superblock magic and generation of a btrfs filesystem
+_BTRFS_SUPER_OFFSET = 0x10000 + 64
+_BTRFS_SUPER = struct.Struct('<8sQ')
+_BTRFS_MAGIC = b'_BHRfS_M'
+_BTRFS_FS_TREE_OBJECTID = 5
+_BTRFS_FIRST_FREE_OBJECTID = 256
+# dump-tree prints the objectid of the top level subvolume as FS_TREE
+# how long LVM reports are retried until the queried entry shows up
+_LVM_INFO_TIMEOUT = 60.0
+
+_BTRFS_ROOT_REF_KEY = re.compile(r'key \((\d+|FS_TREE) ROOT_REF (\d+)\)')
+_BTRFS_ROOT_REF = re.compile(r'root ref key dirid (\d+) sequence \d+ name (.*)$')
 
 
 class DeviceHandler:
 	_TMP_BTRFS_MOUNT = Path('/mnt/arch_btrfs')
 
 	def __init__(self) -> None:
-		self._devices: dict[Path, BDevice] = {}
+		# devices are discovered and probed lazily on first access,
+		# probed devices are cached until they're refreshed
+		self._snapshot: LsblkSnapshot | None = None
+		self._devices: dict[Path, BDevice | None] = {}
+		self._btrfs_subvolumes: dict[tuple[str, int], list[Path]] = {}
 		self._partition_table = PartitionTable.default()
-		self.load_devices()
 
 	@property
 	def devices(self) -> list[BDevice]:
-		return list(self._devices.values())
+		return [device for path in self._discover_devices() if (device := self.get_device(path))]
 
 	@property
 	def partition_table(self) -> PartitionTable:
 		return self._partition_table
 
-	def load_devices(self) -> None:
-		block_devices = {}
+	def lsblk_snapshot(self) -> LsblkSnapshot:
+		"""
+		The lsblk state of all block devices the cached devices were probed
+		from, it's taken again once devices have been refreshed.
+		"""
+		if self._snapshot is None:
+			self.udev_sync()
+			self._snapshot = LsblkSnapshot.fetch()
 
-		self.udev_sync()
-		all_lsblk_info = get_all_lsblk_info()
-		devices = getAllDevices()
-		devices.extend(self.get_loop_devices())
+		return self._snapshot
 
-		archiso_mountpoint = Path('/run/archiso/airootfs')
+	def load_devices(self) -> None:
+		"""
+		Discard all cached device information, the devices
+		are discovered and probed again on their next access.
+		"""
+		self._snapshot = None
+		self._devices = {}
 
-		for device in devices:
-			dev_lsblk_info = find_lsblk_info(device.path, all_lsblk_info)
+	def refresh(self, path: Path) -> None:
+		"""
+		Discard the cached information of the device at the given path,
+		or of the device a given partition (or mapper device) belongs to,
+		so only that device is probed again on its next access.
+		"""
+		if root := self.lsblk_snapshot().root(path):
+			debug(f'Refreshing device information: {root.path}')
+			self._devices.pop(root.path, None)
 
-			if not dev_lsblk_info:
-				debug(f'Device lsblk info not found: {device.path}')
-				continue
+		# new devices (e.g. loop devices) will show up in the next snapshot
+		self._snapshot = None
+
+	def _discover_devices(self) -> dict[Path, LsblkInfo]:
+		"""
+		The top level block devices of the lsblk snapshot, the devices
+		themselves are only probed once they're accessed.
+		"""
+		archiso_mountpoint = Path('/run/archiso/airootfs')
+		device_infos: dict[Path, LsblkInfo] = {}
 
-			if dev_lsblk_info.type == 'rom':
+		for lsblk_info in self.lsblk_snapshot().blockdevices:
+			if lsblk_info.type == 'rom':
 				continue
 
 			# exclude archiso loop device
-			if dev_lsblk_info.mountpoint == archiso_mountpoint:
+			if lsblk_info.mountpoint == archiso_mountpoint:
 				continue
 
-			try:
-				if dev_lsblk_info.pttype:
-					disk = newDisk(device)
-				else:
-					disk = freshDisk(device, self.partition_table.value)
-			except DiskException as err:
-				debug(f'Unable to get disk from {device.path}: {err}')
-				continue
+			device_infos[lsblk_info.path] = lsblk_info
 
-			device_info = _DeviceInfo.from_disk(disk)
-			partition_infos = []
+		return device_infos
 
-			for partition in disk.partitions:
-				lsblk_info = find_lsblk_info(partition.path, dev_lsblk_info.children)
+	def _probe_device(self, path: Path) -> BDevice | None:
+		snapshot = self.lsblk_snapshot()
 
-				if not lsblk_info:
-					debug(f'Partition lsblk info not found: {partition.path}')
-					continue
+		if (dev_lsblk_info := snapshot.by_path(path)) is None:
+			debug(f'Device lsblk info not found: {path}')
+			return None
 
-				fs_type = self._determine_fs_type(partition, lsblk_info)
-				subvol_infos = []
+		try:
+			device = getDevice(str(path))
+		except IOException as err:
+			debug(f'Unable to get device {path}: {err}')
+			return None
 
-				if fs_type == FilesystemType.Btrfs:
-					subvol_infos = self.get_btrfs_info(partition.path, lsblk_info)
+		try:
+			if dev_lsblk_info.pttype:
+				disk = newDisk(device)
+			else:
+				disk = freshDisk(device, self.partition_table.value)
+		except DiskException as err:
+			debug(f'Unable to get disk from {path}: {err}')
+			return None
 
-				partition_infos.append(
-					_PartitionInfo.from_partition(
-						partition,
-						lsblk_info,
-						fs_type,
-						subvol_infos,
-					),
-				)
+		device_info = _DeviceInfo.from_disk(disk)
+		partition_infos = []
 
-			block_device = BDevice(disk, device_info, partition_infos)
-			block_devices[block_device.device_info.path] = block_device
+		for partition in disk.partitions:
+			lsblk_info = snapshot.by_path(partition.path)
 
-		self._devices = block_devices
+			if not lsblk_info:
+				debug(f'Partition lsblk info not found: {partition.path}')
+				continue
 
-	@staticmethod
-	def get_loop_devices() -> list[Device]:
-		devices = []
+			fs_type = self._determine_fs_type(partition, lsblk_info)
+			subvol_infos = []
 
-		try:
-			loop_devices = SysCommand(['losetup', '-a'])
-		except SysCallError as err:
-			debug(f'Failed to get loop devices: {err}')
-		else:
-			for ld_info in str(loop_devices).splitlines():
-				try:
-					loop_device_path, _ = ld_info.split(':', maxsplit=1)
-				except ValueError:
-					continue
+			if fs_type == FilesystemType.Btrfs:
+				subvol_infos = self.get_btrfs_info(partition.path, lsblk_info)
 
-				try:
-					loop_device = getDevice(loop_device_path)
-				except IOException as err:
-					debug(f'Failed to get loop device: {err}')
-				else:
-					devices.append(loop_device)
+			partition_infos.append(
+				_PartitionInfo.from_partition(
+					partition,
+					lsblk_info,
+					fs_type,
+					subvol_infos,
+				),
+			)
 
-		return devices
+		return BDevice(disk, device_info, partition_infos)
 
 	def _determine_fs_type(
 		self,
@@ -172,7 +208,13 @@ class DeviceHandler:
 		return None
 
 	def get_device(self, path: Path) -> BDevice | None:
-		return self._devices.get(path, None)
+		if path not in self._devices:
+			if path not in self._discover_devices():
+				return None
+
+			self._devices[path] = self._probe_device(path)
+
+		return self._devices[path]
 
 	def get_device_by_partition_path(self, partition_path: Path) -> BDevice | None:
 		partition = self.find_partition(partition_path)
@@ -182,13 +224,18 @@ class DeviceHandler:
 		return None
 
 	def find_partition(self, path: Path) -> _PartitionInfo | None:
-		for device in self._devices.values():
+		for device in self.devices:
 			part = next(filter(lambda x: str(x.path) == str(path), device.partition_infos), None)
 			if part is not None:
 				return part
 		return None
 
 	def get_parent_device_path(self, dev_path: Path) -> Path:
+		# the parent of a device doesn't change while it exists, only
+		# devices created after the snapshot was taken are looked up again
+		if parent := self.lsblk_snapshot().parent(dev_path):
+			return parent.path
+
 		lsblk = get_lsblk_info(dev_path)
 		return Path(f'/dev/{lsblk.pkname}')
 
@@ -217,11 +264,8 @@ class DeviceHandler:
 		if not lsblk_info:
 			lsblk_info = get_lsblk_info(dev_path)
 
-		subvol_infos: list[_BtrfsSubvolumeInfo] = []
-
 		if not lsblk_info.mountpoint:
-			self.mount(dev_path, self._TMP_BTRFS_MOUNT, create_target_mountpoint=True)
-			mountpoint = self._TMP_BTRFS_MOUNT
+			names = self._unmounted_btrfs_subvolumes(dev_path, lsblk_info)
 		else:
 			# when multiple subvolumes are mounted then the lsblk output may look like
 			# "mountpoint": "/mnt/archinstall/var/log"
@@ -230,15 +274,9 @@ class DeviceHandler:
 			try:
 				common_path = os.path.commonpath(lsblk_info.mountpoints)
 			except ValueError:
-				return subvol_infos
+				return []
 
-			mountpoint = Path(common_path)
-
-		try:
-			result = SysCommand(f'btrfs subvolume list {mountpoint}').decode()
-		except SysCallError as err:
-			debug(f'Failed to read btrfs subvolume information: {err}')
-			return subvol_infos
+			names = self._list_btrfs_subvolumes(Path(common_path))
 
 		# It is assumed that lsblk will contain the fields as
 		# "mountpoints": ["/mnt/archinstall/log", "/mnt/archinstall/home", "/mnt/archinstall", ...]
@@ -247,18 +285,116 @@ class DeviceHandler:
 		# to the corresponding mountpoints
 		btrfs_subvol_info = dict(zip(lsblk_info.fsroots, lsblk_info.mountpoints))
 
-		# ID 256 gen 16 top level 5 path @
+		return [_BtrfsSubvolumeInfo(name, btrfs_subvol_info.get('/' / name, None)) for name in names]
+
+	def _list_btrfs_subvolumes(self, mountpoint: Path) -> list[Path]:
+		try:
+			result = SysCommand(f'btrfs subvolume list {mountpoint}').decode()
+		except SysCallError as err:
+			debug(f'Failed to read btrfs subvolume information: {err}')
+			return []
+
+		# expected output format:
+		# ID 257 gen 8 top level 5 path @home
+		return [Path(line.split(' ')[-1]) for line in result.splitlines()]
+
+	def _unmounted_btrfs_subvolumes(self, dev_path: Path, lsblk_info: LsblkInfo) -> list[Path]:
+		"""
+		The subvolumes of an unmounted btrfs filesystem are read from its
+		metadata and cached per filesystem UUID and generation, so unchanged
+		filesystems are neither mounted nor read again on a rescan.
+		"""
+		generation = self._btrfs_generation(dev_path)
+		cache_key = (lsblk_info.uuid, generation) if lsblk_info.uuid and generation is not None else None
+
+		if cache_key and (names := self._btrfs_subvolumes.get(cache_key)) is not None:
+			return names
+
+		names = self._read_btrfs_subvolumes(dev_path)
+
+		if names is None:
+			# a read-only mount doesn't commit a new generation
+			self.mount(dev_path, self._TMP_BTRFS_MOUNT, create_target_mountpoint=True, options=['ro'])
+
+			try:
+				names = self._list_btrfs_subvolumes(self._TMP_BTRFS_MOUNT)
+			finally:
+				umount(dev_path)
+
+		if cache_key:
+			self._btrfs_subvolumes[cache_key] = names
+
+		return names
+
+	@staticmethod
+	def _btrfs_generation(dev_path: Path) -> int | None:
+		try:
+			with open(dev_path, 'rb') as dev:
+				dev.seek(_BTRFS_SUPER_OFFSET)
+				superblock = dev.read(_BTRFS_SUPER.size)
+		except OSError as err:
+			debug(f'Unable to read btrfs superblock of {dev_path}: {err}')
+			return None
+
+		if len(superblock) < _BTRFS_SUPER.size:
+			return None
+
+		magic, generation = _BTRFS_SUPER.unpack(superblock)
+
+		return generation if magic == _BTRFS_MAGIC else None
+
+	@staticmethod
+	def _read_btrfs_subvolumes(dev_path: Path) -> list[Path] | None:
+		"""
+		Reads the subvolume paths from the root tree of an unmounted btrfs
+		filesystem. Returns None if they can't be determined this way, e.g.
+		for subvolumes nested in a directory of another subvolume.
+		"""
+		try:
+			result = SysCommand(f'btrfs inspect-internal dump-tree -t root {dev_path}').decode()
+		except SysCallError as err:
+			debug(f'Failed to dump btrfs root tree of {dev_path}: {err}')
+			return None
+
+		# item 3 key (FS_TREE ROOT_REF 256) itemoff 15844 itemsize 20
+		# 	root ref key dirid 256 sequence 2 name @
+		refs: dict[int, tuple[int, int, str]] = {}
+		ref_key: tuple[int, int] | None = None
+
 		for line in result.splitlines():
-			# expected output format:
-			# ID 257 gen 8 top level 5 path @home
-			name = Path(line.split(' ')[-1])
-			sub_vol_mountpoint = btrfs_subvol_info.get('/' / name, None)
-			subvol_infos.append(_BtrfsSubvolumeInfo(name, sub_vol_mountpoint))
+			if key := _BTRFS_ROOT_REF_KEY.search(line):
+				parent_id = _BTRFS_FS_TREE_OBJECTID if key.group(1) == 'FS_TREE' else int(key.group(1))
+				ref_key = (parent_id, int(key.group(2)))
+			elif ref_key and (ref := _BTRFS_ROOT_REF.search(line)):
+				parent, subvol_id = ref_key
+				refs[subvol_id] = (parent, int(ref.group(1)), ref.group(2))
+				ref_key = None
 
-		if not lsblk_info.mountpoint:
-			umount(dev_path)
+		def _path(subvol_id: int) -> Path | None:
+			parent, dirid, name = refs[subvol_id]
+
+			# the path of subvolumes created in a sub-directory
+			# can't be determined from the root tree alone
+			if dirid != _BTRFS_FIRST_FREE_OBJECTID:
+				return None
+
+			if parent == _BTRFS_FS_TREE_OBJECTID:
+				return Path(name)
+
+			if parent not in refs or (parent_path := _path(parent)) is None:
+				return None
+
+			return parent_path / name
+
+		names = []
+
+		for subvol_id in sorted(refs):
+			if (path := _path(subvol_id)) is None:
+				return None
 
-		return subvol_infos
+			names.append(path)
+
+		return names
 
 	def format(
 		self,
@@ -295,12 +431,18 @@ class DeviceHandler:
 		if not command:
 			command = f'mkfs.{mkfs_type}'
 
+		options += tuned_mkfs_options(fs_type, path)
+
 		cmd = [command, *options, *additional_parted_options, str(path)]
 
 		debug('Formatting filesystem:', ' '.join(cmd))
 
 		try:
-			SysCommand(cmd)
+			# closing the device after writing the filesystem triggers
+			# a change event, wait for udev to pick up the new filesystem
+			with UdevMonitor() as monitor:
+				SysCommand(cmd)
+				monitor.wait([path])
 		except SysCallError as err:
 			msg = f'Could not format {path} with {fs_type.value}: {err.message}'
 			error(msg)
@@ -320,9 +462,9 @@ class DeviceHandler:
 			password=enc_password,
 		)
 
-		key_file = luks_handler.encrypt(iter_time=iter_time)
-
-		self.udev_sync()
+		with UdevMonitor() as monitor:
+			key_file = luks_handler.encrypt(iter_time=iter_time)
+			monitor.wait([dev_path])
 
 		luks_handler.unlock(key_file=key_file)
 
@@ -351,9 +493,9 @@ class DeviceHandler:
 			password=enc_conf.encryption_password,
 		)
 
-		key_file = luks_handler.encrypt(iter_time=enc_conf.iter_time)
-
-		self.udev_sync()
+		with UdevMonitor() as monitor:
+			key_file = luks_handler.encrypt(iter_time=enc_conf.iter_time)
+			monitor.wait([dev_path])
 
 		luks_handler.unlock(key_file=key_file)
 
@@ -422,11 +564,18 @@ class DeviceHandler:
 		cmd: str,
 		info_type: Literal['lv', 'vg', 'pvseg'],
 	) -> LvmVolumeInfo | LvmGroupInfo | LvmPVInfo | None:
+		delay = 0.05
+		deadline = time.monotonic() + _LVM_INFO_TIMEOUT
+
 		while True:
 			try:
 				return self._lvm_info(cmd, info_type)
-			except ValueError:
-				time.sleep(3)
+			except ValueError as err:
+				if time.monotonic() >= deadline:
+					raise DiskError(f'No LVM {info_type} information after {_LVM_INFO_TIMEOUT:.0f}s: {cmd}: {err}')
+
+				time.sleep(delay)
+				delay = min(delay * 2, 3)
 
 	def lvm_vol_info(self, lv_name: str) -> LvmVolumeInfo | None:
 		cmd = f'lvs --reportformat json --unit B -S lv_name={lv_name}'
@@ -498,13 +647,18 @@ class DeviceHandler:
 
 		debug(f'Creating volume: {cmd}')
 
-		worker = SysCommandWorker(cmd)
-		worker.poll()
-		worker.write(b'y\n', line_ending=False)
-
 		volume.vg_name = vg_name
 		volume.dev_path = Path(f'/dev/{vg_name}/{volume.name}')
 
+		with UdevMonitor() as monitor:
+			worker = SysCommandWorker(cmd)
+			worker.poll()
+			worker.write(b'y\n', line_ending=False)
+
+			# the add event of the device-mapper device only names /dev/dm-N,
+			# the /dev/<vg>/<lv> link arrives with the change event after resume
+			monitor.wait([volume.dev_path], actions=('add', 'change'))
+
 	def _setup_partition(
 		self,
 		part_mod: PartitionModification,
@@ -574,8 +728,32 @@ class DeviceHandler:
 		part_mod.dev_path = Path(partition.path)
 
 	def fetch_part_info(self, path: Path) -> LsblkInfo:
-		lsblk_info = get_lsblk_info(path)
+		return self.fetch_part_infos([path])[path]
+
+	def fetch_part_infos(self, paths: list[Path]) -> dict[Path, LsblkInfo]:
+		"""
+		Same as fetch_part_info() for several partitions at once,
+		using a single lsblk call for all of them.
 
+		The partitions have just been created or formatted, so a new
+		snapshot is taken and kept for the lookups that follow.
+		"""
+		snapshot = LsblkSnapshot.fetch()
+		self._snapshot = snapshot
+		part_infos = {}
+
+		for path in paths:
+			lsblk_info = snapshot.by_path(path)
+
+			if lsblk_info is None:
+				raise DiskError(f'Unable to find partition information: {path}')
+
+			self._validate_part_info(path, lsblk_info)
+			part_infos[path] = lsblk_info
+
+		return part_infos
+
+	def _validate_part_info(self, path: Path, lsblk_info: LsblkInfo) -> None:
 		if not lsblk_info.partn:
 			debug(f'Unable to determine new partition number: {path}\n{lsblk_info}')
 			raise DiskError(f'Unable to determine new partition number: {path}')
@@ -590,8 +768,6 @@ class DeviceHandler:
 
 		debug(f'partition information found: {lsblk_info.model_dump_json()}')
 
-		return lsblk_info
-
 	def create_lvm_btrfs_subvolumes(
 		self,
 		path: Path,
@@ -684,7 +860,10 @@ class DeviceHandler:
 	def umount_all_existing(self, device_path: Path) -> None:
 		debug(f'Unmounting all existing partitions: {device_path}')
 
-		existing_partitions = self._devices[device_path].partition_infos
+		if not (device := self.get_device(device_path)):
+			raise DiskError(f'Device not found: {device_path}')
+
+		existing_partitions = device.partition_infos
 
 		for partition in existing_partitions:
 			debug(f'Unmounting: {partition.path}')
@@ -699,6 +878,7 @@ class DeviceHandler:
 		self,
 		modification: DeviceModification,
 		partition_table: PartitionTable | None = None,
+		wipe_method: WipeMethod | None = None,
 	) -> None:
 		"""
 		Create a partition table on the block device and create all partitions.
@@ -710,7 +890,7 @@ class DeviceHandler:
 			if partition_table.is_mbr() and len(modification.partitions) > 3:
 				raise DiskError('Too many partitions on disk, MBR disks can only have 3 primary partitions')
 
-			self.wipe_dev(modification.device)
+			self.wipe_dev(modification.device, wipe_method)
 			disk = freshDisk(modification.device.disk.device, partition_table.value)
 		else:
 			info(f'Use existing device: {modification.device_path}')
@@ -718,6 +898,10 @@ class DeviceHandler:
 
 		info(f'Creating partitions: {modification.device_path}')
 
+		# user supplied layouts are moved onto the erase block and stripe
+		# boundaries of the device, the suggested layouts already are
+		align_partitions(modification, warn_misaligned=True)
+
 		# don't touch existing partitions
 		filtered_part = [p for p in modification.partitions if not p.exists()]
 
@@ -727,7 +911,15 @@ class DeviceHandler:
 			requires_delete = modification.wipe is False
 			self._setup_partition(part_mod, modification.device, disk, requires_delete=requires_delete)
 
-		disk.commit()
+		# partitions which are re-created with the same geometry are
+		# left alone by the kernel, so only wait for the new ones to appear
+		created = [p.safe_dev_path for p in filtered_part if p.status == ModificationStatus.Create]
+
+		with UdevMonitor() as monitor:
+			disk.commit()
+			monitor.wait(created, actions=('add',))
+
+		self.refresh(modification.device_path)
 
 	@staticmethod
 	def swapon(path: Path) -> None:
@@ -743,7 +935,12 @@ class DeviceHandler:
 		mount_fs: str | None = None,
 		create_target_mountpoint: bool = True,
 		options: list[str] = [],
+		tune_options: bool = False,
 	) -> None:
+		"""
+		Mount a device, with tune_options the mount options are
+		extended by options matching the underlying storage.
+		"""
 		if create_target_mountpoint and not target_mountpoint.exists():
 			target_mountpoint.mkdir(parents=True, exist_ok=True)
 
@@ -755,6 +952,9 @@ class DeviceHandler:
 			info(f'Device already mounted at {target_mountpoint}')
 			return
 
+		if tune_options and lsblk_info.fstype:
+			options = tuned_mount_options(lsblk_info.fstype, dev_path, options)
+
 		cmd = ['mount']
 
 		if len(options):
@@ -775,8 +975,9 @@ class DeviceHandler:
 
 	def detect_pre_mounted_mods(self, base_mountpoint: Path) -> list[DeviceModification]:
 		part_mods: dict[Path, list[PartitionModification]] = {}
+		devices = {device.device_info.path: device for device in self.devices}
 
-		for device in self.devices:
+		for device in devices.values():
 			for part_info in device.partition_infos:
 				for mountpoint in part_info.mountpoints:
 					if is_subpath(mountpoint, base_mountpoint):
@@ -794,7 +995,7 @@ class DeviceHandler:
 
 		device_mods: list[DeviceModification] = []
 		for device_path, mods in part_mods.items():
-			device_mod = DeviceModification(self._devices[device_path], False, mods)
+			device_mod = DeviceModification(devices[device_path], False, mods)
 			device_mods.append(device_mod)
 
 		return device_mods
@@ -814,20 +1015,12 @@ class DeviceHandler:
 			else:
 				error(f'"{command}" failed to run (continuing anyway): {err}')
 
-	def _wipe(self, dev_path: Path) -> None:
-		"""
-		Wipe a device (partition or otherwise) of meta-data, be it file system, LVM, etc.
-		@param dev_path:	Device path of the partition to be wiped.
-		@type dev_path:		str
-		"""
-		with open(dev_path, 'wb') as p:
-			p.write(bytearray(1024))
-
-	def wipe_dev(self, block_device: BDevice) -> None:
+	def wipe_dev(self, block_device: BDevice, method: WipeMethod | None = None) -> None:
 		"""
 		Wipe the block device of meta-data, be it file system, LVM, etc.
 		This is not intended to be secure, but rather to ensure that
 		auto-discovery tools don't recognize anything here.
+		With a wipe method given the entire device is wiped as well.
 		"""
 		info(f'Wiping partitions and metadata: {block_device.device_info.path}')
 
@@ -836,16 +1029,16 @@ class DeviceHandler:
 			if luks.isLuks():
 				luks.erase()
 
-			self._wipe(partition.path)
+			wipe_signatures(partition.path)
 
-		self._wipe(block_device.device_info.path)
+		if method is not None:
+			wipe_device(block_device.device_info.path, method)
+
+		wipe_signatures(block_device.device_info.path)
 
 	@staticmethod
 	def udev_sync() -> None:
-		try:
-			SysCommand('udevadm settle')
-		except SysCallError as err:
-			debug(f'Failed to synchronize with udev: {err}')
+		udev_settle()
 
 
 device_handler = DeviceHandler()
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import math
+import os
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from archinstall.lib.translationhandler import tr
 from archinstall.tui.curses_menu import Tui
 
+from ..args import arch_config_handler
+from ..exceptions import DiskError
 from ..interactions.general_conf import ask_abort
-from ..luks import Luks2
+from ..luks import Luks2, map_luks2_concurrently
 from ..models.device import (
 	DiskEncryption,
 	DiskLayoutConfiguration,
@@ -28,6 +33,11 @@ from .device_handler import device_handler
 
 
 class FilesystemHandler:
+	# upper bound of mkfs processes running at the same time
+	_MAX_PARALLEL_FORMATS = 8
+	# how long to wait for a new logical volume to be listed by lvs
+	_LVM_VOL_TIMEOUT = 30.0
+
 	def __init__(self, disk_config: DiskLayoutConfiguration):
 		self._disk_config = disk_config
 		self._enc_config = disk_config.disk_encryption
@@ -54,55 +64,104 @@ class FilesystemHandler:
 			device_handler.umount_all_existing(mod.device_path)
 
 		for mod in device_mods:
-			device_handler.partition(mod)
-
-		device_handler.udev_sync()
+			device_handler.partition(mod, wipe_method=arch_config_handler.args.full_wipe)
 
 		if self._disk_config.lvm_config:
+			boot_parts = {}
+
 			for mod in device_mods:
 				if boot_part := mod.get_boot_partition():
 					debug(f'Formatting boot partition: {boot_part.dev_path}')
-					self._format_partitions([boot_part])
+					boot_parts[mod.device_path] = [boot_part]
 
+			self._format_partitions(boot_parts)
 			self.perform_lvm_operations()
 		else:
-			for mod in device_mods:
-				self._format_partitions(mod.partitions)
+			self._format_partitions({mod.device_path: mod.partitions for mod in device_mods})
 
+			for mod in device_mods:
 				for part_mod in mod.partitions:
 					if part_mod.fs_type == FilesystemType.Btrfs and part_mod.is_create_or_modify():
 						device_handler.create_btrfs_volumes(part_mod, enc_conf=self._enc_config)
 
+	def _run_grouped[K, T](self, groups: dict[K, list[T]], action: Callable[[T], None]) -> None:
+		"""
+		Run the action for all items, items of the same group (e.g. the
+		partitions of one physical device) are handled one after another
+		while the groups themselves are processed concurrently.
+		"""
+		groups = {key: items for key, items in groups.items() if items}
+
+		if len(groups) <= 1:
+			for items in groups.values():
+				for item in items:
+					action(item)
+			return
+
+		def _run_group(items: list[T]) -> None:
+			for item in items:
+				action(item)
+
+		max_workers = min(len(groups), os.cpu_count() or 1, self._MAX_PARALLEL_FORMATS)
+
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			futures = [executor.submit(_run_group, items) for items in groups.values()]
+
+		# all groups have finished at this point, re-raise the first failure
+		for future in futures:
+			future.result()
+
 	def _format_partitions(
 		self,
-		partitions: list[PartitionModification],
+		partitions: dict[Path, list[PartitionModification]],
 	) -> None:
 		"""
-		Format can be given an overriding path, for instance /dev/null to test
-		the formatting functionality and in essence the support for the given filesystem.
+		Format the partitions of the given devices. Partitions on different
+		devices are formatted concurrently, the partition information of all
+		of them is collected afterwards with a single lsblk call.
 		"""
-
 		# don't touch existing partitions
-		create_or_modify_parts = [p for p in partitions if p.is_create_or_modify()]
+		create_or_modify_parts = {device_path: [p for p in parts if p.is_create_or_modify()] for device_path, parts in partitions.items()}
+		all_parts = [p for parts in create_or_modify_parts.values() for p in parts]
+
+		if not all_parts:
+			return
+
+		self._validate_partitions(all_parts)
+
+		enc_parts: list[PartitionModification] = []
+		plain_parts: dict[Path, list[PartitionModification]] = {}
+
+		for device_path, parts in create_or_modify_parts.items():
+			for part_mod in parts:
+				# partition will be encrypted
+				if self._enc_config is not None and part_mod in self._enc_config.partitions:
+					enc_parts.append(part_mod)
+				else:
+					plain_parts.setdefault(device_path, []).append(part_mod)
 
-		self._validate_partitions(create_or_modify_parts)
+		if enc_parts and self._enc_config is not None:
+			enc_config = self._enc_config
 
-		for part_mod in create_or_modify_parts:
-			# partition will be encrypted
-			if self._enc_config is not None and part_mod in self._enc_config.partitions:
-				device_handler.format_encrypted(
+			map_luks2_concurrently(
+				lambda part_mod: device_handler.format_encrypted(
 					part_mod.safe_dev_path,
 					part_mod.mapper_name,
 					part_mod.safe_fs_type,
-					self._enc_config,
-				)
-			else:
-				device_handler.format(part_mod.safe_fs_type, part_mod.safe_dev_path)
+					enc_config,
+				),
+				enc_parts,
+			)
+
+		self._run_grouped(
+			plain_parts,
+			lambda part_mod: device_handler.format(part_mod.safe_fs_type, part_mod.safe_dev_path),
+		)
 
-			# synchronize with udev before using lsblk
-			device_handler.udev_sync()
+		lsblk_infos = device_handler.fetch_part_infos([p.safe_dev_path for p in all_parts])
 
-			lsblk_info = device_handler.fetch_part_info(part_mod.safe_dev_path)
+		for part_mod in all_parts:
+			lsblk_info = lsblk_infos[part_mod.safe_dev_path]
 
 			part_mod.partn = lsblk_info.partn
 			part_mod.partuuid = lsblk_info.partuuid
@@ -212,33 +271,68 @@ class FilesystemHandler:
 				debug(f'vg: {vg.name}, vol: {lv.name}, offset: {offset}')
 				device_handler.lvm_vol_create(vg.name, lv, offset)
 
-				while True:
-					debug('Fetching LVM volume info')
-					lv_info = device_handler.lvm_vol_info(lv.name)
-					if lv_info is not None:
-						break
+				# the udev events of the volume don't guarantee that lvs lists it yet
+				debug('Fetching LVM volume info')
+				deadline = time.monotonic() + self._LVM_VOL_TIMEOUT
 
-					time.sleep(1)
+				while device_handler.lvm_vol_info(lv.name) is None:
+					if time.monotonic() >= deadline:
+						raise DiskError(f'LVM volume {vg.name}/{lv.name} did not show up after creating it')
+
+					time.sleep(0.2)
 
 			self._lvm_vol_handle_e2scrub(vg)
 
+	def _lvm_vg_disks(self, lvm_config: LvmConfiguration) -> dict[str, frozenset[Path]]:
+		"""
+		The physical disks underneath each volume group, merged with those
+		of all other groups that have a PV on one of the same disks
+		"""
+		disk_of = {part_mod: mod.device_path for mod in self._disk_config.device_modifications for part_mod in mod.partitions}
+		merged: list[set[Path]] = []
+		vg_disks: dict[str, set[Path]] = {}
+
+		for vg in lvm_config.vol_groups:
+			disks = {disk_of.get(pv, pv.safe_dev_path) for pv in vg.pvs}
+
+			for other in [other for other in merged if other & disks]:
+				disks |= other
+				merged.remove(other)
+
+			merged.append(disks)
+			vg_disks[vg.name] = disks
+
+		return {name: frozenset(next(group for group in merged if disks <= group)) for name, disks in vg_disks.items()}
+
 	def _format_lvm_vols(
 		self,
 		lvm_config: LvmConfiguration,
 		enc_vols: dict[LvmVolume, Luks2] = {},
 	) -> None:
+		vol_paths: dict[LvmVolume, Path] = {}
+
 		for vol in lvm_config.get_all_volumes():
 			if enc_vol := enc_vols.get(vol, None):
 				if not enc_vol.mapper_dev:
 					raise ValueError('No mapper device defined')
-				path = enc_vol.mapper_dev
+				vol_paths[vol] = enc_vol.mapper_dev
 			else:
-				path = vol.safe_dev_path
+				vol_paths[vol] = vol.safe_dev_path
+
+		# volumes whose groups share a physical disk are formatted one after
+		# another, only volumes on entirely different disks run concurrently
+		vg_disks = self._lvm_vg_disks(lvm_config)
+		groups: dict[frozenset[Path], list[LvmVolume]] = {}
+
+		for vg in lvm_config.vol_groups:
+			for vol in vg.volumes:
+				if vol in vol_paths:
+					groups.setdefault(vg_disks[vg.name], []).append(vol)
 
-			# wait a bit otherwise the mkfs will fail as it can't
-			# find the mapper device yet
-			device_handler.format(vol.fs_type, path)
+		self._run_grouped(groups, lambda vol: device_handler.format(vol.fs_type, vol_paths[vol]))
 
+		# the subvolumes are created through a shared temporary mountpoint
+		for vol, path in vol_paths.items():
 			if vol.fs_type == FilesystemType.Btrfs:
 				device_handler.create_lvm_btrfs_subvolumes(path, vol.btrfs_subvols, vol.mount_options)
 
@@ -276,28 +370,27 @@ class FilesystemHandler:
 		enc_config: DiskEncryption,
 		lock_after_create: bool = True,
 	) -> dict[LvmVolume, Luks2]:
-		enc_vols: dict[LvmVolume, Luks2] = {}
+		vols = [vol for vol in lvm_config.get_all_volumes() if vol in enc_config.lvm_volumes]
 
-		for vol in lvm_config.get_all_volumes():
-			if vol in enc_config.lvm_volumes:
-				luks_handler = device_handler.encrypt(
-					vol.safe_dev_path,
-					vol.mapper_name,
-					enc_config.encryption_password,
-					lock_after_create,
-					iter_time=enc_config.iter_time,
-				)
+		luks_handlers = map_luks2_concurrently(
+			lambda vol: device_handler.encrypt(
+				vol.safe_dev_path,
+				vol.mapper_name,
+				enc_config.encryption_password,
+				lock_after_create,
+				iter_time=enc_config.iter_time,
+			),
+			vols,
+		)
 
-				enc_vols[vol] = luks_handler
-
-		return enc_vols
+		return dict(zip(vols, luks_handlers))
 
 	def _encrypt_partitions(
 		self,
 		enc_config: DiskEncryption,
 		lock_after_create: bool = True,
 	) -> dict[PartitionModification, Luks2]:
-		enc_mods: dict[PartitionModification, Luks2] = {}
+		enc_parts: list[PartitionModification] = []
 
 		for mod in self._disk_config.device_modifications:
 			partitions = mod.partitions
@@ -307,21 +400,20 @@ class FilesystemHandler:
 
 			self._validate_partitions(filtered_part)
 
-			enc_mods = {}
-
-			for part_mod in filtered_part:
-				if part_mod in enc_config.partitions:
-					luks_handler = device_handler.encrypt(
-						part_mod.safe_dev_path,
-						part_mod.mapper_name,
-						enc_config.encryption_password,
-						lock_after_create=lock_after_create,
-						iter_time=enc_config.iter_time,
-					)
+			enc_parts += [p for p in filtered_part if p in enc_config.partitions]
 
-					enc_mods[part_mod] = luks_handler
+		luks_handlers = map_luks2_concurrently(
+			lambda part_mod: device_handler.encrypt(
+				part_mod.safe_dev_path,
+				part_mod.mapper_name,
+				enc_config.encryption_password,
+				lock_after_create=lock_after_create,
+				iter_time=enc_config.iter_time,
+			),
+			enc_parts,
+		)
 
-		return enc_mods
+		return dict(zip(enc_parts, luks_handlers))
 
 	def _lvm_vol_handle_e2scrub(self, vol_gp: LvmVolumeGroup) -> None:
 		# from arch wiki:
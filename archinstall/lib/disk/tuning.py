@@ -0,0 +1,176 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..models.device import BtrfsMountOption, FilesystemType
+from ..output import debug
+
+_SYS_BLOCK = Path('/sys/class/block')
+
+_KiB = 1024
+_MiB = 1024 * _KiB
+
+# devices with a deep request queue (NVMe) are fast enough for the CPU to
+# become the bottleneck, so they get a lighter compression level
+_DEEP_QUEUE = 256
+
+# f2fs sections are made of 2 MiB segments
+_F2FS_SEGMENT = 2 * _MiB
+
+# block size used by mkfs.ext4 for all but tiny filesystems
+_EXT4_BLOCK = 4 * _KiB
+
+
+@dataclass(frozen=True)
+class QueueLimits:
+	"""
+	The I/O topology of a block device as reported in /sys/block/*/queue
+	"""
+
+	rotational: bool
+	logical_block_size: int
+	physical_block_size: int
+	minimum_io_size: int
+	optimal_io_size: int
+	alignment_offset: int
+	discard_granularity: int
+	nr_requests: int
+
+	@property
+	def supports_discard(self) -> bool:
+		return self.discard_granularity > 0
+
+	@property
+	def stripe(self) -> tuple[int, int] | None:
+		"""
+		The stripe unit and stripe width in bytes of RAID backed devices
+		"""
+		if self.minimum_io_size <= self.physical_block_size or self.optimal_io_size <= self.minimum_io_size:
+			return None
+
+		if self.optimal_io_size % self.minimum_io_size:
+			return None
+
+		return self.minimum_io_size, self.optimal_io_size
+
+
+def _read_int(path: Path) -> int:
+	try:
+		return int(path.read_text().strip())
+	except (OSError, ValueError):
+		return 0
+
+
+def queue_limits(dev_path: Path) -> QueueLimits | None:
+	"""
+	Returns the queue limits of a disk, partition, mapper device or LVM volume.
+	Partitions share the queue of their disk, stacked devices (dm) have their own
+	with the limits of the underlying devices combined.
+	"""
+	sys_path = _SYS_BLOCK / Path(os.path.realpath(dev_path)).name
+
+	if not sys_path.exists():
+		debug(f'No sysfs entry for {dev_path}')
+		return None
+
+	queue = sys_path / 'queue'
+
+	if not queue.exists() and (sys_path / 'partition').exists():
+		queue = sys_path.resolve().parent / 'queue'
+
+	if not queue.exists():
+		debug(f'No queue limits for {dev_path}')
+		return None
+
+	return QueueLimits(
+		rotational=_read_int(queue / 'rotational') == 1,
+		logical_block_size=_read_int(queue / 'logical_block_size'),
+		physical_block_size=_read_int(queue / 'physical_block_size'),
+		minimum_io_size=_read_int(queue / 'minimum_io_size'),
+		optimal_io_size=_read_int(queue / 'optimal_io_size'),
+		alignment_offset=_read_int(sys_path / 'alignment_offset'),
+		discard_granularity=_read_int(queue / 'discard_granularity'),
+		nr_requests=_read_int(queue / 'nr_requests'),
+	)
+
+
+def tuned_mkfs_options(fs_type: FilesystemType, dev_path: Path) -> list[str]:
+	"""
+	mkfs options matching the storage the filesystem is created on
+	"""
+	if (limits := queue_limits(dev_path)) is None:
+		return []
+
+	options: list[str] = []
+
+	match fs_type:
+		case FilesystemType.Ext2 | FilesystemType.Ext3 | FilesystemType.Ext4:
+			extended = []
+
+			if stripe := limits.stripe:
+				stripe_unit, stripe_width = stripe
+				options.extend(('-b', str(_EXT4_BLOCK)))
+				extended += [f'stride={stripe_unit // _EXT4_BLOCK}', f'stripe_width={stripe_width // _EXT4_BLOCK}']
+
+			# initializing the inode tables and journal is cheap on solid state
+			# storage, doing it right away saves the background initialization
+			# after the first boot; spinning disks keep the lazy initialization
+			if not limits.rotational:
+				extended += ['lazy_itable_init=0', 'lazy_journal_init=0']
+
+			if extended:
+				options.extend(('-E', ','.join(extended)))
+		case FilesystemType.Xfs:
+			if stripe := limits.stripe:
+				stripe_unit, stripe_width = stripe
+				options.extend(('-d', f'su={stripe_unit},sw={stripe_width // stripe_unit}'))
+		case FilesystemType.F2fs:
+			# align the sections to the erase block or stripe size
+			unit = max(limits.optimal_io_size, limits.discard_granularity)
+
+			if unit > _F2FS_SEGMENT and unit % _F2FS_SEGMENT == 0:
+				options.extend(('-s', str(unit // _F2FS_SEGMENT)))
+		case _:
+			pass
+
+	if options:
+		debug(f'Tuned mkfs options for {dev_path}: {options}')
+
+	return options
+
+
+def tuned_mount_options(fs_type: str, dev_path: Path, options: list[str]) -> list[str]:
+	"""
+	Extends the mount options with options matching the storage, options
+	that have been set explicitly are kept as they are.
+	"""
+	if fs_type != FilesystemType.Btrfs.value:
+		return options
+
+	if (limits := queue_limits(dev_path)) is None:
+		return options
+
+	keys = {option.split('=', 1)[0] for option in options}
+	tuned = list(options)
+
+	if not limits.rotational:
+		if not keys & {'ssd', 'nossd', 'ssd_spread'}:
+			tuned.append('ssd')
+
+		if limits.supports_discard and not keys & {'discard', 'nodiscard'}:
+			tuned.append('discard=async')
+
+	# the compression level is picked by how fast the storage is compared to the CPU
+	if limits.rotational:
+		level = 3
+	elif limits.nr_requests >= _DEEP_QUEUE:
+		level = 1
+	else:
+		level = 2
+
+	tuned = [f'{option}:{level}' if option == BtrfsMountOption.compress.value else option for option in tuned]
+
+	if tuned != options:
+		debug(f'Tuned mount options for {dev_path}: {tuned}')
+
+	return tuned
@@ -0,0 +1,150 @@
+import select
+import socket
+import struct
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+from ..exceptions import SysCallError
+from ..general import SysCommand
+from ..output import debug
+
+# netlink protocol of the kernel uevents
+_NETLINK_KOBJECT_UEVENT = 15
+# multicast group udev re-broadcasts the events on once it has processed them
+_UDEV_EVENT_GROUP = 2
+_UDEV_MAGIC = 0xFEEDCAFE
+# prefix, magic, header size, properties offset, properties length
+_UDEV_HEADER = struct.Struct('=8sIIII')
+_RECEIVE_BUFFER = 1024 * 1024
+
+
+def udev_settle() -> None:
+	"""
+	Wait for the entire udev event queue to be processed
+	"""
+	try:
+		SysCommand('udevadm settle')
+	except SysCallError as err:
+		debug(f'Failed to synchronize with udev: {err}')
+
+
+class UdevMonitor:
+	"""
+	Listens for the udev events of block devices, to wait for the devices
+	that have just been touched to be processed by udev instead of waiting
+	for the entire udev event queue to drain.
+
+	The monitor has to be entered before running the action that triggers
+	the events, otherwise they may be missed:
+
+		with UdevMonitor() as monitor:
+			SysCommand(f'mkfs.ext4 {path}')
+			monitor.wait([path])
+
+	If udev events can't be received, or the expected events don't
+	arrive in time, it falls back to a global udev settle.
+	"""
+
+	def __init__(self) -> None:
+		self._sock: socket.socket | None = None
+
+	def __enter__(self) -> Self:
+		try:
+			sock = socket.socket(
+				socket.AF_NETLINK,
+				socket.SOCK_RAW | socket.SOCK_CLOEXEC | socket.SOCK_NONBLOCK,
+				_NETLINK_KOBJECT_UEVENT,
+			)
+		except OSError as err:
+			debug(f'Unable to listen for udev events: {err}')
+			return self
+
+		try:
+			sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _RECEIVE_BUFFER)
+			sock.bind((0, _UDEV_EVENT_GROUP))
+		except OSError as err:
+			debug(f'Unable to listen for udev events: {err}')
+			sock.close()
+		else:
+			self._sock = sock
+
+		return self
+
+	def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+		if self._sock is not None:
+			self._sock.close()
+			self._sock = None
+
+	@staticmethod
+	def _parse_event(data: bytes) -> dict[str, str] | None:
+		if len(data) < _UDEV_HEADER.size:
+			return None
+
+		prefix, magic, _, properties_off, properties_len = _UDEV_HEADER.unpack_from(data)
+
+		if prefix != b'libudev\0' or socket.ntohl(magic) != _UDEV_MAGIC:
+			return None
+
+		properties = data[properties_off : properties_off + properties_len]
+		event = {}
+
+		for prop in properties.split(b'\0'):
+			key, sep, value = prop.partition(b'=')
+			if sep:
+				event[key.decode(errors='replace')] = value.decode(errors='replace')
+
+		return event
+
+	def _receive(self) -> Iterator[dict[str, str]]:
+		assert self._sock is not None
+
+		while True:
+			try:
+				data = self._sock.recv(_RECEIVE_BUFFER)
+			except BlockingIOError:
+				return
+
+			if (event := self._parse_event(data)) is not None:
+				yield event
+
+	def wait(
+		self,
+		paths: Iterable[Path],
+		actions: tuple[str, ...] = ('add', 'change'),
+		timeout: float = 10,
+	) -> None:
+		"""
+		Wait until udev has processed an event with one of the given actions
+		for each of the device paths. Paths are matched against the device
+		node as well as its symlinks (e.g. /dev/mapper/* or /dev/<vg>/<lv>).
+		"""
+		pending = {str(path) for path in paths}
+
+		if not pending:
+			return
+
+		if self._sock is None:
+			udev_settle()
+			return
+
+		deadline = time.monotonic() + timeout
+
+		while pending:
+			remaining = deadline - time.monotonic()
+
+			if remaining <= 0:
+				debug(f'Timed out waiting for udev events of: {", ".join(sorted(pending))}')
+				udev_settle()
+				return
+
+			select.select([self._sock], [], [], remaining)
+
+			for event in self._receive():
+				if event.get('SUBSYSTEM') != 'block' or event.get('ACTION') not in actions:
+					continue
+
+				names = {event.get('DEVNAME', ''), *event.get('DEVLINKS', '').split()}
+				pending -= names
@@ -1,3 +1,7 @@
+import fcntl
+import os
+import struct
+from collections.abc import Iterator
 from pathlib import Path
 
 from pydantic import BaseModel
@@ -7,6 +11,12 @@ from archinstall.lib.general import SysCommand
 from archinstall.lib.models.device import LsblkInfo
 from archinstall.lib.output import debug, warn
 
+# struct fiemap with room for a single struct fiemap_extent, see linux/fiemap.h
+_FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP_FLAG_SYNC = 0x1
+_FIEMAP = struct.Struct('=QQIIII')
+_FIEMAP_EXTENT = struct.Struct('=QQQQQIIII')
+
 
 class LsblkOutput(BaseModel):
 	blockdevices: list[LsblkInfo]
@@ -57,47 +67,102 @@ def get_lsblk_info(
 	raise DiskError(f'lsblk failed to retrieve information for "{dev_path}"')
 
 
-def get_all_lsblk_info() -> list[LsblkInfo]:
-	return _fetch_lsblk_info().blockdevices
-
-
 def get_lsblk_output() -> LsblkOutput:
 	return _fetch_lsblk_info()
 
 
-def find_lsblk_info(
-	dev_path: Path | str,
-	info: list[LsblkInfo],
-) -> LsblkInfo | None:
-	if isinstance(dev_path, str):
-		dev_path = Path(dev_path)
+class LsblkSnapshot:
+	"""
+	The state of all block devices taken with a single lsblk call,
+	indexed by path, name, mountpoint, UUID and PARTUUID.
+
+	Devices which appear multiple times in the lsblk tree (e.g. LVM volumes
+	spanning several physical volumes) are indexed by their first occurrence.
+	"""
+
+	def __init__(self, blockdevices: list[LsblkInfo]) -> None:
+		self.blockdevices = blockdevices
+
+		self._by_path: dict[Path, LsblkInfo] = {}
+		self._by_name: dict[str, LsblkInfo] = {}
+		self._by_mountpoint: dict[Path, list[LsblkInfo]] = {}
+		self._by_uuid: dict[str, LsblkInfo] = {}
+		self._by_partuuid: dict[str, LsblkInfo] = {}
+		self._parents: dict[Path, LsblkInfo] = {}
+
+		self._index(blockdevices, None)
+
+	@classmethod
+	def fetch(cls) -> 'LsblkSnapshot':
+		return cls(_fetch_lsblk_info().blockdevices)
+
+	def _index(self, infos: list[LsblkInfo], parent: LsblkInfo | None) -> None:
+		for lsblk_info in infos:
+			if lsblk_info.path in self._by_path:
+				continue
+
+			self._by_path[lsblk_info.path] = lsblk_info
+			self._by_name.setdefault(lsblk_info.name, lsblk_info)
+
+			if parent is not None:
+				self._parents[lsblk_info.path] = parent
+
+			if lsblk_info.uuid:
+				self._by_uuid.setdefault(lsblk_info.uuid, lsblk_info)
+
+			if lsblk_info.partuuid:
+				self._by_partuuid.setdefault(lsblk_info.partuuid, lsblk_info)
+
+			for mountpoint in lsblk_info.mountpoints:
+				self._by_mountpoint.setdefault(mountpoint, []).append(lsblk_info)
+
+			self._index(lsblk_info.children, lsblk_info)
 
-	for lsblk_info in info:
-		if lsblk_info.path == dev_path:
-			return lsblk_info
+	def __iter__(self) -> Iterator[LsblkInfo]:
+		"""
+		All entries of the lsblk tree, children included.
+		"""
+		return iter(self._by_path.values())
 
-	return None
+	def by_path(self, dev_path: Path | str) -> LsblkInfo | None:
+		return self._by_path.get(Path(dev_path))
 
+	def by_name(self, name: str) -> LsblkInfo | None:
+		return self._by_name.get(name)
 
-def get_lsblk_by_mountpoint(mountpoint: Path, as_prefix: bool = False) -> list[LsblkInfo]:
-	def _check(infos: list[LsblkInfo]) -> list[LsblkInfo]:
-		devices = []
-		for entry in infos:
-			if as_prefix:
-				matches = [m for m in entry.mountpoints if str(m).startswith(str(mountpoint))]
-				if matches:
-					devices += [entry]
-			elif mountpoint in entry.mountpoints:
-				devices += [entry]
+	def by_uuid(self, uuid: str) -> LsblkInfo | None:
+		return self._by_uuid.get(uuid)
 
-			if len(entry.children) > 0:
-				if len(match := _check(entry.children)) > 0:
-					devices += match
+	def by_partuuid(self, partuuid: str) -> LsblkInfo | None:
+		return self._by_partuuid.get(partuuid)
 
-		return devices
+	def by_mountpoint(self, mountpoint: Path, as_prefix: bool = False) -> list[LsblkInfo]:
+		if not as_prefix:
+			return list(self._by_mountpoint.get(mountpoint, []))
 
-	all_info = get_all_lsblk_info()
-	return _check(all_info)
+		matches: dict[Path, LsblkInfo] = {}
+
+		for path, infos in self._by_mountpoint.items():
+			if str(path).startswith(str(mountpoint)):
+				for lsblk_info in infos:
+					matches.setdefault(lsblk_info.path, lsblk_info)
+
+		return list(matches.values())
+
+	def parent(self, dev_path: Path) -> LsblkInfo | None:
+		return self._parents.get(dev_path)
+
+	def root(self, dev_path: Path) -> LsblkInfo | None:
+		"""
+		Returns the top level device of the given path,
+		e.g. the disk of a partition or of a mapper device on it.
+		"""
+		lsblk_info = self.by_path(dev_path)
+
+		while lsblk_info is not None and (parent := self.parent(lsblk_info.path)) is not None:
+			lsblk_info = parent
+
+		return lsblk_info
 
 
 def disk_layouts() -> str:
@@ -126,3 +191,33 @@ def umount(mountpoint: Path, recursive: bool = False) -> None:
 	for path in lsblk_info.mountpoints:
 		debug(f'Unmounting mountpoint: {path}')
 		SysCommand(cmd + [str(path)])
+
+
+def get_physical_offset(path: Path) -> int:
+	"""
+	Returns the physical byte offset of the first extent of a file
+	on its block device, read with the FIEMAP ioctl.
+
+	Note that on btrfs this is an offset in the filesystem's
+	logical address space rather than on the device.
+	"""
+	request = bytearray(_FIEMAP.size + _FIEMAP_EXTENT.size)
+	_FIEMAP.pack_into(request, 0, 0, 2**64 - 1, _FIEMAP_FLAG_SYNC, 0, 1, 0)
+
+	fd = os.open(path, os.O_RDONLY)
+
+	try:
+		fcntl.ioctl(fd, _FS_IOC_FIEMAP, request)
+	except OSError as err:
+		raise DiskError(f'Unable to map the extents of {path}: {err}')
+	finally:
+		os.close(fd)
+
+	_, _, _, mapped_extents, _, _ = _FIEMAP.unpack_from(request)
+
+	if mapped_extents < 1:
+		raise DiskError(f'No extents allocated for {path}')
+
+	_, physical, *_ = _FIEMAP_EXTENT.unpack_from(request, _FIEMAP.size)
+
+	return physical
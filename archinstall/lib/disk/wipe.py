@@ -0,0 +1,196 @@
+import errno
+import fcntl
+import os
+import struct
+import time
+from pathlib import Path
+
+from ..exceptions import DiskError
+from ..models.device import SectorSize, Size, Unit, WipeMethod
+from ..output import debug, info
+
+# see linux/fs.h
+_BLKDISCARD = 0x1277
+_BLKSECDISCARD = 0x127D
+_BLKZEROOUT = 0x127F
+_BLK_RANGE = struct.Struct('=QQ')
+
+_MiB = 1024 * 1024
+_GiB = 1024 * _MiB
+
+# partition tables, LVM labels, MD 1.1/1.2 superblocks, the LUKS1 header,
+# the primary and secondary LUKS2 headers (up to the maximum header size)
+# and the primary superblocks of all filesystems are within the first 4 MiB
+_HEAD_SIZE = 4 * _MiB
+# the GPT backup header, MD 0.90/1.0 superblocks and DDF/IMSM RAID anchors
+# are within the last 1 MiB
+_TAIL_SIZE = _MiB
+# btrfs keeps backups of its superblock at fixed offsets
+_BTRFS_BACKUP_SUPERS = (64 * _MiB, 256 * _GiB, 1024**5)
+_BTRFS_SUPER_SIZE = 4096
+
+# size of the ranges handed to the kernel in a single ioctl, and of the
+# buffer for plain writes, so progress can be reported while the memory
+# usage stays bounded
+_IOCTL_CHUNK = _GiB
+_WRITE_CHUNK = 4 * _MiB
+
+_PROGRESS_INTERVAL = 2.0
+
+_IOCTLS = {
+	WipeMethod.Discard: _BLKDISCARD,
+	WipeMethod.SecureDiscard: _BLKSECDISCARD,
+	WipeMethod.ZeroOut: _BLKZEROOUT,
+}
+
+# errors of ioctls the device or kernel doesn't support
+_UNSUPPORTED = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS)
+
+
+class _WipeProgress:
+	def __init__(self, dev_path: Path, total: int) -> None:
+		self._dev_path = dev_path
+		self._total = total
+		self._started = time.monotonic()
+		self._reported = self._started
+
+	@staticmethod
+	def _size(value: float) -> str:
+		return Size(int(value), Unit.B, SectorSize.default()).format_highest()
+
+	def update(self, done: int) -> None:
+		now = time.monotonic()
+
+		if now - self._reported < _PROGRESS_INTERVAL and done < self._total:
+			return
+
+		self._reported = now
+		elapsed = max(now - self._started, 1e-6)
+		throughput = done / elapsed
+		eta = int((self._total - done) / throughput) if throughput else 0
+		percent = done * 100 // max(self._total, 1)
+
+		info(
+			f'Wiping {self._dev_path}: {self._size(done)} of {self._size(self._total)} ({percent}%), {self._size(throughput)}/s, ETA {eta // 60}m {eta % 60}s',
+		)
+
+
+def _device_size(fd: int) -> int:
+	return os.lseek(fd, 0, os.SEEK_END)
+
+
+def _write_zeroes(fd: int, offset: int, length: int, progress: _WipeProgress | None = None) -> None:
+	chunk = bytes(min(length, _WRITE_CHUNK))
+	done = 0
+
+	while done < length:
+		done += os.pwrite(fd, chunk[: length - done], offset + done)
+
+		if progress:
+			progress.update(done)
+
+
+def _zero_range(fd: int, offset: int, length: int) -> None:
+	try:
+		fcntl.ioctl(fd, _BLKZEROOUT, _BLK_RANGE.pack(offset, length))
+	except OSError as err:
+		if err.errno not in _UNSUPPORTED:
+			raise
+
+		_write_zeroes(fd, offset, length)
+
+
+def _signature_ranges(size: int) -> list[tuple[int, int]]:
+	ranges = [(0, _HEAD_SIZE), (size - _TAIL_SIZE, size)]
+	ranges += [(offset, offset + _BTRFS_SUPER_SIZE) for offset in _BTRFS_BACKUP_SUPERS]
+
+	# clip to the device and merge overlapping ranges of small devices
+	merged: list[tuple[int, int]] = []
+
+	for start, end in sorted((max(start, 0), min(end, size)) for start, end in ranges):
+		if start >= end:
+			continue
+
+		if merged and start <= merged[-1][1]:
+			merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+		else:
+			merged.append((start, end))
+
+	return merged
+
+
+def wipe_signatures(dev_path: Path) -> None:
+	"""
+	Clear all known metadata signatures of a device (partition or otherwise):
+	partition tables and their backups, LVM, MD and LUKS headers as well as
+	filesystem superblocks including the btrfs backup superblocks.
+	This is not intended to be secure, but rather to ensure that
+	auto-discovery tools don't recognize anything here.
+	"""
+	fd = os.open(dev_path, os.O_WRONLY | os.O_CLOEXEC)
+
+	try:
+		for start, end in _signature_ranges(_device_size(fd)):
+			_zero_range(fd, start, end - start)
+
+		os.fsync(fd)
+	except OSError as err:
+		raise DiskError(f'Unable to wipe signatures of {dev_path}: {err}')
+	finally:
+		os.close(fd)
+
+
+def _wipe_ioctl(fd: int, request: int, size: int, progress: _WipeProgress) -> bool:
+	done = 0
+
+	while done < size:
+		length = min(_IOCTL_CHUNK, size - done)
+
+		try:
+			fcntl.ioctl(fd, request, _BLK_RANGE.pack(done, length))
+		except OSError as err:
+			# only fall back if nothing has been wiped yet, failing
+			# half way through is an actual error of the device
+			if done == 0 and err.errno in _UNSUPPORTED:
+				return False
+			raise
+
+		done += length
+		progress.update(done)
+
+	return True
+
+
+def wipe_device(dev_path: Path, method: WipeMethod) -> None:
+	"""
+	Wipe the entire device by discarding or zeroing it in the kernel if the
+	device supports it, falling back to zeroing (for discards) and then to
+	large sequential writes otherwise. Progress is reported with the
+	throughput and the estimated remaining time.
+	"""
+	fd = os.open(dev_path, os.O_WRONLY | os.O_CLOEXEC)
+
+	try:
+		size = _device_size(fd)
+		info(f'Wiping entire device {dev_path} ({method.value})')
+
+		methods = [method]
+
+		if method in (WipeMethod.Discard, WipeMethod.SecureDiscard):
+			methods.append(WipeMethod.ZeroOut)
+
+		for wipe_method in methods:
+			if wipe_method == WipeMethod.Write:
+				break
+
+			if _wipe_ioctl(fd, _IOCTLS[wipe_method], size, _WipeProgress(dev_path, size)):
+				return
+
+			debug(f'{dev_path} does not support {wipe_method.value}, falling back')
+
+		_write_zeroes(fd, 0, size, _WipeProgress(dev_path, size))
+		os.fsync(fd)
+	except OSError as err:
+		raise DiskError(f'Unable to wipe {dev_path}: {err}')
+	finally:
+		os.close(fd)
@@ -1,23 +1,22 @@
 from __future__ import annotations
 
-import shutil
+from contextlib import nullcontext
 from pathlib import Path
 
 from archinstall.lib.output import debug, info, warn
+from archinstall.lib.sync import CopyEngine, shared_sources
 
 from .catalog import EntropyPayload, EntropySpec
 
 
-def _copy_spec(target_root: Path, spec: EntropySpec) -> None:
-	if not spec.src.exists():
-		warn(f'Skipping missing config source: {spec.src}')
-		return
-
+def _copy_spec(engine: CopyEngine, target_root: Path, spec: EntropySpec, staged: dict[Path, Path]) -> None:
 	dest = target_root / spec.dest.relative_to('/')
-	dest.parent.mkdir(parents=True, exist_ok=True)
+	# the config sources are shipped as plain files, resolving them
+	# keeps copying the content should one be replaced by a link
+	source = spec.src.resolve()
 
 	debug(f'Copying {spec.src} -> {dest}')
-	shutil.copy2(spec.src, dest)
+	engine.add(staged.get(source, source), dest)
 
 
 def apply_payload(installation: 'Installer', payload: EntropyPayload) -> None:  # type: ignore[name-defined]
@@ -28,8 +27,26 @@ def apply_payload(installation: 'Installer', payload: EntropyPayload) -> None:
 		info(f'Applying Entropy selections: {len(payload.include_packages)} package(s)')
 		installation.add_additional_packages(payload.include_packages)
 
+	engine = installation.copy_engine()
+	specs: list[EntropySpec] = []
+
 	for spec in payload.configs:
-		_copy_spec(installation.target, spec)
+		if spec.src.exists():
+			specs.append(spec)
+		else:
+			warn(f'Skipping missing config source: {spec.src}')
+
+	# assets used by several specs, such as themes or wallpapers, are staged once
+	shared = shared_sources([spec.src.resolve() for spec in specs])
+	store = installation.seed_store() if shared else None
+
+	with store or nullcontext():
+		staged = store.stage(shared) if store else {}
+
+		for spec in specs:
+			_copy_spec(engine, installation.target, spec, staged)
+
+		engine.run()
 
 	for cmd in payload.post_commands:
 		info(f'Running Entropy command: {cmd}')
@@ -34,6 +34,13 @@ class Deprecated(Exception):
 	pass
 
 
+class HttpError(Exception):
+	def __init__(self, message: str, code: int | None = None) -> None:
+		super().__init__(message)
+		self.message = message
+		self.code = code
+
+
 class DownloadTimeout(Exception):
 	"""
 	Download timeout exception raised by DownloadTimer.
@@ -164,6 +164,13 @@ class _SysInfo:
 		"""
 		Returns system memory information
 		"""
+		return self.read_mem_info()
+
+	def read_mem_info(self) -> dict[str, int]:
+		"""
+		Returns the current system memory information, for values
+		that change while running such as the available memory
+		"""
 		mem_info_path = Path('/proc/meminfo')
 		mem_info: dict[str, int] = {}
 
@@ -256,11 +263,11 @@ class SysInfo:
 
 	@staticmethod
 	def mem_available() -> int:
-		return _sys_info.mem_info_by_key('MemAvailable')
+		return _sys_info.read_mem_info()['MemAvailable']
 
 	@staticmethod
 	def mem_free() -> int:
-		return _sys_info.mem_info_by_key('MemFree')
+		return _sys_info.read_mem_info()['MemFree']
 
 	@staticmethod
 	def mem_total() -> int:
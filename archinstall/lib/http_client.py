@@ -0,0 +1,293 @@
+import gzip
+import http.client
+import importlib
+import importlib.util
+import json
+import ssl
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from .exceptions import HttpError
+from .output import debug
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_RETRY_CODES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class HttpResponse:
+	url: str
+	status: int
+	headers: dict[str, str] = field(default_factory=dict)
+	body: bytes = b''
+
+	def text(self, encoding: str = 'utf-8') -> str:
+		return self.body.decode(encoding)
+
+	def json(self) -> Any:
+		return json.loads(self.body)
+
+
+class HttpClient:
+	"""
+	A small HTTP(S) client shared by all installer downloads.
+
+	Connections are pooled per host and kept alive between requests,
+	responses are transparently decompressed (gzip, deflate and brotli
+	if the brotli module is available) and every request has a timeout
+	and is retried with an exponential backoff on connection errors
+	and temporary server errors.
+	"""
+
+	def __init__(
+		self,
+		timeout: float = 10,
+		retries: int = 3,
+		backoff: float = 0.5,
+		max_redirects: int = 5,
+		max_idle_per_host: int = 4,
+	) -> None:
+		self.timeout = timeout
+		self.retries = retries
+		self.backoff = backoff
+		self.max_redirects = max_redirects
+		self.max_idle_per_host = max_idle_per_host
+
+		self._pool: dict[tuple[str, str, int, bool], list[http.client.HTTPConnection]] = {}
+		self._ssl_contexts: dict[bool, ssl.SSLContext] = {}
+		self._lock = threading.Lock()
+
+	def _ssl_context(self, verify: bool) -> ssl.SSLContext:
+		with self._lock:
+			if verify not in self._ssl_contexts:
+				context = ssl.create_default_context()
+
+				if not verify:
+					context.check_hostname = False
+					context.verify_mode = ssl.CERT_NONE
+
+				self._ssl_contexts[verify] = context
+
+			return self._ssl_contexts[verify]
+
+	def _accept_encoding(self) -> str:
+		# brotli is optional, only advertised if it can be decoded
+		if importlib.util.find_spec('brotli') is None:
+			return 'gzip, deflate'
+
+		return 'gzip, deflate, br'
+
+	def _decode_body(self, body: bytes, encoding: str) -> bytes:
+		match encoding.strip().lower():
+			case '' | 'identity':
+				return body
+			case 'gzip' | 'x-gzip':
+				return gzip.decompress(body)
+			case 'deflate':
+				try:
+					return zlib.decompress(body)
+				except zlib.error:
+					# some servers send raw deflate streams without the zlib header
+					return zlib.decompress(body, -zlib.MAX_WBITS)
+			case 'br':
+				brotli = importlib.import_module('brotli')
+				decoded: bytes = brotli.decompress(body)
+				return decoded
+			case _:
+				raise HttpError(f'Unsupported content encoding: {encoding}')
+
+	def _acquire(self, key: tuple[str, str, int, bool], timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+		"""
+		Returns a connection for the given host and whether it was reused from the pool.
+		"""
+		with self._lock:
+			idle = self._pool.get(key)
+			if idle:
+				connection = idle.pop()
+				connection.timeout = timeout
+				if connection.sock is not None:
+					connection.sock.settimeout(timeout)
+				return connection, True
+
+		scheme, host, port, verify = key
+
+		if scheme == 'https':
+			return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context(verify)), False
+
+		return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+	def _release(self, key: tuple[str, str, int, bool], connection: http.client.HTTPConnection) -> None:
+		with self._lock:
+			idle = self._pool.setdefault(key, [])
+
+			if len(idle) < self.max_idle_per_host:
+				idle.append(connection)
+				return
+
+		connection.close()
+
+	def _send(
+		self,
+		method: str,
+		url: str,
+		headers: dict[str, str],
+		data: bytes | None,
+		timeout: float,
+		verify: bool,
+	) -> HttpResponse:
+		parts = urlsplit(url)
+
+		if parts.scheme not in ('http', 'https') or not parts.hostname:
+			raise HttpError(f'Unsupported url: {url}')
+
+		port = parts.port or (443 if parts.scheme == 'https' else 80)
+		key = (parts.scheme, parts.hostname, port, verify)
+		path = parts.path or '/'
+
+		if parts.query:
+			path += f'?{parts.query}'
+
+		while True:
+			connection, reused = self._acquire(key, timeout)
+
+			try:
+				connection.request(method, path, body=data, headers=headers)
+				response = connection.getresponse()
+				body = response.read()
+			except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+				connection.close()
+
+				# the server closed an idle keep-alive connection,
+				# that's not an error so retry once on a fresh connection
+				if reused:
+					continue
+				raise
+			except BaseException:
+				connection.close()
+				raise
+
+			response_headers = {name.lower(): value for name, value in response.getheaders()}
+
+			if response.will_close:
+				connection.close()
+			else:
+				self._release(key, connection)
+
+			if method != 'HEAD':
+				body = self._decode_body(body, response_headers.get('content-encoding', ''))
+
+			return HttpResponse(url=url, status=response.status, headers=response_headers, body=body)
+
+	def request(
+		self,
+		method: str,
+		url: str,
+		params: dict[str, str] | None = None,
+		headers: dict[str, str] | None = None,
+		data: bytes | None = None,
+		timeout: float | None = None,
+		retries: int | None = None,
+		verify: bool = True,
+	) -> HttpResponse:
+		"""
+		Perform a request and return the complete, decoded response.
+
+		Redirects are followed, responses with an error status raise a HttpError
+		carrying the status code. Connection errors and temporary server errors
+		(429, 5xx) are retried with an exponential backoff.
+		"""
+		if params:
+			url = f'{url}?{urlencode(params)}'
+
+		request_headers = {
+			'User-Agent': 'ArchInstall',
+			'Accept-Encoding': self._accept_encoding(),
+			'Connection': 'keep-alive',
+		}
+		request_headers.update(headers or {})
+
+		timeout = self.timeout if timeout is None else timeout
+		retries = self.retries if retries is None else retries
+
+		for attempt in range(retries + 1):
+			if attempt > 0:
+				time.sleep(self.backoff * 2 ** (attempt - 1))
+
+			try:
+				response = self._follow_redirects(method, url, request_headers, data, timeout, verify)
+			except (OSError, http.client.HTTPException) as err:
+				debug(f'Request to {url} failed (attempt {attempt + 1}/{retries + 1}): {err}')
+
+				if attempt == retries:
+					raise HttpError(f'Unable to fetch {url}: {err}')
+				continue
+
+			if response.status in _RETRY_CODES and attempt < retries:
+				debug(f'Request to {url} returned {response.status} (attempt {attempt + 1}/{retries + 1})')
+				continue
+
+			if response.status >= 400:
+				raise HttpError(f'Unable to fetch {url}: HTTP {response.status}', code=response.status)
+
+			return response
+
+		raise HttpError(f'Unable to fetch {url}')
+
+	def _follow_redirects(
+		self,
+		method: str,
+		url: str,
+		headers: dict[str, str],
+		data: bytes | None,
+		timeout: float,
+		verify: bool,
+	) -> HttpResponse:
+		for _ in range(self.max_redirects + 1):
+			response = self._send(method, url, headers, data, timeout, verify)
+
+			if response.status not in _REDIRECT_CODES or 'location' not in response.headers:
+				return response
+
+			url = urljoin(url, response.headers['location'])
+
+			if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+				method = 'GET'
+				data = None
+
+		raise HttpError(f'Too many redirects for {url}')
+
+	def get(
+		self,
+		url: str,
+		params: dict[str, str] | None = None,
+		headers: dict[str, str] | None = None,
+		timeout: float | None = None,
+		verify: bool = True,
+	) -> HttpResponse:
+		return self.request('GET', url, params=params, headers=headers, timeout=timeout, verify=verify)
+
+	def head(
+		self,
+		url: str,
+		headers: dict[str, str] | None = None,
+		timeout: float | None = None,
+		retries: int | None = None,
+		verify: bool = True,
+	) -> HttpResponse:
+		return self.request('HEAD', url, headers=headers, timeout=timeout, retries=retries, verify=verify)
+
+	def close(self) -> None:
+		with self._lock:
+			pool = self._pool
+			self._pool = {}
+
+		for connections in pool.values():
+			for connection in connections:
+				connection.close()
+
+
+http_client = HttpClient()
@@ -1,4 +1,3 @@
-import fnmatch
 import glob
 import json
 import os
@@ -7,9 +6,11 @@ import re
 import shlex
 import shutil
 import subprocess
+import tarfile
 import textwrap
 import time
 from collections.abc import Callable
+from contextlib import nullcontext
 from pathlib import Path
 from subprocess import CalledProcessError
 from types import TracebackType
@@ -17,7 +18,7 @@ from typing import Any
 
 from archinstall.lib.disk.device_handler import device_handler
 from archinstall.lib.disk.fido import Fido2
-from archinstall.lib.disk.utils import get_lsblk_by_mountpoint, get_lsblk_info
+from archinstall.lib.disk.utils import LsblkSnapshot, get_lsblk_info, get_physical_offset
 from archinstall.lib.models.device import (
 	DiskEncryption,
 	DiskLayoutConfiguration,
@@ -41,18 +42,32 @@ from .exceptions import DiskError, HardwareIncompatibilityError, RequirementErro
 from .general import SysCommand, clear_vt100_escape_codes_from_str, run
 from .hardware import SysInfo
 from .locale.utils import verify_keyboard_layout, verify_x11_keyboard_layout
-from .luks import Luks2
+from .luks import Luks2, append_crypttab, map_luks2_concurrently
 from .models.bootloader import Bootloader
 from .models.locale import LocaleConfiguration
 from .models.mirrors import MirrorConfiguration
 from .models.network import Nic
-from .models.mirrors import CustomRepository, SignCheck, SignOption
 from .models.users import User
 from .output import debug, error, info, log, logger, warn
 from .pacman import Pacman
 from .pacman.config import PacmanConfig
 from .plugins import plugins
 from .storage import storage
+from .sync import (
+	USER_HOME,
+	ArchiveWriter,
+	CopyEngine,
+	CopyProgress,
+	Deduplicator,
+	PathMatcher,
+	SeedStore,
+	SyncManifest,
+	expand_includes,
+	extract_archive,
+	format_bytes,
+	scan_tree,
+	shared_sources,
+)
 
 # Any package that the Installer() is responsible for (optional and the default ones)
 __packages__ = ['base', 'base-devel', 'linux-firmware', 'linux', 'linux-lts', 'linux-zen', 'linux-hardened']
@@ -123,6 +138,13 @@ class Installer:
 		self._zram_enabled = False
 		self._disable_fstrim = False
 
+		# shared by all copies so identical files are deduplicated across them
+		self._deduplicator = Deduplicator() if arch_config_handler.args.dedup_copies else None
+		# receives everything install from ISO copies while exporting it
+		self._iso_archive: ArchiveWriter | None = None
+		# looked up once the target is mounted
+		self._btrfs_target: bool | None = None
+
 		self.pacman = Pacman(self.target, arch_config_handler.args.silent)
 
 	def __enter__(self) -> 'Installer':
@@ -142,6 +164,7 @@ class Installer:
 			# Return None to propagate the exception
 			return None
 
+		self._remove_sync_manifests()
 		self.sync()
 
 		if not (missing_steps := self.post_install_check()):
@@ -224,7 +247,7 @@ class Installer:
 		NOTE: this function should be run AFTER running the mount_ordered_layout function
 		"""
 		boot_mount = self.target / 'boot'
-		lsblk_info = get_lsblk_by_mountpoint(boot_mount)
+		lsblk_info = LsblkSnapshot.fetch().by_mountpoint(boot_mount)
 
 		if len(lsblk_info) > 0:
 			if lsblk_info[0].size < Size(200, Unit.MiB, SectorSize.default()):
@@ -356,7 +379,7 @@ class Installer:
 		# it would be none if it's btrfs as the subvolumes will have the mountpoints defined
 		if part_mod.mountpoint:
 			target = self.target / part_mod.relative_mountpoint
-			device_handler.mount(part_mod.dev_path, target, options=part_mod.mount_options)
+			device_handler.mount(part_mod.dev_path, target, options=part_mod.mount_options, tune_options=True)
 		elif part_mod.fs_type == FilesystemType.Btrfs:
 			self._mount_btrfs_subvol(
 				part_mod.dev_path,
@@ -370,7 +393,7 @@ class Installer:
 		if volume.fs_type != FilesystemType.Btrfs:
 			if volume.mountpoint and volume.dev_path:
 				target = self.target / volume.relative_mountpoint
-				device_handler.mount(volume.dev_path, target, options=volume.mount_options)
+				device_handler.mount(volume.dev_path, target, options=volume.mount_options, tune_options=True)
 
 		if volume.fs_type == FilesystemType.Btrfs and volume.dev_path:
 			self._mount_btrfs_subvol(volume.dev_path, volume.btrfs_subvols, volume.mount_options)
@@ -383,13 +406,13 @@ class Installer:
 			self._mount_btrfs_subvol(luks_handler.mapper_dev, part_mod.btrfs_subvols, part_mod.mount_options)
 		elif part_mod.mountpoint:
 			target = self.target / part_mod.relative_mountpoint
-			device_handler.mount(luks_handler.mapper_dev, target, options=part_mod.mount_options)
+			device_handler.mount(luks_handler.mapper_dev, target, options=part_mod.mount_options, tune_options=True)
 
 	def _mount_luks_volume(self, volume: LvmVolume, luks_handler: Luks2) -> None:
 		if volume.fs_type != FilesystemType.Btrfs:
 			if volume.mountpoint and luks_handler.mapper_dev:
 				target = self.target / volume.relative_mountpoint
-				device_handler.mount(luks_handler.mapper_dev, target, options=volume.mount_options)
+				device_handler.mount(luks_handler.mapper_dev, target, options=volume.mount_options, tune_options=True)
 
 		if volume.fs_type == FilesystemType.Btrfs and luks_handler.mapper_dev:
 			self._mount_btrfs_subvol(luks_handler.mapper_dev, volume.btrfs_subvols, volume.mount_options)
@@ -403,7 +426,7 @@ class Installer:
 		for subvol in sorted(subvolumes, key=lambda x: x.relative_mountpoint):
 			mountpoint = self.target / subvol.relative_mountpoint
 			options = mount_options + [f'subvol={subvol.name}']
-			device_handler.mount(dev_path, mountpoint, options=options)
+			device_handler.mount(dev_path, mountpoint, options=options, tune_options=True)
 
 	def generate_key_files(self) -> None:
 		match self._disk_encryption.encryption_type:
@@ -417,7 +440,18 @@ class Installer:
 				# so we won't need any keyfile generation atm
 				pass
 
+	def _create_keyfiles(self, luks_handlers: list[Luks2]) -> None:
+		# adding a key slot runs the key derivation for the existing
+		# passphrase and the new key, so the devices are enrolled concurrently
+		entries = map_luks2_concurrently(lambda luks_handler: luks_handler.enroll_keyfile(self.target), luks_handlers)
+
+		# written once all devices are enrolled, in the order of the devices,
+		# so the crypttab doesn't depend on which enrollment finished first
+		append_crypttab(self.target, [entry for entry in entries if entry is not None])
+
 	def _generate_key_files_partitions(self) -> None:
+		keyfile_handlers: list[Luks2] = []
+
 		for part_mod in self._disk_encryption.partitions:
 			gen_enc_file = self._disk_encryption.should_generate_encryption_file(part_mod)
 
@@ -429,7 +463,7 @@ class Installer:
 
 			if gen_enc_file and not part_mod.is_root():
 				debug(f'Creating key-file: {part_mod.dev_path}')
-				luks_handler.create_keyfile(self.target)
+				keyfile_handlers.append(luks_handler)
 
 			if part_mod.is_root() and not gen_enc_file:
 				if self._disk_encryption.hsm_device:
@@ -440,7 +474,11 @@ class Installer:
 							self._disk_encryption.encryption_password,
 						)
 
+		self._create_keyfiles(keyfile_handlers)
+
 	def _generate_key_file_lvm_volumes(self) -> None:
+		keyfile_handlers: list[Luks2] = []
+
 		for vol in self._disk_encryption.lvm_volumes:
 			gen_enc_file = self._disk_encryption.should_generate_encryption_file(vol)
 
@@ -452,7 +490,7 @@ class Installer:
 
 			if gen_enc_file and not vol.is_root():
 				info(f'Creating key-file: {vol.dev_path}')
-				luks_handler.create_keyfile(self.target)
+				keyfile_handlers.append(luks_handler)
 
 			if vol.is_root() and not gen_enc_file:
 				if self._disk_encryption.hsm_device:
@@ -463,6 +501,8 @@ class Installer:
 							self._disk_encryption.encryption_password,
 						)
 
+		self._create_keyfiles(keyfile_handlers)
+
 	def sync_log_to_install_medium(self) -> bool:
 		# Copy over the install log (if there is one) to the install medium if
 		# at least the base has been strapped in, otherwise we won't have a filesystem/structure to copy to.
@@ -482,29 +522,89 @@ class Installer:
 		if len(file.strip()) <= 0 or file == '/':
 			raise ValueError(f'The filename for the swap file has to be a valid path, not: {self.target}{file}')
 
-		SysCommand(f'dd if=/dev/zero of={self.target}{file} bs={size} count=1')
-		SysCommand(f'chmod 0600 {self.target}{file}')
-		SysCommand(f'mkswap {self.target}{file}')
+		swap_file = Path(f'{self.target}{file}')
+
+		# the swap file's directory may not exist yet, look up the closest existing one
+		mount_lookup = next(p for p in swap_file.parents if p.exists())
+		fs_type, resume_uuid = self._swap_filesystem(mount_lookup)
+
+		if fs_type == 'btrfs':
+			# swap files can't be on a subvolume that gets snapshotted,
+			# so a new directory for the swap file becomes its own subvolume
+			if not swap_file.parent.exists():
+				SysCommand(['btrfs', 'subvolume', 'create', str(swap_file.parent)])
+
+			# creates a NOCOW, uncompressed and preallocated swap file
+			SysCommand(['btrfs', 'filesystem', 'mkswapfile', '--size', size, str(swap_file)])
+		else:
+			swap_file.parent.mkdir(parents=True, exist_ok=True)
+			self._allocate_file(swap_file, self._parse_swap_size(size))
+			SysCommand(['mkswap', str(swap_file)])
 
 		self._fstab_entries.append(f'{file} none swap defaults 0 0')
 
+		if enable_resume and not resume_uuid:
+			warn(f'The filesystem of {swap_file} has no UUID, resuming from the swap file is not configured')
+			enable_resume = False
+
 		if enable_resume:
-			resume_uuid = SysCommand(f'findmnt -no UUID -T {self.target}{file}').decode()
-			resume_offset = (
-				SysCommand(
-					f'filefrag -v {self.target}{file}',
-				)
-				.decode()
-				.split('0:', 1)[1]
-				.split(':', 1)[1]
-				.split('..', 1)[0]
-				.strip()
-			)
+			if fs_type == 'btrfs':
+				# the FIEMAP offsets of btrfs are logical addresses, not offsets on the device
+				resume_offset = int(SysCommand(['btrfs', 'inspect-internal', 'map-swapfile', '-r', str(swap_file)]).decode())
+			else:
+				resume_offset = get_physical_offset(swap_file) // os.sysconf('SC_PAGE_SIZE')
 
 			self._hooks.append('resume')
 			self._kernel_params.append(f'resume=UUID={resume_uuid}')
 			self._kernel_params.append(f'resume_offset={resume_offset}')
 
+	@staticmethod
+	def _swap_filesystem(path: Path) -> tuple[str, str | None]:
+		"""
+		The type and UUID of the filesystem the path is on,
+		filesystems such as tmpfs have no UUID
+		"""
+		output = SysCommand(['findmnt', '-J', '-o', 'FSTYPE,UUID', '-T', str(path)]).decode()
+		filesystem = json.loads(output)['filesystems'][0]
+
+		return filesystem['fstype'], filesystem.get('uuid') or None
+
+	@staticmethod
+	def _parse_swap_size(size: str) -> int:
+		"""
+		Parses sizes such as 512M, 4G or 4GiB into bytes
+		"""
+		if not (match := re.fullmatch(r'(\d+)\s*([KMGT]?)(?:i?B)?', size.strip(), re.IGNORECASE)):
+			raise ValueError(f'Invalid swap file size: {size}')
+
+		value, unit = match.groups()
+		exponent = ' KMGT'.index(unit.upper() or ' ')
+
+		return int(value) * 1024**exponent
+
+	@staticmethod
+	def _allocate_file(path: Path, size: int) -> None:
+		fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+
+		try:
+			os.fchmod(fd, 0o600)
+
+			try:
+				os.posix_fallocate(fd, 0, size)
+			except OSError as err:
+				debug(f'Unable to preallocate {path}, writing it instead: {err}')
+
+				# write zeroes in small chunks so the memory usage doesn't depend on the size
+				chunk = bytes(1024 * 1024)
+				written = 0
+
+				while written < size:
+					written += os.write(fd, chunk[: size - written])
+
+			os.fsync(fd)
+		finally:
+			os.close(fd)
+
 	def post_install_check(self, *args: str, **kwargs: str) -> list[str]:
 		return [step for step, flag in self._helper_flags.items() if flag is False]
 
@@ -556,6 +656,13 @@ class Installer:
 			content = mirrorlist_config.read_text()
 			mirrorlist_config.write_text(f'{custom_servers}\n\n{content}')
 
+		if on_target:
+			from .mirrors import mirror_list_handler
+
+			# keep the mirror status and rankings of this session
+			# so the next archinstall run on the target can reuse them
+			mirror_list_handler.cache.save_to_target(self.target)
+
 	def genfstab(self, flags: str = '-pU') -> None:
 		fstab_path = self.target / 'etc' / 'fstab'
 		info(f'Updating {fstab_path}')
@@ -763,6 +870,88 @@ class Installer:
 
 		return True
 
+	def _target_user_ids(self, username: str) -> tuple[int, int] | None:
+		"""
+		The uid and gid of a user on the target, read from its /etc/passwd
+		and /etc/group so files can be created with them right away. The
+		group named after the user is preferred over the primary group.
+		"""
+		uid = gid = None
+
+		try:
+			for line in (self.target / 'etc' / 'passwd').read_text().splitlines():
+				fields = line.split(':')
+				if len(fields) > 3 and fields[0] == username:
+					uid, gid = int(fields[2]), int(fields[3])
+					break
+
+			for line in (self.target / 'etc' / 'group').read_text().splitlines():
+				fields = line.split(':')
+				if len(fields) > 2 and fields[0] == username:
+					gid = int(fields[2])
+					break
+		except (OSError, ValueError) as err:
+			debug(f'Unable to read the accounts of the target: {err}')
+			return None
+
+		if uid is None or gid is None:
+			return None
+
+		return uid, gid
+
+	def _target_is_btrfs(self) -> bool:
+		if self._btrfs_target is None:
+			try:
+				fs_type = SysCommand(['findmnt', '-no', 'FSTYPE', '-T', str(self.target)]).decode().strip()
+			except SysCallError:
+				fs_type = ''
+
+			self._btrfs_target = fs_type == 'btrfs'
+
+		return self._btrfs_target
+
+	def copy_engine(self, manifest: SyncManifest | None = None) -> CopyEngine:
+		"""
+		A copy engine for copying to the target, identical files are
+		deduplicated across all copies if enabled with --dedup-copies.
+		On btrfs, copies between subvolumes of the target are reflinked.
+		"""
+		return CopyEngine(manifest=manifest, dedup=self._deduplicator, reflink=self._target_is_btrfs())
+
+	def seed_store(self) -> SeedStore | None:
+		"""
+		A store for staging content copied to several destinations once on
+		a btrfs target, from which the destinations are reflinked
+		"""
+		if not self._target_is_btrfs():
+			return None
+
+		return SeedStore(self.target / 'var/lib/archinstall/seed')
+
+	@property
+	def _sync_manifest_dir(self) -> Path:
+		return self.target / 'var' / 'lib' / 'archinstall' / 'sync'
+
+	def _sync_manifest(self, name: str) -> SyncManifest:
+		"""
+		The manifest of the files copied to the target by install-from-ISO.
+		It is kept on the target until the installation has completed, so
+		re-running an interrupted installation on it only copies what has
+		changed and an interrupted copy is resumed.
+		"""
+		filename = name.strip('/').replace('/', '-') or 'root'
+		return SyncManifest(self._sync_manifest_dir / f'{filename}.json')
+
+	def _remove_sync_manifests(self) -> None:
+		# the installed system has no use for the list of copied live files
+		shutil.rmtree(self._sync_manifest_dir, ignore_errors=True)
+
+		try:
+			self._sync_manifest_dir.parent.rmdir()
+		except OSError:
+			# other state is kept in it
+			pass
+
 	def _primary_user(self, users: list[User]) -> User | None:
 		if not users:
 			return None
@@ -796,51 +985,8 @@ class Installer:
 		home_dir = Path.home()
 		return home_dir if home_dir.exists() else None
 
-	def _should_exclude(self, rel_path: str, abs_path: Path, exclude_patterns: list[str]) -> bool:
-		for pattern in exclude_patterns:
-			if pattern.startswith('/'):
-				base_pat = pattern[:-3] if pattern.endswith('/**') else pattern
-				if fnmatch.fnmatch(str(abs_path), pattern) or str(abs_path).startswith(base_pat.rstrip('/') + '/'):
-					return True
-				continue
-
-			pat = pattern.lstrip('/')
-			if pat.endswith('/**'):
-				base_pat = pat[:-3]
-				if rel_path == base_pat or rel_path.startswith(base_pat.rstrip('/') + '/'):
-					return True
-			if fnmatch.fnmatch(rel_path, pat):
-				return True
-
-		return False
-
 	def _gather_home_paths(self, source: Path, include_patterns: list[str]) -> list[Path]:
-		paths: set[Path] = set()
-
-		for pattern in include_patterns:
-			if pattern.startswith('/'):
-				abs_path = Path(pattern)
-				if abs_path.exists() and abs_path.is_relative_to(source):
-					paths.add(abs_path)
-				continue
-
-			pat = pattern.lstrip('./')
-			for match in source.glob(pat):
-				try:
-					match.relative_to(source)
-				except ValueError:
-					continue
-				paths.add(match)
-
-		sorted_paths = sorted(paths, key=lambda p: (len(p.as_posix().split('/')), p.as_posix()))
-
-		minimized: list[Path] = []
-		for path in sorted_paths:
-			if any(parent in path.parents for parent in minimized):
-				continue
-			minimized.append(path)
-
-		return minimized
+		return expand_includes(source, include_patterns)
 
 	def _copy_home_contents(
 		self,
@@ -849,6 +995,8 @@ class Installer:
 		description: str,
 		include: list[str] | None = None,
 		exclude: list[str] | None = None,
+		owner: tuple[int, int] | None = None,
+		archive_root: str | None = None,
 	) -> None:
 		if not source.exists():
 			debug(f'{description}: source path {source} not found, skipping')
@@ -860,42 +1008,72 @@ class Installer:
 		info(f'{description}: copying from {source} to {destination}')
 		destination.mkdir(parents=True, exist_ok=True)
 
-		def ignore_func(base: Path) -> Callable[[str, list[str]], list[str]]:
-			def _ignore(dir_path: str, names: list[str]) -> list[str]:
-				ignored: list[str] = []
-				for name in names:
-					full = Path(dir_path) / name
-					try:
-						rel = full.relative_to(base).as_posix()
-					except ValueError:
-						continue
-					if self._should_exclude(rel, full, exclude_patterns):
-						ignored.append(name)
-				return ignored
+		if owner:
+			os.chown(destination, *owner)
 
-			return _ignore
+		excluded = PathMatcher(exclude_patterns, source)
+		manifest = self._sync_manifest(destination.relative_to(self.target).as_posix())
+		engine = self.copy_engine(manifest)
 
 		for match in self._gather_home_paths(source, include_patterns):
 			try:
-				rel = match.relative_to(source).as_posix()
+				rel = match.relative_to(source).as_posix() if match != source else ''
 			except ValueError:
 				continue
 
-			if self._should_exclude(rel, match, exclude_patterns):
+			if excluded(rel, match.is_dir()):
 				debug(f'{description}: skipping {match} (excluded)')
 				continue
 
-			target = destination / rel
-			try:
-				if match.is_dir() and not match.is_symlink():
-					shutil.copytree(match, target, symlinks=True, dirs_exist_ok=True, ignore=ignore_func(source))
-				else:
-					target.parent.mkdir(parents=True, exist_ok=True)
-					if target.exists() and target.is_dir() and not target.is_symlink():
-						shutil.rmtree(target)
-					shutil.copy2(match, target, follow_symlinks=False)
-			except Exception as err:
-				warn(f'Unable to copy {match} to {target}: {err}')
+			engine.add(match, destination / rel, exclude=excluded, rel=rel, owner=owner)
+
+		self._run_copy(engine, manifest, description, destination, archive_root)
+
+	def _run_copy(
+		self,
+		engine: CopyEngine,
+		manifest: SyncManifest,
+		description: str,
+		destination: Path,
+		archive_root: str | None = None,
+	) -> None:
+		"""
+		Report the size of a planned copy and run it with progress, with a
+		warning if it may not fit on the target. Files copied by a previous
+		run are overwritten, so their space is available as well.
+		When exporting an archive, the planned entries are added to it.
+		"""
+		roots = engine.plan()
+		files = sum(root.files for root in roots)
+		total = sum(root.bytes for root in roots)
+
+		for root in roots:
+			info(f'{description}: {root.source}: {root.files} files, {format_bytes(root.bytes)}')
+
+		free = shutil.disk_usage(destination).free + manifest.recorded_bytes
+
+		# the estimate is an upper bound (sparse files, filesystem compression),
+		# so the copy is attempted anyway rather than dropping the files
+		if total > free:
+			warn(f'{description}: up to {format_bytes(total)} required but only {format_bytes(free)} available on the target, the copy may be incomplete')
+
+		info(f'{description}: {files} files, {format_bytes(total)} in total')
+
+		if self._iso_archive:
+			if archive_root is None:
+				archive_root = destination.relative_to(self.target).as_posix()
+				archive_root = '' if archive_root == '.' else archive_root
+
+			self._iso_archive.add(engine.entries, destination, archive_root)
+
+		stats = engine.run(CopyProgress(description, files, total))
+		info(f'{description}: copied {stats.files} files ({format_bytes(stats.bytes)}), {stats.skipped} already up to date')
+
+		if stats.deduplicated:
+			info(f'{description}: {stats.deduplicated} files share the data of identical files')
+
+		if stats.failed:
+			warn(f'{description}: {stats.failed} files could not be copied')
 
 	def copy_root_home(self, include: list[str] | None = None, exclude: list[str] | None = None) -> None:
 		self._copy_home_contents(Path('/root'), self.target / 'root', 'Syncing root home', include, exclude)
@@ -914,13 +1092,20 @@ class Installer:
 			debug('No live user home detected, skipping copy to target user')
 			return
 
-		target_home = self.target / 'home' / primary_user.username
-		self._copy_home_contents(source_home, target_home, f'Copying live home to /home/{primary_user.username}', include, exclude)
+		if (owner := self._target_user_ids(primary_user.username)) is None:
+			warn(f'Unable to find {primary_user.username} on the target, skipping live user home sync')
+			return
 
-		try:
-			self.arch_chroot(f'chown -R {primary_user.username}:{primary_user.username} /home/{primary_user.username}')
-		except SysCallError as err:
-			warn(f'Failed to update ownership for /home/{primary_user.username}: {err}')
+		target_home = self.target / 'home' / primary_user.username
+		self._copy_home_contents(
+			source_home,
+			target_home,
+			f'Copying live home to /home/{primary_user.username}',
+			include,
+			exclude,
+			owner=owner,
+			archive_root=USER_HOME,
+		)
 
 	def add_live_iso_packages(self) -> list[str]:
 		try:
@@ -973,20 +1158,59 @@ class Installer:
 		# Install packages from the live ISO first to avoid file conflicts with /etc/skel.
 		self.add_live_iso_packages()
 
-		self._copy_extra_paths(cfg.get('extra_paths', []))
+		args = arch_config_handler.args
+
+		if args.iso_archive:
+			self._extract_iso_archive(args.iso_archive, users)
+			self._populate_users_from_skel(users)
+			return
+
+		if args.iso_archive_export:
+			self._iso_archive = ArchiveWriter(args.iso_archive_export)
+
+		try:
+			with self._iso_archive or nullcontext():
+				self._copy_extra_paths(cfg.get('extra_paths', []))
+
+				self.copy_root_home(
+					include=root_cfg.get('include', ['*']),
+					exclude=root_cfg.get('exclude', []),
+				)
+				self.copy_live_user_home(
+					users,
+					include=user_cfg.get('include', ['*']),
+					exclude=user_cfg.get('exclude', []),
+				)
+		finally:
+			self._iso_archive = None
 
-		self.copy_root_home(
-			include=root_cfg.get('include', ['*']),
-			exclude=root_cfg.get('exclude', []),
-		)
-		self.copy_live_user_home(
-			users,
-			include=user_cfg.get('include', ['*']),
-			exclude=user_cfg.get('exclude', []),
-		)
 		self._populate_users_from_skel(users)
 
+	def _extract_iso_archive(self, archive: Path, users: list[User]) -> None:
+		"""
+		Apply an archive exported by a previous install from ISO instead of
+		copying from the live system, the live user home it contains goes
+		to the primary user
+		"""
+		user_home = None
+		owner = None
+
+		if primary_user := self._primary_user(users):
+			if (owner := self._target_user_ids(primary_user.username)) is not None:
+				user_home = f'home/{primary_user.username}'
+			else:
+				warn(f'Unable to find {primary_user.username} on the target, skipping the live user home')
+
+		try:
+			extract_archive(archive, self.target, user_home, owner)
+		except (OSError, SysCallError, tarfile.TarError) as err:
+			warn(f'Unable to extract {archive}: {err}')
+
 	def _copy_extra_paths(self, entries: list[dict[str, str]]) -> None:
+		manifest = self._sync_manifest('extra_paths')
+		engine = self.copy_engine(manifest)
+		paths: list[tuple[Path, Path]] = []
+
 		for entry in entries:
 			source = Path(entry.get('source', ''))
 			destination = entry.get('destination', '')
@@ -1004,15 +1228,20 @@ class Installer:
 			else:
 				dest_path = self.target / dest_path
 
-			info(f'Copying extra path {source} to {dest_path}')
-			try:
-				if source.is_dir() and not source.is_symlink():
-					shutil.copytree(source, dest_path, symlinks=True, dirs_exist_ok=True)
-				else:
-					dest_path.parent.mkdir(parents=True, exist_ok=True)
-					shutil.copy2(source, dest_path, follow_symlinks=False)
-			except Exception as err:
-				warn(f'Unable to copy extra path {source} to {dest_path}: {err}')
+			paths.append((source, dest_path))
+
+		# a source copied to several destinations is only read from the live system once
+		shared = shared_sources([source for source, _ in paths])
+		store = self.seed_store() if shared else None
+
+		with store or nullcontext():
+			staged = store.stage(shared) if store else {}
+
+			for source, dest_path in paths:
+				info(f'Copying extra path {source} to {dest_path}')
+				engine.add(staged.get(source, source), dest_path)
+
+			self._run_copy(engine, manifest, 'Copying extra paths', self.target)
 
 	def _populate_users_from_skel(self, users: list[User]) -> None:
 		if not users:
@@ -1023,37 +1252,23 @@ class Installer:
 			debug('No /etc/skel present on target, skipping skel population')
 			return
 
+		# the skel is walked once and copied to all homes at the same time,
+		# on btrfs the homes are reflinked from it
+		skel_entries = scan_tree(skel_path)
+		engine = self.copy_engine()
+
 		for user in users:
 			home = self.target / 'home' / user.username
 			if not home.exists():
 				continue
 
-			for root, dirs, files in os.walk(skel_path):
-				root_path = Path(root)
-				for name in dirs + files:
-					src = root_path / name
-					try:
-						rel = src.relative_to(skel_path)
-					except ValueError:
-						continue
-
-					dst = home / rel
-					if dst.exists():
-						continue
+			if (owner := self._target_user_ids(user.username)) is None:
+				warn(f'Unable to find {user.username} on the target, skipping skel population')
+				continue
 
-					try:
-						if src.is_dir() and not src.is_symlink():
-							dst.mkdir(parents=True, exist_ok=True)
-						else:
-							dst.parent.mkdir(parents=True, exist_ok=True)
-							shutil.copy2(src, dst, follow_symlinks=False)
-					except Exception as err:
-						warn(f'Failed to copy skel entry {src} to {dst}: {err}')
+			engine.add_scanned(skel_path, skel_entries, home, owner=owner, skip_existing=True)
 
-			try:
-				self.arch_chroot(f'chown -R {user.username}:{user.username} /home/{user.username}')
-			except SysCallError as err:
-				warn(f'Failed to update ownership after skel copy for {user.username}: {err}')
+		engine.run()
 
 	def _install_from_iso_config_path(self, mode: str) -> Path:
 		filename = 'install_from_iso_cache.json' if mode == 'configs_cache' else 'install_from_iso.json'
@@ -1291,8 +1506,14 @@ class Installer:
 		steps = [
 			('recv-key', lambda: self.arch_chroot('pacman-key --recv-key 3056513887B78AEB --keyserver keyserver.ubuntu.com', peek_output=True)),
 			('lsign-key', lambda: self.arch_chroot('pacman-key --lsign-key 3056513887B78AEB', peek_output=True)),
-			('install-keyring', lambda: self.arch_chroot("pacman -U 'https://cdn-mirror.chaotic.cx/chaotic-aur/chaotic-keyring.pkg.tar.zst' --noconfirm", peek_output=True)),
-			('install-mirrorlist', lambda: self.arch_chroot("pacman -U 'https://cdn-mirror.chaotic.cx/chaotic-aur/chaotic-mirrorlist.pkg.tar.zst' --noconfirm", peek_output=True)),
+			(
+				'install-keyring',
+				lambda: self.arch_chroot("pacman -U 'https://cdn-mirror.chaotic.cx/chaotic-aur/chaotic-keyring.pkg.tar.zst' --noconfirm", peek_output=True),
+			),
+			(
+				'install-mirrorlist',
+				lambda: self.arch_chroot("pacman -U 'https://cdn-mirror.chaotic.cx/chaotic-aur/chaotic-mirrorlist.pkg.tar.zst' --noconfirm", peek_output=True),
+			),
 		]
 
 		for key, func in steps:
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 from archinstall.lib.args import arch_config_handler
+from archinstall.lib.disk.alignment import align_partitions
 from archinstall.lib.disk.device_handler import device_handler
 from archinstall.lib.disk.partitioning_menu import manual_partitioning
 from archinstall.lib.menu.menu_helper import MenuHelper
@@ -434,6 +435,8 @@ def suggest_single_disk_layout(
 		)
 		device_modification.add_partition(home_partition)
 
+	align_partitions(device_modification)
+
 	return device_modification
 
 
@@ -544,6 +547,9 @@ def suggest_multi_disk_layout(
 	)
 	home_device_modification.add_partition(home_partition)
 
+	align_partitions(root_device_modification)
+	align_partitions(home_device_modification)
+
 	return [root_device_modification, home_device_modification]
 
 
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import os
 import shlex
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from subprocess import CalledProcessError
@@ -11,9 +14,54 @@ from archinstall.lib.models.device import DEFAULT_ITER_TIME
 
 from .exceptions import DiskError, SysCallError
 from .general import SysCommand, SysCommandWorker, generate_password, run
+from .hardware import SysInfo
 from .models.users import Password
 from .output import debug, info
 
+# cryptsetup limits the argon2id memory cost to 1 GiB (in KiB)
+# or half of the physical memory, whichever is lower
+_ARGON2_MAX_MEMORY = 1024 * 1024
+# and uses up to 4 threads for each key derivation
+_ARGON2_MAX_THREADS = 4
+
+
+def luks2_parallelism(count: int) -> int:
+	"""
+	Returns how many luks2 key derivations (luksFormat, open, luksAddKey)
+	can run at the same time for the given number of devices.
+
+	Every argon2id run allocates its full memory cost, so the number of
+	concurrent runs is limited by the available memory. It's also limited
+	by the CPUs, as cryptsetup benchmarks the key derivation for the given
+	iter time and would choose weaker parameters if the runs competed for them.
+	The available memory is read when called, so memory taken by formatting
+	that is already running is accounted for.
+	"""
+	memory_cost = min(_ARGON2_MAX_MEMORY, SysInfo.mem_total() // 2)
+	by_memory = SysInfo.mem_available() // max(memory_cost, 1)
+	by_cpu = (os.cpu_count() or 1) // _ARGON2_MAX_THREADS
+
+	return max(1, min(count, by_memory, by_cpu))
+
+
+def map_luks2_concurrently[T, R](action: Callable[[T], R], items: list[T]) -> list[R]:
+	"""
+	Run a luks2 operation for all items and return the results in order,
+	running as many of them at the same time as luks2_parallelism() allows.
+	"""
+	max_workers = luks2_parallelism(len(items))
+
+	if max_workers <= 1:
+		return [action(item) for item in items]
+
+	debug(f'Running luks2 operations for {len(items)} devices, {max_workers} at a time')
+
+	with ThreadPoolExecutor(max_workers=max_workers) as executor:
+		futures = [executor.submit(action, item) for item in items]
+
+	# all operations have finished at this point, re-raise the first failure
+	return [future.result() for future in futures]
+
 
 @dataclass
 class Luks2:
@@ -184,6 +232,15 @@ class Luks2:
 		"""
 		Routine to create keyfiles, so it can be moved elsewhere
 		"""
+		if (entry := self.enroll_keyfile(target_path, override)) is not None:
+			append_crypttab(target_path, [entry])
+
+	def enroll_keyfile(self, target_path: Path, override: bool = False) -> str | None:
+		"""
+		Create a key file on the target and add it to a key slot, without
+		touching the crypttab. Returns the crypttab entry for the key file,
+		or None if an existing key file was kept.
+		"""
 		if self.mapper_name is None:
 			raise ValueError('Mapper name must be provided')
 
@@ -191,12 +248,11 @@ class Luks2:
 		# automatically load this key if we name the device to "xyzloop"
 		kf_path = Path(f'/etc/cryptsetup-keys.d/{self.mapper_name}.key')
 		key_file = target_path / kf_path.relative_to(kf_path.root)
-		crypttab_path = target_path / 'etc/crypttab'
 
 		if key_file.exists():
 			if not override:
 				info(f'Key file {key_file} already exists, keeping existing')
-				return
+				return None
 			else:
 				info(f'Key file {key_file} already exists, overriding')
 
@@ -208,7 +264,7 @@ class Luks2:
 		key_file.chmod(0o400)
 
 		self._add_key(key_file)
-		self._crypttab(crypttab_path, kf_path, options=['luks', 'key-slot=1'])
+		return self._crypttab_entry(kf_path, options=['luks', 'key-slot=1'])
 
 	def _add_key(self, key_file: Path) -> None:
 		debug(f'Adding additional key-file {key_file}')
@@ -225,16 +281,18 @@ class Luks2:
 		if worker.exit_code != 0:
 			raise DiskError(f'Could not add encryption key {key_file} to {self.luks_dev_path}: {worker.decode()}')
 
-	def _crypttab(
+	def _crypttab_entry(
 		self,
-		crypttab_path: Path,
 		key_file: Path,
 		options: list[str],
-	) -> None:
+	) -> str:
 		debug(f'Adding crypttab entry for key {key_file}')
 
-		with open(crypttab_path, 'a') as crypttab:
-			opt = ','.join(options)
-			uuid = self._get_luks_uuid()
-			row = f'{self.mapper_name} UUID={uuid} {key_file} {opt}\n'
-			crypttab.write(row)
+		opt = ','.join(options)
+		uuid = self._get_luks_uuid()
+		return f'{self.mapper_name} UUID={uuid} {key_file} {opt}\n'
+
+
+def append_crypttab(target_path: Path, entries: list[str]) -> None:
+	with open(target_path / 'etc/crypttab', 'a') as crypttab:
+		crypttab.writelines(entries)
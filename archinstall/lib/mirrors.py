@@ -1,7 +1,12 @@
+import json
+import os
+import tempfile
+import threading
 import time
 import urllib.parse
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import override
+from typing import Any, NotRequired, TypedDict, override
 
 from archinstall.lib.translationhandler import tr
 from archinstall.tui.curses_menu import EditMenu, SelectMenu, Tui
@@ -17,7 +22,6 @@ from .models.mirrors import (
 	MirrorConfiguration,
 	MirrorRegion,
 	MirrorStatusEntryV3,
-	MirrorStatusListV3,
 	SignCheck,
 	SignOption,
 )
@@ -377,28 +381,234 @@ def select_optional_repositories(preset: list[Repository]) -> list[Repository]:
 			return result.get_values()
 
 
+class _MirrorMeasurementSerialization(TypedDict):
+	measured_at: float
+	speed: NotRequired[float]
+	latency: NotRequired[float]
+
+
+class _MirrorStatusSerialization(TypedDict):
+	fetched_at: float
+	document: str
+
+
+class _MirrorRankingSerialization(TypedDict):
+	ranked_at: float
+	urls: list[str]
+
+
+class _MirrorCacheSerialization(TypedDict):
+	version: int
+	status: NotRequired[_MirrorStatusSerialization]
+	measurements: dict[str, _MirrorMeasurementSerialization]
+	rankings: NotRequired[dict[str, _MirrorRankingSerialization]]
+
+
+class MirrorCache:
+	"""
+	Keeps the archlinux.org mirror status document, the measured mirror
+	speeds and latencies and the resulting ranking of each region on disk
+	between sessions. All are stored with a timestamp and are only reused
+	within their TTL.
+	"""
+
+	version = 1
+
+	def __init__(
+		self,
+		path: Path = Path('/var/cache/archinstall/mirrors.json'),
+		status_ttl: int = 60 * 60,
+		measurement_ttl: int = 6 * 60 * 60,
+	) -> None:
+		self.path = path
+		self.status_ttl = status_ttl
+		self.measurement_ttl = measurement_ttl
+		self._data: _MirrorCacheSerialization | None = None
+		self._lock = threading.Lock()
+
+	def _cache(self) -> _MirrorCacheSerialization:
+		if self._data is None:
+			self._data = self._read()
+
+		return self._data
+
+	def _read(self) -> _MirrorCacheSerialization:
+		empty: _MirrorCacheSerialization = {'version': self.version, 'measurements': {}}
+
+		try:
+			data = json.loads(self.path.read_text())
+		except FileNotFoundError:
+			return empty
+		except (OSError, ValueError) as e:
+			debug(f'Ignoring unreadable mirror cache {self.path}: {e}')
+			return empty
+
+		if not isinstance(data, dict) or data.get('version') != self.version:
+			return empty
+
+		cached: _MirrorCacheSerialization = data  # type: ignore[assignment]
+		return cached
+
+	def _is_fresh(self, timestamp: float, ttl: int) -> bool:
+		return 0 <= time.time() - timestamp < ttl
+
+	def get_status(self) -> str | None:
+		with self._lock:
+			status = self._cache().get('status')
+
+		if status and self._is_fresh(status['fetched_at'], self.status_ttl):
+			debug(f'Using cached mirror status from {self.path}')
+			return status['document']
+
+		return None
+
+	def set_status(self, document: str) -> None:
+		with self._lock:
+			self._cache()['status'] = {'fetched_at': time.time(), 'document': document}
+
+	def apply_measurements(self, mirrors: list[MirrorStatusEntryV3]) -> None:
+		"""
+		Pre-populate the speed and latency of mirrors which
+		have been measured recently, so they aren't tested again.
+		"""
+		with self._lock:
+			measurements = self._cache()['measurements']
+
+			for mirror in mirrors:
+				measurement = measurements.get(mirror.url)
+
+				if not measurement or not self._is_fresh(measurement['measured_at'], self.measurement_ttl):
+					continue
+
+				if 'speed' in measurement:
+					mirror._speed = measurement['speed']
+				if 'latency' in measurement:
+					mirror._latency = measurement['latency']
+
+	def record_measurements(self, mirrors: list[MirrorStatusEntryV3]) -> None:
+		"""
+		Store the speed and latency of mirrors that were measured successfully.
+		"""
+		now = time.time()
+
+		with self._lock:
+			measurements = self._cache()['measurements']
+
+			for mirror in mirrors:
+				measurement: _MirrorMeasurementSerialization = {'measured_at': now}
+
+				if mirror._speed:
+					measurement['speed'] = mirror._speed
+				if mirror._latency is not None and mirror._latency >= 0:
+					measurement['latency'] = mirror._latency
+
+				if len(measurement) > 1:
+					measurements[mirror.url] = measurement
+
+	def get_ranking(self, region: str) -> list[str] | None:
+		"""
+		The mirror URLs of a region ranked by a recent session, best first
+		"""
+		with self._lock:
+			ranking = self._cache().get('rankings', {}).get(region)
+
+		if ranking and self._is_fresh(ranking['ranked_at'], self.measurement_ttl):
+			return ranking['urls']
+
+		return None
+
+	def set_ranking(self, region: str, mirrors: list[MirrorStatusEntryV3]) -> None:
+		with self._lock:
+			rankings = self._cache().setdefault('rankings', {})
+			rankings[region] = {'ranked_at': time.time(), 'urls': [mirror.url for mirror in mirrors]}
+
+	def save(self, path: Path | None = None) -> None:
+		path = path or self.path
+
+		# the background refresh saves as well, the lock is held until the
+		# file is replaced so concurrent saves can't interleave their writes
+		with self._lock:
+			content = json.dumps(self._cache())
+			tmp_path: Path | None = None
+
+			try:
+				path.parent.mkdir(parents=True, exist_ok=True)
+
+				with tempfile.NamedTemporaryFile('w', dir=path.parent, prefix=f'.{path.name}.', delete=False) as tmp:
+					tmp_path = Path(tmp.name)
+					tmp.write(content)
+
+				os.replace(tmp_path, path)
+			except OSError as e:
+				debug(f'Unable to write mirror cache {path}: {e}')
+
+				if tmp_path:
+					tmp_path.unlink(missing_ok=True)
+
+	def save_to_target(self, target: Path) -> None:
+		"""
+		Store the mirror status, measurements and rankings of this session
+		on the target, where the next session reads them from the same path
+		"""
+		self.save(target / self.path.relative_to(self.path.anchor))
+
+
+@dataclass
+class _RegionMirrors:
+	"""
+	The mirrors of a single region. For the remote mirror list only the
+	raw archweb entries are kept, the MirrorStatusEntryV3 models are built
+	the first time the region is actually used.
+	"""
+
+	raw: list[dict[str, Any]] = field(default_factory=list)
+	entries: list[MirrorStatusEntryV3] | None = None
+
+	@property
+	def urls(self) -> list[str]:
+		if self.entries is not None:
+			return [entry.server_url for entry in self.entries]
+
+		return [MirrorStatusEntryV3.format_server_url(raw['url']) for raw in self.raw]
+
+
 class MirrorListHandler:
 	def __init__(
 		self,
 		local_mirrorlist: Path = Path('/etc/pacman.d/mirrorlist'),
+		cache: MirrorCache | None = None,
 	) -> None:
 		self._local_mirrorlist = local_mirrorlist
-		self._status_mappings: dict[str, list[MirrorStatusEntryV3]] | None = None
+		self._status_mappings: dict[str, _RegionMirrors] | None = None
+		self._remote_loaded = False
+		self._refresh_thread: threading.Thread | None = None
+		self.cache = cache or MirrorCache()
 
-	def _mappings(self) -> dict[str, list[MirrorStatusEntryV3]]:
+	def _mappings(self) -> dict[str, _RegionMirrors]:
 		if self._status_mappings is None:
 			self.load_mirrors()
 
 		assert self._status_mappings is not None
 		return self._status_mappings
 
+	def _region_entries(self, region: str) -> list[MirrorStatusEntryV3]:
+		region_mirrors = self._mappings()[region]
+
+		if region_mirrors.entries is None:
+			entries = [MirrorStatusEntryV3.model_validate(raw) for raw in region_mirrors.raw]
+			self.cache.apply_measurements(entries)
+
+			region_mirrors.entries = entries
+			region_mirrors.raw = []
+
+		return region_mirrors.entries
+
 	def get_mirror_regions(self) -> list[MirrorRegion]:
 		available_mirrors = []
 		mappings = self._mappings()
 
-		for region_name, status_entry in mappings.items():
-			urls = [entry.server_url for entry in status_entry]
-			region = MirrorRegion(region_name, urls)
+		for region_name, region_mirrors in mappings.items():
+			region = MirrorRegion(region_name, region_mirrors.urls)
 			available_mirrors.append(region)
 
 		return available_mirrors
@@ -409,21 +619,53 @@ class MirrorListHandler:
 		if arch_config_handler.args.offline:
 			self.load_local_mirrors()
 		else:
+			# a background refresh may already be fetching the list
+			if self._refresh_thread is not None:
+				self._refresh_thread.join()
+
+			if self._remote_loaded:
+				return
+
 			if not self.load_remote_mirrors():
 				self.load_local_mirrors()
 
+	def refresh_in_background(self) -> None:
+		"""
+		Fetch the remote mirror list in a background thread (or
+		load it from the cache) while the user is still in the menus,
+		so that opening the mirror menu doesn't have to wait for it.
+		"""
+		if self._refresh_thread is not None or self._remote_loaded:
+			return
+
+		self._refresh_thread = threading.Thread(
+			target=self.load_remote_mirrors,
+			name='mirror-refresh',
+			daemon=True,
+		)
+		self._refresh_thread.start()
+
 	def load_remote_mirrors(self) -> bool:
 		url = 'https://archlinux.org/mirrors/status/json/'
-		attempts = 3
 
-		for attempt_nr in range(attempts):
+		if mirrorlist := self.cache.get_status():
 			try:
-				mirrorlist = fetch_data_from_url(url)
 				self._status_mappings = self._parse_remote_mirror_list(mirrorlist)
+				self._remote_loaded = True
 				return True
 			except Exception as e:
-				debug(f'Error while fetching mirror list: {e}')
-				time.sleep(attempt_nr + 1)
+				debug(f'Error while parsing cached mirror list: {e}')
+
+		# retries with backoff are handled by the http client
+		try:
+			mirrorlist = fetch_data_from_url(url)
+			self._status_mappings = self._parse_remote_mirror_list(mirrorlist)
+			self._remote_loaded = True
+			self.cache.set_status(mirrorlist)
+			self.cache.save()
+			return True
+		except Exception as e:
+			debug(f'Error while fetching mirror list: {e}')
 
 		debug('Unable to fetch mirror list remotely, falling back to local mirror list')
 		return False
@@ -434,51 +676,75 @@ class MirrorListHandler:
 			self._status_mappings = self._parse_locale_mirrors(mirrorlist)
 
 	def get_status_by_region(self, region: str, speed_sort: bool) -> list[MirrorStatusEntryV3]:
-		mappings = self._mappings()
-		region_list = mappings[region]
-		return sorted(region_list, key=lambda mirror: (mirror.score, mirror.speed))
+		region_list = self._region_entries(region)
+
+		if (ranking := self.cache.get_ranking(region)) is not None:
+			debug(f'Using cached mirror ranking of {region}')
+			# mirrors that weren't ranked before go last
+			position = {url: index for index, url in enumerate(ranking)}
+			return sorted(region_list, key=lambda mirror: position.get(mirror.url, len(position)))
+
+		# all mirrors of the region are pinged at once, the ones that
+		# didn't answer are ranked after those with the same score
+		MirrorStatusEntryV3.measure_latencies(region_list)
+		sorted_list = sorted(region_list, key=lambda mirror: (mirror.score, (mirror._latency or 0) < 0, mirror.speed))
+
+		self.cache.record_measurements(region_list)
+		self.cache.set_ranking(region, sorted_list)
+		self.cache.save()
+
+		return sorted_list
+
+	def _parse_remote_mirror_list(self, mirrorlist: str) -> dict[str, _RegionMirrors]:
+		# The status document contains every mirror worldwide, most of which
+		# get filtered out below. Decoding it into plain dicts and filtering
+		# those is a lot cheaper than validating a model for every mirror,
+		# the models are only built per region once it's used (_region_entries)
+		mirror_status = json.loads(mirrorlist)
+
+		if not isinstance(mirror_status, dict) or mirror_status.get('version') != 3:
+			raise ValueError('Only version 3 data from https://archlinux.org/mirrors/status/json/ is supported')
 
-	def _parse_remote_mirror_list(self, mirrorlist: str) -> dict[str, list[MirrorStatusEntryV3]]:
-		mirror_status = MirrorStatusListV3.model_validate_json(mirrorlist)
+		sorting_placeholder: dict[str, _RegionMirrors] = {}
 
-		sorting_placeholder: dict[str, list[MirrorStatusEntryV3]] = {}
+		for mirror in mirror_status.get('urls', []):
+			score = mirror.get('score')
 
-		for mirror in mirror_status.urls:
 			# We filter out mirrors that have bad criteria values
 			if any(
 				[
-					mirror.active is False,  # Disabled by mirror-list admins
-					mirror.last_sync is None,  # Has not synced recently
+					mirror.get('active') is False,  # Disabled by mirror-list admins
+					mirror.get('last_sync') is None,  # Has not synced recently
 					# mirror.score (error rate) over time reported from backend:
 					# https://github.com/archlinux/archweb/blob/31333d3516c91db9a2f2d12260bd61656c011fd1/mirrors/utils.py#L111C22-L111C66
-					(mirror.score is None or mirror.score >= 100),
+					(score is None or score >= 100),
 				]
 			):
 				continue
 
-			if mirror.country == '':
+			if not mirror.get('country'):
 				# TODO: This should be removed once RFC!29 is merged and completed
 				# Until then, there are mirrors which lacks data in the backend
 				# and there is no way of knowing where they're located.
 				# So we have to assume world-wide
-				mirror.country = 'Worldwide'
+				mirror['country'] = 'Worldwide'
 
-			if mirror.url.startswith('http'):
-				sorting_placeholder.setdefault(mirror.country, []).append(mirror)
+			if str(mirror.get('url', '')).startswith('http'):
+				sorting_placeholder.setdefault(mirror['country'], _RegionMirrors()).raw.append(mirror)
 
-		sorted_by_regions: dict[str, list[MirrorStatusEntryV3]] = dict(
+		sorted_by_regions: dict[str, _RegionMirrors] = dict(
 			{region: unsorted_mirrors for region, unsorted_mirrors in sorted(sorting_placeholder.items(), key=lambda item: item[0])}
 		)
 
 		return sorted_by_regions
 
-	def _parse_locale_mirrors(self, mirrorlist: str) -> dict[str, list[MirrorStatusEntryV3]]:
+	def _parse_locale_mirrors(self, mirrorlist: str) -> dict[str, _RegionMirrors]:
 		lines = mirrorlist.splitlines()
 
 		# remove empty lines
 		# lines = [line for line in lines if line]
 
-		mirror_list: dict[str, list[MirrorStatusEntryV3]] = {}
+		mirror_list: dict[str, _RegionMirrors] = {}
 
 		current_region = ''
 
@@ -487,12 +753,12 @@ class MirrorListHandler:
 
 			if line.startswith('## '):
 				current_region = line.replace('## ', '').strip()
-				mirror_list.setdefault(current_region, [])
+				mirror_list.setdefault(current_region, _RegionMirrors(entries=[]))
 
 			if line.startswith('Server = '):
 				if not current_region:
 					current_region = 'Local'
-					mirror_list.setdefault(current_region, [])
+					mirror_list.setdefault(current_region, _RegionMirrors(entries=[]))
 
 				url = line.removeprefix('Server = ')
 
@@ -511,7 +777,9 @@ class MirrorListHandler:
 					details='Locally defined mirror',
 				)
 
-				mirror_list[current_region].append(mirror_entry)
+				entries = mirror_list[current_region].entries
+				assert entries is not None
+				entries.append(mirror_entry)
 
 		return mirror_list
 
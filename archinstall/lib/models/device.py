@@ -838,6 +838,13 @@ class ModificationStatus(Enum):
 	Create = 'create'
 
 
+class WipeMethod(Enum):
+	Discard = 'discard'
+	SecureDiscard = 'secure-discard'
+	ZeroOut = 'zeroout'
+	Write = 'write'
+
+
 class _PartitionModificationSerialization(TypedDict):
 	obj_id: str
 	status: str
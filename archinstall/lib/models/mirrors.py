@@ -10,7 +10,7 @@ from typing import Any, TypedDict, override
 from pydantic import BaseModel, field_validator, model_validator
 
 from ..models.packages import Repository
-from ..networking import DownloadTimer, ping
+from ..networking import DownloadTimer, ping_many
 from ..output import debug
 
 
@@ -38,7 +38,11 @@ class MirrorStatusEntryV3(BaseModel):
 
 	@property
 	def server_url(self) -> str:
-		return f'{self.url}$repo/os/$arch'
+		return self.format_server_url(self.url)
+
+	@staticmethod
+	def format_server_url(url: str) -> str:
+		return f'{url}$repo/os/$arch'
 
 	@property
 	def speed(self) -> float:
@@ -82,13 +86,35 @@ class MirrorStatusEntryV3(BaseModel):
 	@property
 	def latency(self) -> float | None:
 		if self._latency is None:
-			debug(f'Checking latency for {self.url}')
-			assert self._hostname is not None
-			self._latency = ping(self._hostname, timeout=2)
-			debug(f'  latency: {self._latency}')
+			self.measure_latencies([self])
 
 		return self._latency
 
+	@staticmethod
+	def measure_latencies(mirrors: list['MirrorStatusEntryV3'], timeout: float = 2) -> None:
+		"""
+		Ping all given mirrors in a single batch and cache the result
+		on each entry, so that accessing .latency afterwards is free.
+		"""
+		unmeasured = [mirror for mirror in mirrors if mirror._latency is None and mirror._hostname]
+
+		if not unmeasured:
+			return
+
+		debug(f'Checking latency for {len(unmeasured)} mirrors')
+
+		try:
+			latencies = ping_many([mirror._hostname for mirror in unmeasured if mirror._hostname], timeout=timeout)
+		except OSError as err:
+			# raw sockets require root
+			debug(f'Unable to check the latency of mirrors: {err}')
+			return
+
+		for mirror in unmeasured:
+			assert mirror._hostname is not None
+			mirror._latency = latencies.get(mirror._hostname, -1)
+			debug(f'  latency of {mirror._hostname}: {mirror._latency}')
+
 	@classmethod
 	@field_validator('score', mode='before')
 	def validate_score(cls, value: float) -> int | None:
@@ -107,25 +133,6 @@ class MirrorStatusEntryV3(BaseModel):
 		return self
 
 
-class MirrorStatusListV3(BaseModel):
-	cutoff: int
-	last_check: datetime.datetime
-	num_checks: int
-	urls: list[MirrorStatusEntryV3]
-	version: int
-
-	@model_validator(mode='before')
-	@classmethod
-	def check_model(
-		cls,
-		data: dict[str, int | datetime.datetime | list[MirrorStatusEntryV3]],
-	) -> dict[str, int | datetime.datetime | list[MirrorStatusEntryV3]]:
-		if data.get('version') == 3:
-			return data
-
-		raise ValueError('MirrorStatusListV3 only accepts version 3 data from https://archlinux.org/mirrors/status/json/')
-
-
 @dataclass
 class MirrorRegion:
 	name: str
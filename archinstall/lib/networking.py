@@ -3,16 +3,18 @@ import random
 import select
 import signal
 import socket
-import ssl
 import struct
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from types import FrameType, TracebackType
 from typing import Self
-from urllib.error import URLError
-from urllib.parse import urlencode
-from urllib.request import urlopen
 
-from .exceptions import DownloadTimeout, SysCallError
+from .exceptions import DownloadTimeout, HttpError, SysCallError
+from .http_client import http_client
 from .output import debug, error, info
 from .pacman import Pacman
 
@@ -122,21 +124,10 @@ def enrich_iface_types(interfaces: list[str]) -> dict[str, str]:
 
 
 def fetch_data_from_url(url: str, params: dict[str, str] | None = None) -> str:
-	ssl_context = ssl.create_default_context()
-	ssl_context.check_hostname = False
-	ssl_context.verify_mode = ssl.CERT_NONE
-
-	if params is not None:
-		encoded = urlencode(params)
-		full_url = f'{url}?{encoded}'
-	else:
-		full_url = url
-
 	try:
-		response = urlopen(full_url, context=ssl_context)
-		data = response.read().decode('UTF-8')
-		return data
-	except URLError as e:
+		response = http_client.get(url, params=params, verify=False)
+		return response.text()
+	except HttpError as e:
 		raise ValueError(f'Unable to fetch data from url: {url}\n{e}')
 	except Exception as e:
 		raise ValueError(f'Unexpected error when parsing response: {e}')
@@ -154,13 +145,19 @@ def calc_checksum(icmp_packet: bytes) -> int:
 	return checksum
 
 
-def build_icmp(payload: bytes) -> bytes:
+def build_icmp(payload: bytes, identifier: int = 0, sequence: int = 1) -> bytes:
 	# Define the ICMP Echo Request packet
-	icmp_packet = struct.pack('!BBHHH', 8, 0, 0, 0, 1) + payload
+	icmp_packet = struct.pack('!BBHHH', 8, 0, 0, identifier, sequence) + payload
 
 	checksum = calc_checksum(icmp_packet)
 
-	return struct.pack('!BBHHH', 8, 0, checksum, 0, 1) + payload
+	return struct.pack('!BBHHH', 8, 0, checksum, identifier, sequence) + payload
+
+
+def build_icmpv6(payload: bytes, identifier: int = 0, sequence: int = 1) -> bytes:
+	# ICMPv6 Echo Request, the kernel fills in the checksum
+	# for raw IPPROTO_ICMPV6 sockets since it covers the IPv6 pseudo-header
+	return struct.pack('!BBHHH', 128, 0, 0, identifier, sequence) + payload
 
 
 def ping(hostname: str, timeout: int = 5) -> int:
@@ -196,3 +193,250 @@ def ping(hostname: str, timeout: int = 5) -> int:
 
 	icmp_socket.close()
 	return latency
+
+
+def _resolve_host(hostname: str) -> tuple[socket.AddressFamily, str] | None:
+	try:
+		addresses = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+	except OSError as e:
+		debug(f'Unable to resolve {hostname}: {e}')
+		return None
+
+	# prefer IPv4 as long as the host has an A record,
+	# ICMPv6 is only used for IPv6-only hosts
+	for family in (socket.AF_INET, socket.AF_INET6):
+		for addr_family, _type, _proto, _name, sockaddr in addresses:
+			if addr_family == family:
+				return family, str(sockaddr[0])
+
+	return None
+
+
+def resolve_hosts(hostnames: list[str], max_workers: int = 16) -> dict[str, tuple[socket.AddressFamily, str] | None]:
+	"""
+	Resolve a list of hostnames concurrently.
+
+	Returns a mapping of hostname to (address family, address),
+	or None for hosts that could not be resolved.
+	"""
+	unique = list(dict.fromkeys(hostnames))
+
+	if not unique:
+		return {}
+
+	with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as executor:
+		return dict(zip(unique, executor.map(_resolve_host, unique)))
+
+
+def ping_many(hostnames: list[str], timeout: float = 2) -> dict[str, int]:
+	"""
+	Ping several hosts at once and return their latency in milliseconds.
+
+	All echo requests are sent from one raw socket per address family
+	(ICMP for IPv4, ICMPv6 for IPv6) and replies are matched back to the
+	host by identifier and sequence number, so the whole batch completes
+	within a single timeout window. Hosts that could not be resolved or
+	did not answer in time get a latency of -1, same as ping().
+	"""
+	latencies = dict.fromkeys(hostnames, -1)
+	resolved = resolve_hosts(hostnames)
+
+	identifier = random.randint(1, 0xFFFF)
+	payload = f'archinstall-{identifier}'.encode()
+
+	sockets: dict[socket.AddressFamily, socket.socket] = {}
+	# (family, sequence) -> (hostname, time the request was sent)
+	pending: dict[tuple[socket.AddressFamily, int], tuple[str, float]] = {}
+	watchdog = select.epoll()
+
+	try:
+		for sequence, (hostname, target) in enumerate(resolved.items(), start=1):
+			if target is None:
+				continue
+
+			family, address = target
+
+			if family not in sockets:
+				if family == socket.AF_INET6:
+					sock = socket.socket(socket.AF_INET6, socket.SOCK_RAW, socket.IPPROTO_ICMPV6)
+				else:
+					sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+
+				sock.setblocking(False)
+				sockets[family] = sock
+				watchdog.register(sock, select.EPOLLIN)
+
+			if family == socket.AF_INET6:
+				packet = build_icmpv6(payload, identifier, sequence)
+			else:
+				packet = build_icmp(payload, identifier, sequence)
+
+			try:
+				sockets[family].sendto(packet, (address, 0))
+			except OSError as e:
+				debug(f'Unable to ping {hostname} ({address}): {e}')
+				continue
+
+			pending[(family, sequence)] = (hostname, time.time())
+
+		fileno_family = {sock.fileno(): family for family, sock in sockets.items()}
+		deadline = time.time() + timeout
+
+		while pending and (remaining := deadline - time.time()) > 0:
+			for fileno, _event in watchdog.poll(min(remaining, 0.1)):
+				family = fileno_family[fileno]
+
+				while (reply := _receive_echo_reply(sockets[family], family)) is not None:
+					reply_identifier, reply_sequence = reply
+
+					if reply_identifier != identifier:
+						continue
+
+					if match := pending.pop((family, reply_sequence), None):
+						hostname, sent = match
+						latencies[hostname] = round((time.time() - sent) * 1000)
+	finally:
+		watchdog.close()
+		for sock in sockets.values():
+			sock.close()
+
+	return latencies
+
+
+def _receive_echo_reply(sock: socket.socket, family: socket.AddressFamily) -> tuple[int, int] | None:
+	"""
+	Read one pending packet from a non-blocking raw ICMP socket and
+	return its (identifier, sequence) if it is an echo reply.
+	Returns None once there is nothing more to read.
+	"""
+	while True:
+		try:
+			response, _ = sock.recvfrom(1024)
+		except (BlockingIOError, InterruptedError):
+			return None
+		except OSError as e:
+			debug(f'Error: {e}')
+			return None
+
+		if family == socket.AF_INET6:
+			# raw ICMPv6 sockets do not deliver the IPv6 header
+			header = response[:8]
+			echo_reply = 129
+		else:
+			# skip the IPv4 header, its length is given in 32-bit words
+			header_length = (response[0] & 0x0F) * 4
+			header = response[header_length : header_length + 8]
+			echo_reply = 0
+
+		if len(header) < 8:
+			continue
+
+		icmp_type, _code, _checksum, identifier, sequence = struct.unpack('!BBHHH', header)
+
+		if icmp_type == echo_reply:
+			return identifier, sequence
+
+
+@dataclass
+class ConnectivityStatus:
+	route: bool = False
+	# None if the probe didn't finish before the deadline
+	icmp: bool | None = None
+	dns: bool | None = None
+	https: bool | None = None
+	unresolved: list[str] = field(default_factory=list)
+	timed_out: list[str] = field(default_factory=list)
+
+	def problem(self) -> str | None:
+		# a slow link is not reported as a failure, the
+		# installation may very well succeed on it
+		if not self.route:
+			return 'Network is unreachable'
+		if self.dns is False:
+			return 'DNS resolution is not working'
+		if self.https is False:
+			return 'HTTPS connections are failing'
+		return None
+
+
+def _has_route(address: str) -> bool:
+	# connecting a UDP socket sends no packets but fails
+	# right away if the kernel has no route to the address
+	try:
+		with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+			sock.connect((address, 53))
+		return True
+	except OSError as e:
+		debug(f'No route to {address}: {e}')
+		return False
+
+
+def _icmp_reachable(address: str, timeout: float) -> bool:
+	return ping_many([address], timeout=timeout).get(address, -1) >= 0
+
+
+def _https_reachable(url: str, timeout: float) -> bool:
+	try:
+		http_client.head(url, timeout=timeout, retries=0, verify=False)
+		return True
+	except HttpError as e:
+		# any answer from the server means HTTPS itself works
+		return e.code is not None
+
+
+def _start_probe(results: dict[str, bool], key: str, probe: Callable[[], object]) -> threading.Thread:
+	def _run() -> None:
+		try:
+			results[key] = bool(probe())
+		except Exception as e:
+			debug(f'Connectivity probe {key} failed: {e}')
+			results[key] = False
+
+	# daemon threads, as name resolution can't be interrupted and a probe
+	# that is still hanging must not delay the exit of the interpreter
+	thread = threading.Thread(target=_run, name=f'probe-{key}', daemon=True)
+	thread.start()
+	return thread
+
+
+def probe_connectivity(
+	hosts: list[str] = [],
+	deadline: float = 5.0,
+	icmp_target: str = '1.1.1.1',
+	https_url: str = 'https://archlinux.org/',
+) -> ConnectivityStatus:
+	"""
+	Check routing, ICMP, DNS resolution of archlinux.org (and the given
+	hosts, e.g. configured mirrors) and a HTTPS HEAD request all in parallel.
+	Probes that haven't finished once the deadline passes are reported
+	as unknown rather than failed, so the check never takes longer than
+	the deadline and a slow link isn't mistaken for a broken one.
+	"""
+	status = ConnectivityStatus(route=_has_route(icmp_target))
+
+	if not status.route:
+		return status
+
+	hostnames = list(dict.fromkeys(['archlinux.org', *hosts]))
+	results: dict[str, bool] = {}
+
+	threads = [
+		_start_probe(results, 'icmp', lambda: _icmp_reachable(icmp_target, deadline)),
+		_start_probe(results, 'https', lambda: _https_reachable(https_url, deadline)),
+		*(_start_probe(results, f'dns:{hostname}', partial(_resolve_host, hostname)) for hostname in hostnames),
+	]
+
+	# probes that missed the deadline are left running
+	end = time.monotonic() + deadline
+	for thread in threads:
+		thread.join(max(0.0, end - time.monotonic()))
+
+	results = dict(results)
+	status.icmp = results.get('icmp')
+	status.https = results.get('https')
+	status.dns = results.get('dns:archlinux.org')
+	status.unresolved = [hostname for hostname in hostnames if results.get(f'dns:{hostname}') is False]
+	status.timed_out = [key for key in ('icmp', 'https', *(f'dns:{hostname}' for hostname in hostnames)) if key not in results]
+
+	debug(f'Connectivity probe: {status}')
+	return status
@@ -1,12 +1,8 @@
 import json
-import ssl
 from functools import lru_cache
-from urllib.error import HTTPError
-from urllib.parse import urlencode
-from urllib.request import urlopen
-from urllib.response import addinfourl
 
-from ..exceptions import PackageError, SysCallError
+from ..exceptions import HttpError, PackageError, SysCallError
+from ..http_client import HttpResponse, http_client
 from ..models.packages import AvailablePackage, LocalPackage, PackageSearch, PackageSearchResult, Repository
 from ..output import debug
 from ..pacman import Pacman
@@ -16,29 +12,22 @@ BASE_URL_PKG_SEARCH = 'https://archlinux.org/packages/search/json/'
 BASE_GROUP_URL = 'https://archlinux.org/groups/search/json/'
 
 
-def _make_request(url: str, params: dict[str, str]) -> addinfourl:
-	ssl_context = ssl.create_default_context()
-	ssl_context.check_hostname = False
-	ssl_context.verify_mode = ssl.CERT_NONE
-
-	encoded = urlencode(params)
-	full_url = f'{url}?{encoded}'
-
-	return urlopen(full_url, context=ssl_context)
+def _make_request(url: str, params: dict[str, str]) -> HttpResponse:
+	return http_client.get(url, params=params, verify=False)
 
 
 def group_search(name: str) -> list[PackageSearchResult]:
 	# TODO UPSTREAM: Implement /json/ for the groups search
 	try:
 		response = _make_request(BASE_GROUP_URL, {'name': name})
-	except HTTPError as err:
+	except HttpError as err:
 		if err.code == 404:
 			return []
 		else:
 			raise err
 
 	# Just to be sure some code didn't slip through the exception
-	data = response.read().decode('utf-8')
+	data = response.text()
 
 	return [PackageSearchResult(**package) for package in json.loads(data)['results']]
 
@@ -52,10 +41,10 @@ def package_search(package: str) -> PackageSearch:
 	# TODO: utilize pacman cache first, upstream second.
 	response = _make_request(BASE_URL_PKG_SEARCH, {'name': package})
 
-	if response.code != 200:
-		raise PackageError(f'Could not locate package: [{response.code}] {response}')
+	if response.status != 200:
+		raise PackageError(f'Could not locate package: [{response.status}] {response.url}')
 
-	data = response.read().decode('UTF-8')
+	data = response.text()
 	json_data = json.loads(data)
 	return PackageSearch.from_json(json_data)
 
@@ -3,10 +3,10 @@ import importlib.util
 import os
 import sys
 import urllib.parse
-import urllib.request
 from importlib import metadata
 from pathlib import Path
 
+from .http_client import http_client
 from .output import error, info, warn
 
 plugins = {}
@@ -37,7 +37,7 @@ def _localize_path(path: Path) -> Path:
 		converted_path = Path(f'/tmp/{path.stem}_{hashlib.md5(os.urandom(12)).hexdigest()}.py')
 
 		with open(converted_path, 'w') as temp_file:
-			temp_file.write(urllib.request.urlopen(url.geturl()).read().decode('utf-8'))
+			temp_file.write(http_client.get(url.geturl()).text())
 
 		return converted_path
 	else:
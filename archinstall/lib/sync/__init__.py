@@ -0,0 +1,30 @@
+from .archive import USER_HOME, ArchiveWriter, extract_archive
+from .dedup import Deduplicator
+from .engine import CopyEngine, CopyEntry, CopyStats, EntryType, ExcludeFunc, PlannedRoot, ScanEntry, scan_tree
+from .manifest import SyncManifest, file_digest
+from .matcher import PathMatcher, expand_includes
+from .progress import CopyProgress, format_bytes
+from .seed import SeedStore, shared_sources
+
+__all__ = [
+	'USER_HOME',
+	'ArchiveWriter',
+	'CopyEngine',
+	'CopyEntry',
+	'CopyProgress',
+	'CopyStats',
+	'Deduplicator',
+	'EntryType',
+	'ExcludeFunc',
+	'PathMatcher',
+	'PlannedRoot',
+	'ScanEntry',
+	'SeedStore',
+	'SyncManifest',
+	'expand_includes',
+	'extract_archive',
+	'file_digest',
+	'format_bytes',
+	'scan_tree',
+	'shared_sources',
+]
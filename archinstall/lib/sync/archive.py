@@ -0,0 +1,207 @@
+import os
+import subprocess
+import tarfile
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Self
+
+from ..exceptions import SysCallError
+from ..output import debug, info
+from .engine import CopyEntry, EntryType
+
+# members of the live user home are stored below this placeholder and
+# extracted into the home of the primary user of the installation
+USER_HOME = 'home/@user'
+
+_XATTR_PREFIX = 'SCHILY.xattr.'
+
+
+def _xattr_headers(path: Path) -> dict[str, str]:
+	headers = {}
+
+	try:
+		for name in os.listxattr(path, follow_symlinks=False):
+			value = os.getxattr(path, name, follow_symlinks=False)
+			# tarfile writes values that aren't valid UTF-8 as binary
+			headers[_XATTR_PREFIX + name] = value.decode('utf-8', 'surrogateescape')
+	except OSError as err:
+		debug(f'Unable to read the xattrs of {path}: {err}')
+
+	return headers
+
+
+class ArchiveWriter:
+	"""
+	Writes copied entries to a zstd compressed tar, streamed through a
+	multi-threaded zstd process, so the selected state of the live system
+	can be applied to other installations with extract_archive().
+	Members are named by their path on the target, ownership is assigned
+	when extracting.
+	"""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._process: subprocess.Popen[bytes] | None = None
+		self._tar: tarfile.TarFile | None = None
+		self._dirs: set[str] = set()
+
+	def __enter__(self) -> Self:
+		info(f'Writing install from ISO archive {self.path}')
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+
+		self._process = subprocess.Popen(
+			['zstd', '-T0', '-q', '-f', '-o', str(self.path)],
+			stdin=subprocess.PIPE,
+		)
+		stdin: IO[bytes] = self._process.stdin  # type: ignore[assignment]
+		self._tar = tarfile.open(fileobj=stdin, mode='w|', format=tarfile.PAX_FORMAT)
+
+		return self
+
+	def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+		assert self._process is not None and self._tar is not None
+
+		self._tar.close()
+		self._process.stdin.close()  # type: ignore[union-attr]
+
+		if self._process.wait() != 0 and exc_type is None:
+			raise SysCallError(f'Unable to write archive {self.path}', self._process.returncode)
+
+	def _add(self, source: Path, arcname: str) -> None:
+		assert self._tar is not None
+
+		tarinfo = self._tar.gettarinfo(source, arcname)
+		tarinfo.uid = tarinfo.gid = 0
+		tarinfo.uname = tarinfo.gname = ''
+		tarinfo.pax_headers = _xattr_headers(source)
+
+		if tarinfo.isreg():
+			with open(source, 'rb') as fp:
+				self._tar.addfile(tarinfo, fp)
+		else:
+			self._tar.addfile(tarinfo)
+
+		if tarinfo.isdir():
+			self._dirs.add(arcname)
+
+	def _add_parents(self, source: Path, arcname: str, root: str) -> None:
+		# directories below the root and above an entry that was added on
+		# its own, extracting would otherwise create them with default attributes
+		missing: list[tuple[Path, str]] = []
+
+		while (arcname := arcname.rpartition('/')[0]) and (not root or arcname.startswith(root + '/')) and arcname not in self._dirs:
+			source = source.parent
+			missing.append((source, arcname))
+
+		for parent_source, parent_arcname in reversed(missing):
+			self._add(parent_source, parent_arcname)
+
+	def add(self, entries: list[CopyEntry], destination: Path, root: str) -> None:
+		"""
+		Add the planned entries of a copy to the destination, stored
+		below root in the archive
+		"""
+		for entry in entries:
+			rel = entry.target.relative_to(destination).as_posix()
+			arcname = f'{root}/{rel}' if root and rel != '.' else (root or rel)
+
+			if entry.type == EntryType.Directory and arcname in self._dirs:
+				continue
+
+			try:
+				self._add_parents(entry.source, arcname, root)
+				self._add(entry.source, arcname)
+			except OSError as err:
+				debug(f'Unable to archive {entry.source}: {err}')
+
+
+def _in_user_home(name: str) -> bool:
+	return name == USER_HOME or name.startswith(USER_HOME + '/')
+
+
+def _contained(member: tarfile.TarInfo, dest_path: str) -> tarfile.TarInfo:
+	"""
+	Reject members that would be written outside of the destination,
+	unlike the filters of tarfile this keeps the modes, setuid and
+	setgid bits included, and absolute symlinks, as those are valid
+	on the installed system. Devices and FIFOs are rejected as well.
+	"""
+	if not (member.isreg() or member.isdir() or member.issym() or member.islnk()):
+		raise tarfile.SpecialFileError(member)
+
+	dest_path = os.path.realpath(dest_path)
+
+	if os.path.isabs(member.name):
+		raise tarfile.AbsolutePathError(member)
+
+	target_path = os.path.realpath(os.path.join(dest_path, member.name))
+
+	if os.path.commonpath([target_path, dest_path]) != dest_path:
+		raise tarfile.OutsideDestinationError(member, target_path)
+
+	if member.islnk():
+		link_path = os.path.realpath(os.path.join(dest_path, member.linkname))
+
+		if os.path.isabs(member.linkname) or os.path.commonpath([link_path, dest_path]) != dest_path:
+			raise tarfile.LinkOutsideDestinationError(member, link_path)
+
+	return member
+
+
+def extract_archive(path: Path, target: Path, user_home: str | None, user_owner: tuple[int, int] | None) -> None:
+	"""
+	Extract an archive written by ArchiveWriter onto the target while it is
+	decompressed, without temporary files. The live user home is extracted
+	to user_home, owned by user_owner, everything else is owned by root.
+	"""
+	info(f'Extracting install from ISO archive {path}')
+
+	xattrs: list[tuple[str, dict[str, str]]] = []
+
+	def _remap(name: str) -> str | None:
+		if not _in_user_home(name):
+			return name
+		if user_home is None:
+			return None
+		return user_home + name[len(USER_HOME) :]
+
+	def _filter(member: tarfile.TarInfo, dest_path: str) -> tarfile.TarInfo | None:
+		owner = user_owner if _in_user_home(member.name) else (0, 0)
+
+		if (name := _remap(member.name)) is None or owner is None:
+			return None
+
+		# hardlinks name the member they link to
+		linkname = _remap(member.linkname) if member.islnk() else member.linkname
+
+		if linkname is None:
+			return None
+
+		filtered = _contained(
+			member.replace(name=name, linkname=linkname, uid=owner[0], gid=owner[1], uname='', gname='', deep=False),
+			dest_path,
+		)
+
+		if headers := {key: value for key, value in member.pax_headers.items() if key.startswith(_XATTR_PREFIX)}:
+			xattrs.append((filtered.name, headers))
+
+		return filtered
+
+	process = subprocess.Popen(['zstd', '-d', '-q', '-c', str(path)], stdout=subprocess.PIPE)
+	stdout: IO[bytes] = process.stdout  # type: ignore[assignment]
+
+	try:
+		with tarfile.open(fileobj=stdout, mode='r|') as tar:
+			tar.extractall(target, numeric_owner=True, filter=_filter)
+	finally:
+		stdout.close()
+
+		if process.wait() != 0:
+			raise SysCallError(f'Unable to read archive {path}', process.returncode)
+
+	for name, headers in xattrs:
+		for key, value in headers.items():
+			try:
+				os.setxattr(target / name, key[len(_XATTR_PREFIX) :], value.encode('utf-8', 'surrogateescape'), follow_symlinks=False)
+			except OSError as err:
+				debug(f'Unable to set the xattrs of {name}: {err}')
@@ -0,0 +1,135 @@
+import errno
+import fcntl
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..output import debug
+from .manifest import file_digest
+
+# see linux/fs.h
+_FICLONE = 0x40049409
+
+# linking small files saves little space and the hashing costs more
+# than copying them
+_MIN_SIZE = 16 * 1024
+
+
+@dataclass(frozen=True)
+class _Copied:
+	target: Path
+	owner: tuple[int, int] | None
+	mode: int
+	mtime_ns: int
+
+
+class Deduplicator:
+	"""
+	Shares the data of identical files copied to the same target filesystem,
+	across all copies it is used for. Files are bucketed by size first, only
+	files with a size that occurs more than once are hashed.
+
+	Duplicates are reflinked to the first copy, so they remain independent
+	files with their own owner and attributes. If the filesystem doesn't
+	support reflinks they are hardlinked instead, but only if the owner,
+	mode and mtime are the same as the first copy's, as all of them are
+	shared by hardlinks.
+	"""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._sizes: Counter[int] = Counter()
+		# copies which haven't been hashed as no other file had their size
+		self._unhashed: dict[tuple[int, int], list[_Copied]] = {}
+		self._hashed: dict[tuple[int, int, str], _Copied] = {}
+		self.saved = 0
+
+	def plan(self, sizes: list[int]) -> None:
+		"""
+		Register the sizes of the files about to be copied
+		"""
+		with self._lock:
+			self._sizes.update(size for size in sizes if size >= _MIN_SIZE)
+
+	def is_candidate(self, size: int) -> bool:
+		return size >= _MIN_SIZE and self._sizes[size] > 1
+
+	def _hash_pending(self, device: int, size: int) -> None:
+		# the copies are hashed without holding the lock, a concurrent
+		# lookup may miss them meanwhile and copies its file instead
+		with self._lock:
+			pending = self._unhashed.pop((device, size), [])
+
+		hashed = []
+
+		for copied in pending:
+			try:
+				hashed.append((file_digest(copied.target), copied))
+			except OSError:
+				continue
+
+		with self._lock:
+			for digest, copied in hashed:
+				self._hashed.setdefault((device, size, digest), copied)
+
+	def find(self, device: int, size: int, digest: str) -> _Copied | None:
+		self._hash_pending(device, size)
+
+		with self._lock:
+			return self._hashed.get((device, size, digest))
+
+	def register(self, device: int, st: os.stat_result, target: Path, owner: tuple[int, int] | None, digest: str | None) -> None:
+		if st.st_size < _MIN_SIZE:
+			return
+
+		copied = _Copied(target, owner, st.st_mode, st.st_mtime_ns)
+
+		with self._lock:
+			if digest:
+				self._hashed.setdefault((device, st.st_size, digest), copied)
+			else:
+				self._unhashed.setdefault((device, st.st_size), []).append(copied)
+
+	def link(self, original: _Copied, target: Path, st: os.stat_result, owner: tuple[int, int] | None) -> bool:
+		"""
+		Create the target as a reflink of the original, or as a hardlink if
+		that isn't supported and all shared attributes match. Returns False
+		if neither is possible, the attributes are left to the caller.
+		"""
+		try:
+			src_fd = os.open(original.target, os.O_RDONLY | os.O_CLOEXEC | os.O_NOFOLLOW)
+		except OSError:
+			return False
+
+		try:
+			# the target may be hardlinked to another copy by a previous run,
+			# which cloning into it would overwrite as well
+			target.unlink(missing_ok=True)
+			dst_fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC | os.O_NOFOLLOW, 0o600)
+
+			try:
+				fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+			finally:
+				os.close(dst_fd)
+		except OSError as err:
+			if err.errno not in (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL):
+				return False
+
+			if (original.owner, original.mode, original.mtime_ns) != (owner, st.st_mode, st.st_mtime_ns):
+				return False
+
+			try:
+				target.unlink(missing_ok=True)
+				os.link(original.target, target)
+			except OSError as link_err:
+				debug(f'Unable to hardlink {target} to {original.target}: {link_err}')
+				return False
+		finally:
+			os.close(src_fd)
+
+		with self._lock:
+			self.saved += st.st_size
+
+		return True
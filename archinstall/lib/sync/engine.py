@@ -0,0 +1,601 @@
+import errno
+import fcntl
+import os
+import shutil
+import stat
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from itertools import batched
+from pathlib import Path
+
+from ..output import debug, warn
+from .dedup import Deduplicator
+from .manifest import SyncManifest, file_digest
+from .progress import CopyProgress
+
+# see linux/fs.h
+_FICLONE = 0x40049409
+
+_MAX_WORKERS = 16
+
+# small files are handed to the workers in batches, the per-task overhead
+# of the pool would otherwise dominate copying them
+_BATCH_SIZE = 64
+
+_COPY_CHUNK = 64 * 1024 * 1024
+
+# errors of copy methods the kernel or filesystem doesn't support
+_UNSUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EBADF)
+
+# decides whether an entry is skipped, by its path relative to the
+# base of the copy and whether it is a directory
+ExcludeFunc = Callable[[str, bool], bool]
+
+
+class EntryType(Enum):
+	Directory = 'directory'
+	File = 'file'
+	Symlink = 'symlink'
+
+
+@dataclass(frozen=True)
+class CopyEntry:
+	source: Path
+	target: Path
+	type: EntryType
+	stat: os.stat_result
+	# the target may be on the same filesystem as the source, so the
+	# data is reflinked if possible
+	same_fs: bool = False
+	# the uid and gid of the target, otherwise it's owned by the caller
+	owner: tuple[int, int] | None = None
+
+
+@dataclass
+class CopyStats:
+	files: int = 0
+	bytes: int = 0
+	failed: int = 0
+	# files which were already up to date
+	skipped: int = 0
+	# files sharing the data of an identical file
+	deduplicated: int = 0
+
+	def add(self, other: 'CopyStats') -> None:
+		self.files += other.files
+		self.bytes += other.bytes
+		self.failed += other.failed
+		self.skipped += other.skipped
+		self.deduplicated += other.deduplicated
+
+
+@dataclass
+class PlannedRoot:
+	"""
+	The files and bytes planned to be copied from one source
+	"""
+
+	source: Path
+	files: int = 0
+	bytes: int = 0
+
+
+@dataclass(frozen=True)
+class _PendingScan:
+	source: Path
+	target: Path
+	exclude: ExcludeFunc | None
+	rel: str
+	same_fs: bool
+	owner: tuple[int, int] | None
+	root: PlannedRoot
+
+
+@dataclass
+class _BatchResult:
+	stats: CopyStats
+	# copied files with their content hash if the manifest keeps them
+	copied: list[tuple[CopyEntry, str | None]]
+
+
+def _entry_type(mode: int) -> EntryType | None:
+	if stat.S_ISDIR(mode):
+		return EntryType.Directory
+	if stat.S_ISREG(mode):
+		return EntryType.File
+	if stat.S_ISLNK(mode):
+		return EntryType.Symlink
+	# sockets, fifos and device nodes have no place in a home directory
+	return None
+
+
+def _device_of(path: Path) -> int | None:
+	# the target may not exist yet, its closest existing parent decides
+	for candidate in (path, *path.parents):
+		try:
+			return os.stat(candidate).st_dev
+		except OSError:
+			continue
+	return None
+
+
+def _copy_data(src_fd: int, dst_fd: int, size: int, reflink: bool) -> None:
+	if size == 0:
+		return
+
+	if reflink:
+		try:
+			fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+			return
+		except OSError as err:
+			if err.errno not in _UNSUPPORTED:
+				raise
+
+	copied = 0
+
+	try:
+		while copied < size and (count := os.copy_file_range(src_fd, dst_fd, min(_COPY_CHUNK, size - copied))):
+			copied += count
+	except OSError as err:
+		if copied or err.errno not in _UNSUPPORTED:
+			raise
+
+	if copied:
+		return
+
+	try:
+		while copied < size and (count := os.sendfile(dst_fd, src_fd, copied, min(_COPY_CHUNK, size - copied))):
+			copied += count
+	except OSError as err:
+		if copied or err.errno not in _UNSUPPORTED:
+			raise
+
+	if copied:
+		return
+
+	while data := os.read(src_fd, _COPY_CHUNK):
+		view = memoryview(data)
+		while view:
+			view = view[os.write(dst_fd, view) :]
+
+
+def _clear_target(target: Path) -> None:
+	"""
+	Remove an entry of a different type in the way of the target
+	"""
+	if target.is_dir() and not target.is_symlink():
+		shutil.rmtree(target)
+	else:
+		target.unlink(missing_ok=True)
+
+
+def _make_dirs(path: Path, owner: tuple[int, int] | None) -> None:
+	missing: list[Path] = []
+
+	while not os.path.lexists(path):
+		missing.append(path)
+		path = path.parent
+
+	for directory in reversed(missing):
+		directory.mkdir(exist_ok=True)
+
+		if owner:
+			os.chown(directory, *owner)
+
+
+def _copy_metadata(entry: CopyEntry) -> None:
+	# changing the owner clears setuid/setgid bits, so it goes first
+	if entry.owner:
+		os.chown(entry.target, *entry.owner, follow_symlinks=False)
+
+	# shutil.copystat copies the mode, timestamps and all extended
+	# attributes, including the ACLs stored as system.posix_acl_* xattrs
+	shutil.copystat(entry.source, entry.target, follow_symlinks=False)
+
+
+def _open_target(target: Path) -> int:
+	flags = os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC | os.O_NOFOLLOW
+
+	try:
+		fd = os.open(target, flags, 0o600)
+	except OSError as err:
+		# a directory or symlink is in the way, checking on failure
+		# saves a stat of every target that is fine
+		if err.errno not in (errno.EISDIR, errno.ELOOP):
+			raise
+
+		_clear_target(target)
+		return os.open(target, flags | os.O_EXCL, 0o600)
+
+	# a previous copy may have hardlinked the target to an identical file,
+	# truncating it would overwrite that file as well
+	if os.fstat(fd).st_nlink > 1:
+		os.close(fd)
+		target.unlink()
+		return os.open(target, flags | os.O_EXCL, 0o600)
+
+	os.ftruncate(fd, 0)
+	return fd
+
+
+def _copy_file(entry: CopyEntry) -> None:
+	src_fd = os.open(entry.source, os.O_RDONLY | os.O_CLOEXEC | os.O_NOFOLLOW)
+
+	try:
+		dst_fd = _open_target(entry.target)
+
+		try:
+			_copy_data(src_fd, dst_fd, entry.stat.st_size, entry.same_fs)
+		finally:
+			os.close(dst_fd)
+	finally:
+		os.close(src_fd)
+
+	_copy_metadata(entry)
+
+
+def _copy_symlink(entry: CopyEntry) -> None:
+	link = os.readlink(entry.source)
+
+	try:
+		os.symlink(link, entry.target)
+	except FileExistsError:
+		_clear_target(entry.target)
+		os.symlink(link, entry.target)
+
+	_copy_metadata(entry)
+
+
+@dataclass(frozen=True)
+class ScanEntry:
+	# path relative to the scanned directory
+	rel: str
+	type: EntryType
+	stat: os.stat_result
+
+
+def scan_tree(source: Path, exclude: ExcludeFunc | None = None, rel: str = '') -> list[ScanEntry]:
+	"""
+	Walk a directory once with scandir, parents are listed before their
+	children. The exclude function is called with the paths relative to
+	the base of the copy, of which rel is the relative path of the source;
+	excluded directories are not descended into.
+	"""
+	entries: list[ScanEntry] = []
+	stack = [('', source)]
+
+	while stack:
+		rel_dir, src_dir = stack.pop()
+
+		try:
+			with os.scandir(src_dir) as it:
+				dir_entries = list(it)
+		except OSError as err:
+			warn(f'Unable to read {src_dir}: {err}')
+			continue
+
+		for dir_entry in dir_entries:
+			rel_path = f'{rel_dir}/{dir_entry.name}' if rel_dir else dir_entry.name
+
+			try:
+				st = dir_entry.stat(follow_symlinks=False)
+			except OSError as err:
+				warn(f'Unable to read {dir_entry.path}: {err}')
+				continue
+
+			if (entry_type := _entry_type(st.st_mode)) is None:
+				debug(f'Skipping special file {dir_entry.path}')
+				continue
+
+			is_dir = entry_type == EntryType.Directory
+
+			if exclude and exclude(f'{rel}/{rel_path}' if rel else rel_path, is_dir):
+				continue
+
+			entries.append(ScanEntry(rel_path, entry_type, st))
+
+			if is_dir:
+				stack.append((rel_path, Path(dir_entry.path)))
+
+	return entries
+
+
+def _existing_names(directory: Path) -> set[str] | None:
+	try:
+		with os.scandir(directory) as it:
+			return {dir_entry.name for dir_entry in it}
+	except (FileNotFoundError, NotADirectoryError):
+		return None
+
+
+class CopyEngine:
+	"""
+	Copies directory trees with a pool of workers. The sources are walked
+	once up front with scandir, then the directories are created and the
+	files copied in parallel, using reflinks when source and target share a
+	filesystem and copy_file_range/sendfile otherwise so the data never
+	passes through user space. Symlinks, permissions, timestamps, xattrs
+	and ACLs are preserved; the timestamps of directories are applied last
+	as copying into them changes them.
+
+		engine = CopyEngine()
+		engine.add(Path('/etc/skel'), target / 'etc/skel')
+		engine.run()
+
+	The added directories are scanned in parallel when the copy is
+	planned, which can be done ahead of running it to learn its size.
+
+	With reflink, reflinks are attempted for all files instead of only for
+	sources on the same device as the target, as the subvolumes of a btrfs
+	filesystem each have their own device number.
+	"""
+
+	def __init__(
+		self,
+		workers: int | None = None,
+		manifest: SyncManifest | None = None,
+		dedup: Deduplicator | None = None,
+		reflink: bool = False,
+	) -> None:
+		self._workers = workers or min(_MAX_WORKERS, (os.cpu_count() or 1) * 2)
+		self._manifest = manifest
+		self._dedup = dedup
+		self._reflink = reflink
+		self._entries: list[CopyEntry] = []
+		self._pending: list[_PendingScan] = []
+		self._roots: list[PlannedRoot] = []
+
+	@property
+	def entries(self) -> list[CopyEntry]:
+		self.plan()
+		return self._entries
+
+	def plan(self) -> list[PlannedRoot]:
+		"""
+		Scan the added directories, with one worker per directory, and
+		return the number of files and bytes to copy from each source
+		"""
+		if self._pending:
+			with ThreadPoolExecutor(max_workers=self._workers) as executor:
+				scans = list(executor.map(lambda pending: scan_tree(pending.source, pending.exclude, pending.rel), self._pending))
+
+			for pending, entries in zip(self._pending, scans):
+				self._add_scanned(pending.source, pending.target, entries, pending.same_fs, pending.owner, pending.root)
+
+			self._pending = []
+
+		return self._roots
+
+	def add(
+		self,
+		source: Path,
+		target: Path,
+		exclude: ExcludeFunc | None = None,
+		rel: str = '',
+		owner: tuple[int, int] | None = None,
+	) -> None:
+		"""
+		Plan copying the source, a file, symlink or directory, to the target.
+		The exclude function is called with the paths relative to the base
+		of the copy, of which rel is the relative path of the source.
+		With an owner (uid, gid) all entries are created with it, including
+		missing parent directories of the target.
+		"""
+		try:
+			st = os.lstat(source)
+		except OSError as err:
+			warn(f'Unable to read {source}: {err}')
+			return
+
+		if (entry_type := _entry_type(st.st_mode)) is None:
+			debug(f'Skipping special file {source}')
+			return
+
+		same_fs = self._reflink or _device_of(target) == st.st_dev
+		root = PlannedRoot(source)
+		self._roots.append(root)
+		self._add_scanned(source, target, [ScanEntry('', entry_type, st)], same_fs, owner, root)
+
+		if entry_type == EntryType.Directory:
+			self._pending.append(_PendingScan(source, target, exclude, rel, same_fs, owner, root))
+
+	def add_scanned(
+		self,
+		source: Path,
+		entries: list[ScanEntry],
+		target: Path,
+		owner: tuple[int, int] | None = None,
+		skip_existing: bool = False,
+	) -> None:
+		"""
+		Plan copying the entries of a scan of the source directory into
+		the existing target directory, so a tree that is copied to several
+		targets is only walked once. With skip_existing, entries that are
+		already present at the target are left alone; the presence is
+		checked with one scandir per target directory.
+		"""
+		same_fs = self._reflink or _device_of(target) == os.stat(source).st_dev
+
+		if skip_existing:
+			entries = self._missing(entries, target)
+
+		root = PlannedRoot(source)
+		self._roots.append(root)
+		self._add_scanned(source, target, entries, same_fs, owner, root)
+
+	@staticmethod
+	def _missing(entries: list[ScanEntry], target: Path) -> list[ScanEntry]:
+		# names in each target directory, None for directories that don't
+		# exist yet, as everything below them is missing as well
+		listings: dict[str, set[str] | None] = {}
+		missing: list[ScanEntry] = []
+
+		for entry in entries:
+			parent, _, name = entry.rel.rpartition('/')
+
+			if parent not in listings:
+				listings[parent] = _existing_names(target / parent)
+
+			if (names := listings[parent]) is not None and name in names:
+				continue
+
+			if entry.type == EntryType.Directory:
+				listings[entry.rel] = None
+
+			missing.append(entry)
+
+		return missing
+
+	def _add_scanned(
+		self,
+		source: Path,
+		target: Path,
+		entries: list[ScanEntry],
+		same_fs: bool,
+		owner: tuple[int, int] | None,
+		root: PlannedRoot,
+	) -> None:
+		for entry in entries:
+			if entry.rel:
+				entry_source, entry_target = source / entry.rel, target / entry.rel
+			else:
+				entry_source, entry_target = source, target
+
+			self._entries.append(CopyEntry(entry_source, entry_target, entry.type, entry.stat, same_fs, owner))
+
+			if entry.type == EntryType.File:
+				root.files += 1
+				root.bytes += entry.stat.st_size
+
+	def _copy_deduplicated(self, entry: CopyEntry, dedup: Deduplicator) -> tuple[bool, str | None]:
+		"""
+		Link the entry to an identical file copied before, or copy it.
+		Returns whether it was linked and the content hash if one was needed.
+		"""
+		device = os.stat(entry.target.parent).st_dev
+		digest = None
+
+		if dedup.is_candidate(entry.stat.st_size):
+			digest = file_digest(entry.source)
+			original = dedup.find(device, entry.stat.st_size, digest)
+
+			if original and dedup.link(original, entry.target, entry.stat, entry.owner):
+				_copy_metadata(entry)
+				return True, digest
+
+		_copy_file(entry)
+		dedup.register(device, entry.stat, entry.target, entry.owner, digest)
+
+		return False, digest
+
+	def _copy_batch(self, entries: tuple[CopyEntry, ...]) -> _BatchResult:
+		result = _BatchResult(CopyStats(), [])
+		manifest = self._manifest
+
+		for entry in entries:
+			if manifest and entry.type == EntryType.File and manifest.is_current(entry.source, entry.target, entry.stat):
+				result.stats.skipped += 1
+				continue
+
+			digest = None
+
+			try:
+				if entry.type != EntryType.File:
+					_copy_symlink(entry)
+				elif self._dedup:
+					linked, digest = self._copy_deduplicated(entry, self._dedup)
+					result.stats.deduplicated += linked
+				else:
+					_copy_file(entry)
+			except OSError as err:
+				warn(f'Unable to copy {entry.source} to {entry.target}: {err}')
+				result.stats.failed += 1
+				continue
+
+			result.stats.files += 1
+			result.stats.bytes += entry.stat.st_size
+
+			if manifest and entry.type == EntryType.File:
+				if manifest.checksum and digest is None:
+					digest = file_digest(entry.source)
+				result.copied.append((entry, digest))
+
+		return result
+
+	def run(self, progress: CopyProgress | None = None) -> CopyStats:
+		"""
+		Copy all planned entries, failures of single entries are
+		reported and don't stop the copy
+		"""
+		self.plan()
+
+		stats = CopyStats()
+		directories = [entry for entry in self._entries if entry.type == EntryType.Directory]
+		others = [entry for entry in self._entries if entry.type != EntryType.Directory]
+
+		# parents are always planned before their children
+		for entry in directories:
+			try:
+				if entry.target.is_symlink() or (entry.target.exists() and not entry.target.is_dir()):
+					_clear_target(entry.target)
+				_make_dirs(entry.target, entry.owner)
+			except OSError as err:
+				warn(f'Unable to create {entry.target}: {err}')
+				stats.failed += 1
+
+		created = {entry.target for entry in directories}
+
+		# the parents of entries that were added directly, all
+		# others are created with the directories above
+		parents = {(entry.target.parent, entry.owner) for entry in others if entry.target.parent not in created}
+
+		for parent, owner in parents:
+			try:
+				_make_dirs(parent, owner)
+			except OSError as err:
+				warn(f'Unable to create {parent}: {err}')
+				stats.failed += 1
+
+		if self._dedup:
+			self._dedup.plan([entry.stat.st_size for entry in others if entry.type == EntryType.File])
+
+		batches = list(batched(others, _BATCH_SIZE))
+		done_files = done_bytes = 0
+
+		with ThreadPoolExecutor(max_workers=self._workers) as executor:
+			for batch, result in zip(batches, executor.map(self._copy_batch, batches)):
+				stats.add(result.stats)
+
+				if progress:
+					files = [entry for entry in batch if entry.type == EntryType.File]
+					done_files += len(files)
+					done_bytes += sum(entry.stat.st_size for entry in files)
+					progress.update(done_files, done_bytes)
+
+				# completed files are checkpointed, so an interrupted
+				# copy continues where it stopped when run again
+				if self._manifest:
+					for entry, digest in result.copied:
+						self._manifest.record(entry.source, entry.target, entry.stat, digest)
+
+					self._manifest.checkpoint()
+
+		# children first, so setting their timestamps doesn't change the parents'
+		for entry in reversed(directories):
+			try:
+				_copy_metadata(entry)
+			except OSError as err:
+				debug(f'Unable to copy the attributes of {entry.source}: {err}')
+
+		if self._manifest:
+			self._manifest.save()
+
+		debug(
+			f'Copied {stats.files} files ({stats.bytes} bytes), {stats.skipped} up to date, {stats.deduplicated} deduplicated, {stats.failed} failed',
+		)
+		self._entries = []
+		self._roots = []
+
+		return stats
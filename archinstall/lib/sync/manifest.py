@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import NotRequired, TypedDict
+
+from ..output import debug
+
+# the manifest is written out at most this often while copying
+_CHECKPOINT_INTERVAL = 5.0
+
+
+def file_digest(path: Path) -> str:
+	with open(path, 'rb') as fp:
+		return hashlib.file_digest(fp, 'blake2b').hexdigest()
+
+
+class _ManifestEntrySerialization(TypedDict):
+	source: str
+	size: int
+	mtime_ns: int
+	hash: NotRequired[str]
+
+
+class _ManifestSerialization(TypedDict):
+	version: int
+	entries: dict[str, _ManifestEntrySerialization]
+
+
+class SyncManifest:
+	"""
+	Records the source path, size, mtime and optionally the content hash
+	of every file that has been copied, keyed by the target path. A copy
+	that is run again, or resumed after it has been interrupted, only
+	transfers the files which are new or have changed since.
+
+	With checksum, files of the same size whose mtime has changed are
+	compared by their content hash before being copied again.
+	"""
+
+	version = 1
+
+	def __init__(self, path: Path, checksum: bool = False) -> None:
+		self.path = path
+		self.checksum = checksum
+		self._entries = self._read()
+		self._saved_at = time.monotonic()
+
+	def _read(self) -> dict[str, _ManifestEntrySerialization]:
+		try:
+			data = json.loads(self.path.read_text())
+		except FileNotFoundError:
+			return {}
+		except (OSError, ValueError) as err:
+			debug(f'Ignoring unreadable sync manifest {self.path}: {err}')
+			return {}
+
+		if not isinstance(data, dict) or data.get('version') != self.version:
+			return {}
+
+		manifest: _ManifestSerialization = data  # type: ignore[assignment]
+		return manifest['entries']
+
+	@property
+	def recorded_bytes(self) -> int:
+		"""
+		The size of the files that have been copied already
+		"""
+		return sum(entry['size'] for entry in self._entries.values())
+
+	def is_current(self, source: Path, target: Path, st: os.stat_result) -> bool:
+		"""
+		Whether the target is a complete copy of the source in its current state
+		"""
+		if (entry := self._entries.get(str(target))) is None:
+			return False
+
+		if entry['source'] != str(source) or entry['size'] != st.st_size:
+			return False
+
+		# the target may have been removed or replaced since
+		try:
+			if os.lstat(target).st_size != st.st_size:
+				return False
+		except OSError:
+			return False
+
+		if entry['mtime_ns'] == st.st_mtime_ns:
+			return True
+
+		if self.checksum and (digest := entry.get('hash')) and digest == file_digest(source):
+			entry['mtime_ns'] = st.st_mtime_ns
+			return True
+
+		return False
+
+	def record(self, source: Path, target: Path, st: os.stat_result, digest: str | None = None) -> None:
+		entry: _ManifestEntrySerialization = {
+			'source': str(source),
+			'size': st.st_size,
+			'mtime_ns': st.st_mtime_ns,
+		}
+
+		if digest:
+			entry['hash'] = digest
+
+		self._entries[str(target)] = entry
+
+	def checkpoint(self) -> None:
+		"""
+		Save the manifest if it hasn't been saved recently
+		"""
+		if time.monotonic() - self._saved_at >= _CHECKPOINT_INTERVAL:
+			self.save()
+
+	def save(self) -> None:
+		content: _ManifestSerialization = {'version': self.version, 'entries': self._entries}
+
+		try:
+			self.path.parent.mkdir(parents=True, exist_ok=True)
+			tmp_path = self.path.with_suffix('.tmp')
+			tmp_path.write_text(json.dumps(content))
+			os.replace(tmp_path, self.path)
+		except OSError as err:
+			debug(f'Unable to save sync manifest {self.path}: {err}')
+
+		self._saved_at = time.monotonic()
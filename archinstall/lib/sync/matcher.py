@@ -0,0 +1,268 @@
+import fnmatch
+import os
+import re
+from pathlib import Path
+
+_GLOB_CHARS = frozenset('*?[')
+
+
+def _is_literal(pattern: str) -> bool:
+	return _GLOB_CHARS.isdisjoint(pattern)
+
+
+def _combine(globs: list[str]) -> re.Pattern[str] | None:
+	return re.compile('|'.join(globs)) if globs else None
+
+
+class _TrieNode:
+	__slots__ = ('below', 'children', 'exact', 'exact_dir')
+
+	def __init__(self) -> None:
+		self.children: dict[str, _TrieNode] = {}
+		# the path itself matches
+		self.exact = False
+		# the path itself matches if it is a directory
+		self.exact_dir = False
+		# everything below the path matches
+		self.below = False
+
+
+class PathMatcher:
+	"""
+	Matches paths relative to a base directory against a list of
+	patterns, compiled once instead of evaluating every pattern per path.
+
+	Patterns are fnmatch globs, matched against the path relative to the
+	base or, when starting with a '/', against the absolute path; 'dir/**'
+	matches the directory and everything below it, but not a file named
+	'dir'. Literal patterns are looked up in a trie of path components,
+	all glob patterns are combined into a single regex. As directories
+	match as a whole, the walk of an excluded directory can be pruned.
+	"""
+
+	def __init__(self, patterns: list[str], base: Path) -> None:
+		self._base = base.as_posix().rstrip('/')
+		self._trie = _TrieNode()
+		# the base itself is below an absolute pattern
+		self._everything = False
+
+		# globs matching any path, and the bases of 'dir/**' globs
+		# which only match directories
+		rel_globs: list[str] = []
+		rel_dir_globs: list[str] = []
+		abs_globs: list[str] = []
+		abs_dir_globs: list[str] = []
+
+		for pattern in patterns:
+			if pattern.startswith('/'):
+				self._add_absolute(pattern, abs_globs, abs_dir_globs)
+			else:
+				self._add_relative(pattern, rel_globs, rel_dir_globs)
+
+		self._rel_regex = _combine(rel_globs)
+		self._rel_dir_regex = _combine(rel_dir_globs)
+		self._abs_regex = _combine(abs_globs)
+		self._abs_dir_regex = _combine(abs_dir_globs)
+
+	def _add_literal(self, rel: str, exact: bool = False, exact_dir: bool = False, below: bool = False) -> None:
+		node = self._trie
+
+		for part in rel.split('/'):
+			node = node.children.setdefault(part, _TrieNode())
+
+		node.exact |= exact
+		node.exact_dir |= exact_dir
+		node.below |= below
+
+	def _add_relative(self, pattern: str, globs: list[str], dir_globs: list[str]) -> None:
+		base_pat = pattern[:-3].rstrip('/') if pattern.endswith('/**') else None
+
+		if base_pat is None:
+			if _is_literal(pattern):
+				self._add_literal(pattern.rstrip('/'), exact=True)
+			else:
+				globs.append(fnmatch.translate(pattern))
+		elif _is_literal(base_pat):
+			self._add_literal(base_pat, exact_dir=True, below=True)
+		else:
+			globs.append(fnmatch.translate(pattern))
+			dir_globs.append(fnmatch.translate(base_pat))
+
+	def _add_absolute(self, pattern: str, globs: list[str], dir_globs: list[str]) -> None:
+		dir_only = pattern.endswith('/**')
+		base_pat = (pattern[:-3] if dir_only else pattern).rstrip('/')
+
+		if not _is_literal(base_pat):
+			globs.append(fnmatch.translate(pattern))
+			(dir_globs if dir_only else globs).append(fnmatch.translate(base_pat))
+			return
+
+		# absolute paths match themselves and everything below them
+		if base_pat == self._base or self._base.startswith(base_pat + '/'):
+			self._everything = True
+		elif base_pat.startswith(self._base + '/'):
+			self._add_literal(base_pat[len(self._base) + 1 :], exact=not dir_only, exact_dir=dir_only, below=True)
+
+	def _trie_match(self, rel: str, is_dir: bool) -> bool:
+		node = self._trie
+		parts = rel.split('/')
+
+		for index, part in enumerate(parts):
+			if (child := node.children.get(part)) is None:
+				return False
+			if child.below and index < len(parts) - 1:
+				return True
+			node = child
+
+		return node.exact or (node.exact_dir and is_dir)
+
+	def __call__(self, rel: str, is_dir: bool = False) -> bool:
+		if self._everything:
+			return True
+
+		if self._trie.children and self._trie_match(rel, is_dir):
+			return True
+
+		if self._rel_regex and self._rel_regex.match(rel):
+			return True
+
+		if is_dir and self._rel_dir_regex and self._rel_dir_regex.match(rel):
+			return True
+
+		path = f'{self._base}/{rel}'
+
+		if self._abs_regex and self._abs_regex.match(path):
+			return True
+
+		if is_dir and self._abs_dir_regex and self._abs_dir_regex.match(path):
+			return True
+
+		return False
+
+
+def _split_pattern(pattern: str) -> list[str]:
+	parts = [part for part in pattern.split('/') if part and part != '.']
+	# consecutive '**' are the same as one
+	return [part for i, part in enumerate(parts) if part != '**' or i == 0 or parts[i - 1] != '**']
+
+
+def expand_includes(source: Path, patterns: list[str]) -> list[Path]:
+	"""
+	Expand include patterns, with the semantics of Path.glob(), to the
+	minimal list of paths below the source that covers all matches. A
+	directory matching a pattern covers everything below it, so it is
+	not descended into. Patterns without glob characters are looked up
+	directly, all others are expanded in a single walk of the source.
+	Like Path.glob(), symlinks to directories are followed when matched
+	by a pattern component, but not by '**'.
+	"""
+	matches: list[Path] = []
+	globs: list[list[str]] = []
+
+	for pattern in patterns:
+		if pattern.startswith('/'):
+			abs_path = Path(pattern)
+			if os.path.lexists(abs_path) and abs_path.is_relative_to(source):
+				matches.append(abs_path)
+			continue
+
+		parts = _split_pattern(pattern.removeprefix('./'))
+
+		if not parts:
+			continue
+
+		# 'dir/**' matches the directory itself and everything below it
+		literal = parts[:-1] if parts[-1] == '**' and len(parts) > 1 else parts
+
+		if all(_is_literal(part) for part in literal):
+			path = source.joinpath(*literal)
+			if os.path.lexists(path) and (literal is parts or path.is_dir()):
+				matches.append(path)
+			continue
+
+		globs.append(parts)
+
+	if globs:
+		matches.extend(_walk_globs(source, globs))
+
+	return _minimize(matches)
+
+
+def _walk_globs(source: Path, globs: list[list[str]]) -> list[Path]:
+	# a trailing '**' only matches directories, which cover everything below them
+	dirs_only = [parts[-1] == '**' for parts in globs]
+	compiled = [
+		[part if part == '**' else re.compile(fnmatch.translate(part)) for part in (parts[:-1] if dirs_only[index] else parts)]
+		for index, parts in enumerate(globs)
+	]
+
+	def expand(states: set[tuple[int, int]]) -> set[tuple[int, int]]:
+		# a '**' also matches no directories at all
+		return states | {(index, pos + 1) for index, pos in states if pos < len(compiled[index]) and compiled[index][pos] == '**'}
+
+	initial = expand({(index, 0) for index in range(len(compiled))})
+
+	if any(pos == len(compiled[index]) for index, pos in initial):
+		return [source]
+
+	matches: list[Path] = []
+	stack = [(source, initial)]
+
+	while stack:
+		directory, states = stack.pop()
+
+		try:
+			with os.scandir(directory) as it:
+				dir_entries = list(it)
+		except OSError:
+			continue
+
+		for dir_entry in dir_entries:
+			is_dir = dir_entry.is_dir()
+			is_real_dir = is_dir and not dir_entry.is_symlink()
+			next_states: set[tuple[int, int]] = set()
+
+			for index, pos in states:
+				if pos == len(compiled[index]):
+					continue
+
+				part = compiled[index][pos]
+
+				if part == '**':
+					if is_real_dir:
+						next_states.add((index, pos))
+				elif isinstance(part, re.Pattern) and part.match(dir_entry.name):
+					next_states.add((index, pos + 1))
+
+			next_states = expand(next_states)
+
+			# a match covers its subtree, which therefore isn't walked
+			if any(pos == len(compiled[index]) and (is_dir or not dirs_only[index]) for index, pos in next_states):
+				matches.append(Path(dir_entry.path))
+			elif is_dir and next_states:
+				stack.append((Path(dir_entry.path), next_states))
+
+	return matches
+
+
+def _minimize(paths: list[Path]) -> list[Path]:
+	"""
+	Drop the paths that are below another path, by looking up the
+	ancestors of each path in the set of the ones kept
+	"""
+	kept: set[str] = set()
+	minimized: list[Path] = []
+
+	for path in sorted(set(paths), key=lambda p: (len(p.parts), p.as_posix())):
+		posix = path.as_posix()
+		ancestor = posix
+
+		while (sep := ancestor.rfind('/')) > 0:
+			ancestor = ancestor[:sep]
+			if ancestor in kept:
+				break
+		else:
+			kept.add(posix)
+			minimized.append(path)
+
+	return minimized
@@ -0,0 +1,41 @@
+import time
+
+from ..models.device import SectorSize, Size, Unit
+from ..output import info
+
+_PROGRESS_INTERVAL = 2.0
+
+
+def format_bytes(value: float) -> str:
+	return Size(int(value), Unit.B, SectorSize.default()).format_highest()
+
+
+class CopyProgress:
+	"""
+	Reports the progress of a copy with its throughput and the estimated
+	remaining time, at most every few seconds
+	"""
+
+	def __init__(self, description: str, files: int, total: int) -> None:
+		self._description = description
+		self._files = files
+		self._total = total
+		self._started = time.monotonic()
+		self._reported = self._started
+
+	def update(self, files: int, done: int) -> None:
+		now = time.monotonic()
+
+		if now - self._reported < _PROGRESS_INTERVAL and files < self._files:
+			return
+
+		self._reported = now
+		elapsed = max(now - self._started, 1e-6)
+		throughput = done / elapsed
+		eta = int((self._total - done) / throughput) if throughput else 0
+		percent = done * 100 // max(self._total, 1)
+
+		info(
+			f'{self._description}: {files} of {self._files} files, {format_bytes(done)} of {format_bytes(self._total)} ({percent}%), '
+			f'{format_bytes(throughput)}/s, ETA {eta // 60}m {eta % 60}s',
+		)
@@ -0,0 +1,90 @@
+from collections import Counter
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+from ..exceptions import SysCallError
+from ..general import SysCommand
+from ..output import debug, info, warn
+from .engine import CopyEngine
+
+
+class SeedStore:
+	"""
+	Stages content which is copied to several destinations once, in a
+	btrfs subvolume on the target. The destinations are then copied from
+	the staged content with reflinks, so only staging writes the data and
+	all copies share its extents. The subvolume is deleted on exit, the
+	extents stay referenced by the copies. If the subvolume can't be
+	created nothing is staged and the sources are copied directly.
+
+		with SeedStore(target / 'var/lib/archinstall/seed') as store:
+			staged = store.stage([source])
+			engine = CopyEngine(reflink=True)
+			for home in homes:
+				engine.add(staged[source], home / 'Pictures')
+			engine.run()
+	"""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._staged: dict[Path, Path] = {}
+		self._available = True
+
+	def __enter__(self) -> Self:
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+
+		# left behind by an interrupted run
+		if self.path.exists():
+			self._delete()
+
+		try:
+			SysCommand(['btrfs', 'subvolume', 'create', str(self.path)])
+		except SysCallError as err:
+			warn(f'Unable to create the staging subvolume {self.path}, copying directly: {err}')
+			self._available = False
+
+		return self
+
+	def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+		if self._available:
+			self._delete()
+
+	def _delete(self) -> None:
+		try:
+			SysCommand(['btrfs', 'subvolume', 'delete', str(self.path)])
+		except SysCallError as err:
+			warn(f'Unable to delete the staging subvolume {self.path}: {err}')
+
+	def stage(self, sources: list[Path]) -> dict[Path, Path]:
+		"""
+		Copy the source paths into the store, unless they have been
+		staged before, and return the staged path of each of them
+		"""
+		if not self._available:
+			return {source: source for source in sources}
+
+		engine = CopyEngine()
+
+		for source in sources:
+			if source in self._staged:
+				continue
+
+			staged = self.path / source.absolute().relative_to('/')
+			debug(f'Staging {source} in {self.path}')
+			engine.add(source, staged)
+			self._staged[source] = staged
+
+		stats = engine.run()
+
+		if stats.files:
+			info(f'Staged {stats.files} shared files in {self.path}')
+
+		return {source: self._staged[source] for source in sources}
+
+
+def shared_sources(sources: list[Path]) -> list[Path]:
+	"""
+	The sources which are copied to more than one destination
+	"""
+	return [source for source, count in Counter(sources).items() if count > 1]
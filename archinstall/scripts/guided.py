@@ -11,6 +11,7 @@ from archinstall.lib.disk.utils import disk_layouts
 from archinstall.lib.global_menu import GlobalMenu
 from archinstall.lib.installer import Installer, accessibility_tools_in_use, run_custom_user_commands
 from archinstall.lib.interactions.general_conf import PostInstallationAction, ask_post_installation
+from archinstall.lib.mirrors import mirror_list_handler
 from archinstall.lib.models import Bootloader
 from archinstall.lib.entropy import apply_payload, payload_from_config
 from archinstall.lib.models.device import (
@@ -42,6 +43,9 @@ def ask_user_questions() -> None:
 		text = tr('New version available') + f': {upgrade}'
 		title_text = text
 
+	if not arch_config_handler.args.offline:
+		mirror_list_handler.refresh_in_background()
+
 	with Tui():
 		global_menu = GlobalMenu(arch_config_handler.config)
 
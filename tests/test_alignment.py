@@ -0,0 +1,100 @@
+from pathlib import Path
+from typing import cast
+
+import pytest
+
+from archinstall.lib.disk.alignment import PartitionAlignment, align_partitions, partition_alignment
+from archinstall.lib.disk.tuning import QueueLimits
+from archinstall.lib.models.device import (
+	BDevice,
+	DeviceModification,
+	ModificationStatus,
+	PartitionModification,
+	PartitionType,
+	SectorSize,
+	Size,
+	Unit,
+)
+
+MiB = 1024 * 1024
+SECTOR = SectorSize(512, Unit.B)
+
+
+def _size(value: int) -> Size:
+	return Size(value, Unit.B, SECTOR)
+
+
+def _limits(physical: int = 512, minimum: int = 512, optimal: int = 0, offset: int = 0) -> QueueLimits:
+	return QueueLimits(
+		rotational=False,
+		logical_block_size=512,
+		physical_block_size=physical,
+		minimum_io_size=minimum,
+		optimal_io_size=optimal,
+		alignment_offset=offset,
+		discard_granularity=0,
+		nr_requests=64,
+	)
+
+
+def _partition(start: int, length: int, status: ModificationStatus = ModificationStatus.Create) -> PartitionModification:
+	return PartitionModification(
+		status=status,
+		type=PartitionType.Primary,
+		start=_size(start),
+		length=_size(length),
+		dev_path=None if status == ModificationStatus.Create else Path('/dev/sda1'),
+	)
+
+
+def _modification(*partitions: PartitionModification) -> DeviceModification:
+	# the device is only needed to look up the alignment, which is passed in
+	return DeviceModification(device=cast(BDevice, None), wipe=True, partitions=list(partitions))
+
+
+def test_partition_alignment_rounding() -> None:
+	alignment = PartitionAlignment(4 * MiB, 512)
+
+	assert alignment.is_aligned(_size(4 * MiB + 512))
+	assert not alignment.is_aligned(_size(4 * MiB))
+	assert alignment.align_up(_size(4 * MiB)) == _size(4 * MiB + 512)
+	assert alignment.align_up(_size(4 * MiB + 512)) == _size(4 * MiB + 512)
+	assert alignment.align_down(_size(8 * MiB)) == _size(4 * MiB + 512)
+	assert alignment.align_down(_size(8 * MiB + 512)) == _size(8 * MiB + 512)
+
+
+@pytest.mark.parametrize(
+	('limits', 'expected'),
+	[
+		(None, PartitionAlignment()),
+		(_limits(), PartitionAlignment()),
+		(_limits(physical=4096, minimum=4096), PartitionAlignment()),
+		# RAID5 over 3 disks with 512 KiB chunks: 1 MiB stripe width, 3 MiB optimal I/O size
+		(_limits(minimum=512 * 1024, optimal=3 * MiB), PartitionAlignment(3 * MiB)),
+		(_limits(optimal=3 * MiB, offset=7 * 512), PartitionAlignment(3 * MiB, 7 * 512)),
+		(_limits(optimal=4 * MiB, offset=5 * MiB), PartitionAlignment(4 * MiB, MiB)),
+		(_limits(offset=-1), PartitionAlignment()),
+		# 0xFFFF sectors reported by some USB bridges
+		(_limits(optimal=0xFFFF * 512), PartitionAlignment()),
+	],
+)
+def test_partition_alignment(monkeypatch: pytest.MonkeyPatch, limits: QueueLimits | None, expected: PartitionAlignment) -> None:
+	monkeypatch.setattr('archinstall.lib.disk.alignment.queue_limits', lambda dev_path: limits)
+
+	assert partition_alignment(Path('/dev/sda')) == expected
+
+
+def test_align_partitions() -> None:
+	aligned = _partition(MiB, 511 * MiB)
+	misaligned = _partition(512 * MiB + 4096, 256 * MiB)
+	too_small = _partition(1024 * MiB + 4096, MiB)
+	existing = _partition(2 * MiB + 4096, MiB, ModificationStatus.Exist)
+	deleted = _partition(4 * MiB + 4096, MiB, ModificationStatus.Delete)
+
+	align_partitions(_modification(aligned, misaligned, too_small, existing, deleted), PartitionAlignment(), warn_misaligned=True)
+
+	assert (aligned.start, aligned.length) == (_size(MiB), _size(511 * MiB))
+	assert (misaligned.start, misaligned.length) == (_size(513 * MiB), _size(255 * MiB))
+	assert (too_small.start, too_small.length) == (_size(1024 * MiB + 4096), _size(MiB))
+	assert (existing.start, existing.length) == (_size(2 * MiB + 4096), _size(MiB))
+	assert (deleted.start, deleted.length) == (_size(4 * MiB + 4096), _size(MiB))
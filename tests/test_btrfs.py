@@ -0,0 +1,73 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.disk.device_handler import DeviceHandler
+from archinstall.lib.exceptions import SysCallError
+
+# trimmed output of 'btrfs inspect-internal dump-tree -t root'
+ROOT_TREE = """\
+btrfs-progs v6.10
+root tree
+node 30474240 level 0 items 19 free space 12500 generation 12 owner ROOT_TREE
+	item 0 key (EXTENT_TREE ROOT_ITEM 0) itemoff 15844 itemsize 439
+		generation 12 root_dirid 0 bytenr 30441472 byte_limit 0 bytes_used 16384
+	item 9 key (FS_TREE ROOT_REF 256) itemoff 14105 itemsize 19
+		root ref key dirid 256 sequence 2 name @
+	item 10 key (FS_TREE ROOT_REF 257) itemoff 14082 itemsize 23
+		root ref key dirid 256 sequence 3 name @home
+	item 11 key (256 ROOT_BACKREF 5) itemoff 14063 itemsize 19
+		root backref key dirid 256 sequence 2 name @
+	item 12 key (256 ROOT_REF 258) itemoff 14030 itemsize 24
+		root ref key dirid 256 sequence 4 name .snapshots
+	item 13 key (257 ROOT_BACKREF 5) itemoff 14007 itemsize 23
+		root backref key dirid 256 sequence 3 name @home
+"""
+
+
+class _Output:
+	def __init__(self, output: str) -> None:
+		self._output = output
+
+	def decode(self) -> str:
+		return self._output
+
+
+def _dump_tree(monkeypatch: pytest.MonkeyPatch, output: str) -> None:
+	monkeypatch.setattr('archinstall.lib.disk.device_handler.SysCommand', lambda cmd: _Output(output))
+
+
+def test_read_btrfs_subvolumes(monkeypatch: pytest.MonkeyPatch) -> None:
+	_dump_tree(monkeypatch, ROOT_TREE)
+
+	assert DeviceHandler._read_btrfs_subvolumes(Path('/dev/sda2')) == [Path('@'), Path('@home'), Path('@/.snapshots')]
+
+
+def test_read_btrfs_subvolumes_in_directory(monkeypatch: pytest.MonkeyPatch) -> None:
+	# a subvolume created in a directory of @ can't be resolved from the root tree
+	_dump_tree(monkeypatch, ROOT_TREE.replace('dirid 256 sequence 4', 'dirid 260 sequence 4'))
+
+	assert DeviceHandler._read_btrfs_subvolumes(Path('/dev/sda2')) is None
+
+
+def test_read_btrfs_subvolumes_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+	def fail(cmd: str) -> _Output:
+		raise SysCallError('dump-tree failed', 1)
+
+	monkeypatch.setattr('archinstall.lib.disk.device_handler.SysCommand', fail)
+
+	assert DeviceHandler._read_btrfs_subvolumes(Path('/dev/sda2')) is None
+
+
+def test_btrfs_generation(tmp_path: Path) -> None:
+	device = tmp_path / 'device'
+
+	with open(device, 'wb') as fp:
+		fp.seek(0x10000 + 64)
+		fp.write(struct.pack('<8sQ', b'_BHRfS_M', 42))
+
+	assert DeviceHandler._btrfs_generation(device) == 42
+
+	device.write_bytes(bytes(0x10000 + 128))
+	assert DeviceHandler._btrfs_generation(device) is None
@@ -0,0 +1,55 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import cast
+
+from archinstall.lib.disk.filesystem import FilesystemHandler
+from archinstall.lib.models.device import (
+	DiskLayoutConfiguration,
+	LvmConfiguration,
+	LvmLayoutType,
+	LvmVolumeGroup,
+	ModificationStatus,
+	PartitionModification,
+	PartitionType,
+	SectorSize,
+	Size,
+	Unit,
+)
+
+
+def _partition(dev_path: str) -> PartitionModification:
+	size = Size(1, Unit.GiB, SectorSize.default())
+	return PartitionModification(ModificationStatus.Create, PartitionType.Primary, size, size, dev_path=Path(dev_path))
+
+
+def test_lvm_vg_disks() -> None:
+	sda1, sda2, sdb1, sdc1, sdd1 = (_partition(path) for path in ('/dev/sda1', '/dev/sda2', '/dev/sdb1', '/dev/sdc1', '/dev/sdd1'))
+
+	device_mods = [
+		SimpleNamespace(device_path=Path('/dev/sda'), partitions=[sda1, sda2]),
+		SimpleNamespace(device_path=Path('/dev/sdb'), partitions=[sdb1]),
+		SimpleNamespace(device_path=Path('/dev/sdc'), partitions=[sdc1]),
+		SimpleNamespace(device_path=Path('/dev/sdd'), partitions=[sdd1]),
+	]
+	disk_config = cast(DiskLayoutConfiguration, SimpleNamespace(device_modifications=device_mods, disk_encryption=None))
+
+	lvm_config = LvmConfiguration(
+		LvmLayoutType.Default,
+		[
+			LvmVolumeGroup('root', [sda1]),
+			# on the same disk as root, but not the same partition
+			LvmVolumeGroup('home', [sda2, sdb1]),
+			LvmVolumeGroup('data', [sdc1]),
+			# a PV that isn't a partition of a modified device
+			LvmVolumeGroup('other', [sdd1, _partition('/dev/md0')]),
+		],
+	)
+
+	vg_disks = FilesystemHandler(disk_config)._lvm_vg_disks(lvm_config)
+
+	assert vg_disks == {
+		'root': frozenset({Path('/dev/sda'), Path('/dev/sdb')}),
+		'home': frozenset({Path('/dev/sda'), Path('/dev/sdb')}),
+		'data': frozenset({Path('/dev/sdc')}),
+		'other': frozenset({Path('/dev/sdd'), Path('/dev/md0')}),
+	}
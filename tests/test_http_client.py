@@ -0,0 +1,30 @@
+import gzip
+import zlib
+
+import pytest
+
+from archinstall.lib.exceptions import HttpError
+from archinstall.lib.http_client import HttpClient
+
+
+def test_decode_body() -> None:
+	client = HttpClient()
+	body = b'archinstall' * 100
+
+	assert client._decode_body(body, '') == body
+	assert client._decode_body(gzip.compress(body), 'gzip') == body
+	assert client._decode_body(zlib.compress(body), 'deflate') == body
+
+	# raw deflate streams without the zlib header
+	compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+	raw = compressor.compress(body) + compressor.flush()
+	assert client._decode_body(raw, 'Deflate ') == body
+
+	with pytest.raises(HttpError):
+		client._decode_body(body, 'zstd')
+
+
+def test_accept_encoding_without_brotli(monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr('importlib.util.find_spec', lambda name: None)
+
+	assert HttpClient()._accept_encoding() == 'gzip, deflate'
@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from archinstall.lib.disk.device_handler import DeviceHandler
+from archinstall.lib.disk.utils import LsblkOutput, LsblkSnapshot
+from archinstall.lib.models.device import LsblkInfo
+
+
+def _device(name: str, path: str, children: list[dict[str, Any]] = [], **kwargs: Any) -> dict[str, Any]:
+	return {
+		'name': name,
+		'path': path,
+		'pkname': None,
+		'log-sec': 512,
+		'size': 1024**3,
+		'pttype': None,
+		'ptuuid': None,
+		'rota': False,
+		'tran': None,
+		'partn': None,
+		'partuuid': None,
+		'parttype': None,
+		'uuid': None,
+		'fstype': None,
+		'fsver': None,
+		'fsavail': None,
+		'fsuse%': None,
+		'type': 'part',
+		'mountpoint': None,
+		'mountpoints': [None],
+		'fsroots': [None],
+		'children': children,
+	} | kwargs
+
+
+def _snapshot() -> LsblkSnapshot:
+	lv = _device('vg-data', '/dev/mapper/vg-data', type='lvm', uuid='lv-uuid', mountpoints=['/mnt/data'])
+	root = _device('root', '/dev/mapper/root', type='crypt', uuid='root-uuid', fstype='btrfs', mountpoints=['/mnt', '/mnt/home'])
+
+	devices = [
+		_device(
+			'sda',
+			'/dev/sda',
+			type='disk',
+			children=[
+				_device('sda1', '/dev/sda1', partuuid='sda1-partuuid', uuid='ABCD-1234', mountpoints=['/mnt/boot']),
+				_device('sda2', '/dev/sda2', partuuid='sda2-partuuid', fstype='crypto_LUKS', children=[root]),
+			],
+		),
+		# a volume spanning two physical volumes appears below both
+		_device('sdb', '/dev/sdb', type='disk', children=[lv]),
+		_device('sdc', '/dev/sdc', type='disk', children=[lv]),
+	]
+
+	output = LsblkOutput.model_validate_json(json.dumps({'blockdevices': devices}))
+	return LsblkSnapshot(output.blockdevices)
+
+
+def test_lsblk_snapshot_lookups() -> None:
+	snapshot = _snapshot()
+
+	assert [info.name for info in snapshot] == ['sda', 'sda1', 'sda2', 'root', 'sdb', 'vg-data', 'sdc']
+
+	assert snapshot.by_path('/dev/sda1') is snapshot.by_name('sda1')
+	assert snapshot.by_uuid('ABCD-1234') is snapshot.by_name('sda1')
+	assert snapshot.by_partuuid('sda2-partuuid') is snapshot.by_name('sda2')
+	assert snapshot.by_path(Path('/dev/nonexistent')) is None
+
+
+def test_lsblk_snapshot_parents() -> None:
+	snapshot = _snapshot()
+	root = snapshot.root(Path('/dev/mapper/root'))
+
+	assert root is not None and root.name == 'sda'
+	assert snapshot.parent(Path('/dev/mapper/root')) is snapshot.by_name('sda2')
+	assert snapshot.parent(Path('/dev/sda')) is None
+
+	# indexed by its first occurrence
+	assert snapshot.parent(Path('/dev/mapper/vg-data')) is snapshot.by_name('sdb')
+
+
+def test_lsblk_snapshot_mountpoints() -> None:
+	snapshot = _snapshot()
+
+	assert [info.name for info in snapshot.by_mountpoint(Path('/mnt/home'))] == ['root']
+	assert [info.name for info in snapshot.by_mountpoint(Path('/mnt'), as_prefix=True)] == ['sda1', 'root', 'vg-data']
+	assert snapshot.by_mountpoint(Path('/srv')) == []
+
+
+def test_parent_device_path_from_snapshot(monkeypatch: pytest.MonkeyPatch) -> None:
+	handler = DeviceHandler()
+	handler._snapshot = _snapshot()
+	calls: list[Path | str] = []
+
+	def get_lsblk_info(dev_path: Path | str) -> LsblkInfo:
+		calls.append(dev_path)
+		return LsblkInfo.model_validate(_device('sdd1', '/dev/sdd1', pkname='sdd'))
+
+	monkeypatch.setattr('archinstall.lib.disk.device_handler.get_lsblk_info', get_lsblk_info)
+
+	assert handler.get_parent_device_path(Path('/dev/sda1')) == Path('/dev/sda')
+	assert calls == []
+
+	# devices created after the snapshot was taken are looked up
+	assert handler.get_parent_device_path(Path('/dev/sdd1')) == Path('/dev/sdd')
+	assert calls == [Path('/dev/sdd1')]
@@ -0,0 +1,38 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib import hardware
+from archinstall.lib.luks import append_crypttab, luks2_parallelism, map_luks2_concurrently
+
+GiB_KiB = 1024 * 1024
+
+
+def test_luks2_parallelism_reads_current_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+	available = [8 * GiB_KiB, 2 * GiB_KiB]
+
+	def read_mem_info() -> dict[str, int]:
+		return {'MemTotal': 16 * GiB_KiB, 'MemFree': 0, 'MemAvailable': available.pop(0)}
+
+	monkeypatch.setattr(hardware._sys_info, 'mem_info', {'MemTotal': 16 * GiB_KiB})
+	monkeypatch.setattr(hardware._sys_info, 'read_mem_info', read_mem_info)
+	monkeypatch.setattr('os.cpu_count', lambda: 64)
+
+	assert luks2_parallelism(16) == 8
+	# memory taken by formatting running in the meantime
+	assert luks2_parallelism(16) == 2
+
+
+def test_crypttab_in_device_order(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr('archinstall.lib.luks.luks2_parallelism', lambda count: count)
+
+	def enroll(index: int) -> str:
+		# the first devices finish last
+		time.sleep((3 - index) * 0.05)
+		return f'luks{index} UUID={index} /etc/cryptsetup-keys.d/luks{index}.key luks,key-slot=1\n'
+
+	(tmp_path / 'etc').mkdir()
+	append_crypttab(tmp_path, map_luks2_concurrently(enroll, [0, 1, 2]))
+
+	assert [line.split()[0] for line in (tmp_path / 'etc/crypttab').read_text().splitlines()] == ['luks0', 'luks1', 'luks2']
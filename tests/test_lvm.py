@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from archinstall.lib.disk.device_handler import DeviceHandler
+from archinstall.lib.exceptions import DiskError
+
+
+class _Output:
+	def __init__(self, output: str) -> None:
+		self._output = output
+
+	def decode(self) -> str:
+		return self._output
+
+
+def _lvs(monkeypatch: pytest.MonkeyPatch, reports: list[list[dict[str, str]]]) -> list[str]:
+	commands: list[str] = []
+
+	def lvs(cmd: str) -> _Output:
+		commands.append(cmd)
+		lv = reports.pop(0) if len(reports) > 1 else reports[0]
+		return _Output(json.dumps({'report': [{'lv': lv}]}))
+
+	monkeypatch.setattr('archinstall.lib.disk.device_handler.SysCommand', lvs)
+	monkeypatch.setattr('archinstall.lib.disk.device_handler.time.sleep', lambda delay: None)
+
+	return commands
+
+
+def test_lvm_vol_info_retries_until_listed(monkeypatch: pytest.MonkeyPatch) -> None:
+	volume = {'lv_name': 'root', 'vg_name': 'vg', 'lv_size': '1073741824B'}
+	commands = _lvs(monkeypatch, [[], [], [volume]])
+
+	# created without a DeviceHandler.__init__, which probes the devices of the host
+	handler = DeviceHandler.__new__(DeviceHandler)
+	lv_info = handler.lvm_vol_info('root')
+
+	assert lv_info is not None and lv_info.lv_name == 'root'
+	assert len(commands) == 3
+
+
+def test_lvm_vol_info_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+	_lvs(monkeypatch, [[]])
+	monkeypatch.setattr('archinstall.lib.disk.device_handler._LVM_INFO_TIMEOUT', 0.0)
+
+	handler = DeviceHandler.__new__(DeviceHandler)
+
+	with pytest.raises(DiskError):
+		handler.lvm_vol_info('root')
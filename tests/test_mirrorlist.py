@@ -1,6 +1,10 @@
+import json
+import threading
 from pathlib import Path
 
-from archinstall.lib.mirrors import MirrorListHandler
+import pytest
+
+from archinstall.lib.mirrors import MirrorCache, MirrorListHandler
 
 
 def test_mirrorlist_no_country(mirrorlist_no_country_fixture: Path) -> None:
@@ -48,3 +52,161 @@ def test_mirrorlist_multiple_countries(mirrorlist_multiple_countries_fixture: Pa
 	assert regions[1].urls == [
 		'https://au.mirror.pkgbuild.com/$repo/os/$arch',
 	]
+
+
+def test_mirror_cache_roundtrip(tmp_path: Path, mirrorlist_with_country_fixture: Path) -> None:
+	cache_path = tmp_path / 'mirrors.json'
+	cache = MirrorCache(path=cache_path)
+
+	handler = MirrorListHandler(local_mirrorlist=mirrorlist_with_country_fixture, cache=cache)
+	handler.load_local_mirrors()
+	mirrors = handler._region_entries('United States')
+
+	mirrors[0]._speed = 1024.0
+	mirrors[0]._latency = 12
+
+	cache.set_status('{"version": 3}')
+	cache.record_measurements(mirrors)
+	cache.save()
+
+	reloaded = MirrorCache(path=cache_path)
+	assert reloaded.get_status() == '{"version": 3}'
+
+	handler = MirrorListHandler(local_mirrorlist=mirrorlist_with_country_fixture, cache=reloaded)
+	handler.load_local_mirrors()
+	mirrors = handler._region_entries('United States')
+	reloaded.apply_measurements(mirrors)
+
+	assert mirrors[0]._speed == 1024.0
+	assert mirrors[0]._latency == 12
+	# mirrors without successful measurements are not cached
+	assert mirrors[1]._speed is None
+
+
+def test_mirror_cache_expired(tmp_path: Path) -> None:
+	cache_path = tmp_path / 'mirrors.json'
+
+	cache = MirrorCache(path=cache_path)
+	cache.set_status('{"version": 3}')
+	cache.save()
+
+	assert MirrorCache(path=cache_path, status_ttl=0).get_status() is None
+
+
+def test_remote_mirrorlist_lazy_regions() -> None:
+	def entry(url: str, country: str, **kwargs: object) -> dict[str, object]:
+		return {
+			'url': url,
+			'protocol': url.split(':', 1)[0],
+			'active': True,
+			'country': country,
+			'country_code': 'XX',
+			'isos': True,
+			'ipv4': True,
+			'ipv6': False,
+			'details': '',
+			'last_sync': '2025-01-01T00:00:00Z',
+			'score': 1.5,
+		} | kwargs
+
+	status = {
+		'cutoff': 3600,
+		'last_check': '2025-01-01T00:00:00Z',
+		'num_checks': 1,
+		'version': 3,
+		'urls': [
+			entry('https://se.example.org/', 'Sweden'),
+			entry('rsync://se.example.org/', 'Sweden'),
+			entry('https://de.example.org/', 'Germany'),
+			entry('https://inactive.example.org/', 'Germany', active=False),
+			entry('https://unsynced.example.org/', 'Germany', last_sync=None),
+			entry('https://bad.example.org/', 'Germany', score=100.2),
+			entry('https://unknown.example.org/', ''),
+		],
+	}
+
+	handler = MirrorListHandler()
+	handler._status_mappings = handler._parse_remote_mirror_list(json.dumps(status))
+
+	regions = handler.get_mirror_regions()
+
+	assert [region.name for region in regions] == ['Germany', 'Sweden', 'Worldwide']
+	assert regions[0].urls == ['https://de.example.org/$repo/os/$arch']
+	assert regions[1].urls == ['https://se.example.org/$repo/os/$arch']
+
+	# models are only built for regions that are used
+	assert handler._mappings()['Sweden'].entries is None
+
+	entries = handler._region_entries('Sweden')
+	assert [mirror.url for mirror in entries] == ['https://se.example.org/']
+	assert handler._mappings()['Germany'].entries is None
+
+
+def test_mirror_ranking_pings_region_at_once(tmp_path: Path, mirrorlist_with_country_fixture: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	batches: list[list[str]] = []
+
+	def ping_many(hostnames: list[str], timeout: float = 2) -> dict[str, int]:
+		batches.append(hostnames)
+		return {'geo.mirror.pkgbuild.com': -1, 'america.mirror.pkgbuild.com': 20}
+
+	monkeypatch.setattr('archinstall.lib.models.mirrors.ping_many', ping_many)
+
+	handler = MirrorListHandler(local_mirrorlist=mirrorlist_with_country_fixture, cache=MirrorCache(path=tmp_path / 'mirrors.json'))
+	handler.load_local_mirrors()
+
+	for mirror in handler._region_entries('United States'):
+		mirror._speed = 1.0
+
+	ranked = handler.get_status_by_region('United States', speed_sort=True)
+
+	assert batches == [['geo.mirror.pkgbuild.com', 'america.mirror.pkgbuild.com']]
+	# mirrors that didn't answer rank last
+	assert [mirror._hostname for mirror in ranked] == ['america.mirror.pkgbuild.com', 'geo.mirror.pkgbuild.com']
+	assert ranked[0].latency == 20
+
+
+def test_mirror_ranking_saved_to_target(tmp_path: Path, mirrorlist_with_country_fixture: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(
+		'archinstall.lib.models.mirrors.ping_many', lambda hostnames, timeout=2: {'geo.mirror.pkgbuild.com': 30, 'america.mirror.pkgbuild.com': 20}
+	)
+
+	cache = MirrorCache(path=tmp_path / 'var/cache/archinstall/mirrors.json')
+	handler = MirrorListHandler(local_mirrorlist=mirrorlist_with_country_fixture, cache=cache)
+	handler.load_local_mirrors()
+
+	entries = handler._region_entries('United States')
+	entries[0]._speed = 1.0
+	entries[1]._speed = 2.0
+
+	ranked = handler.get_status_by_region('United States', speed_sort=True)
+
+	target = tmp_path / 'mnt'
+	cache.save_to_target(target)
+
+	# the next session on the target reuses the ranking instead of measuring again
+	reloaded = MirrorCache(path=target / cache.path.relative_to('/'))
+	handler = MirrorListHandler(local_mirrorlist=mirrorlist_with_country_fixture, cache=reloaded)
+	handler.load_local_mirrors()
+
+	for mirror in handler._region_entries('United States'):
+		mirror._speed = None
+
+	assert reloaded.get_ranking('United States') == [mirror.url for mirror in ranked]
+	assert [mirror.url for mirror in handler.get_status_by_region('United States', speed_sort=True)] == [mirror.url for mirror in ranked]
+	assert all(mirror._speed is None for mirror in handler._region_entries('United States'))
+
+
+def test_mirror_cache_concurrent_saves(tmp_path: Path) -> None:
+	cache_path = tmp_path / 'mirrors.json'
+	cache = MirrorCache(path=cache_path)
+	cache.set_status('{"version": 3}' + ' ' * 1024 * 1024)
+
+	threads = [threading.Thread(target=cache.save) for _ in range(8)]
+
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	assert MirrorCache(path=cache_path).get_status() is not None
+	assert [path.name for path in tmp_path.iterdir()] == ['mirrors.json']
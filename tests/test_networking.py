@@ -0,0 +1,77 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from archinstall.lib import networking
+from archinstall.lib.networking import build_icmp, calc_checksum, probe_connectivity
+
+
+def test_build_icmp() -> None:
+	packet = build_icmp(b'archinstall', identifier=0x1234, sequence=7)
+
+	icmp_type, code, _checksum, identifier, sequence = struct.unpack('!BBHHH', packet[:8])
+
+	assert (icmp_type, code, identifier, sequence) == (8, 0, 0x1234, 7)
+	assert packet[8:] == b'archinstall'
+	# a packet including its checksum sums up to zero
+	assert calc_checksum(packet) == 0
+
+
+def test_probe_connectivity_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+	release = threading.Event()
+
+	def resolve(hostname: str) -> tuple[socket.AddressFamily, str] | None:
+		if hostname == 'hanging.example.org':
+			release.wait()
+		return socket.AF_INET, '192.0.2.1'
+
+	monkeypatch.setattr(networking, '_has_route', lambda address: True)
+	monkeypatch.setattr(networking, '_icmp_reachable', lambda address, timeout: True)
+	monkeypatch.setattr(networking, '_https_reachable', lambda url, timeout: False)
+	monkeypatch.setattr(networking, '_resolve_host', resolve)
+
+	started = time.monotonic()
+	status = probe_connectivity(['mirror.example.org', 'hanging.example.org'], deadline=0.2)
+
+	try:
+		assert time.monotonic() - started < 1
+		assert status.icmp and status.dns and status.https is False
+		# a probe that didn't finish in time is unknown rather than failed
+		assert status.unresolved == []
+		assert status.timed_out == ['dns:hanging.example.org']
+		assert status.problem() == 'HTTPS connections are failing'
+
+		# the probe that missed the deadline doesn't block the exit of the interpreter
+		hanging = [thread for thread in threading.enumerate() if thread.name == 'probe-dns:hanging.example.org']
+		assert hanging and all(thread.daemon for thread in hanging)
+	finally:
+		release.set()
+
+
+def test_probe_connectivity_slow_link(monkeypatch: pytest.MonkeyPatch) -> None:
+	release = threading.Event()
+
+	def https_reachable(url: str, timeout: float) -> bool:
+		release.wait()
+		return True
+
+	monkeypatch.setattr(networking, '_has_route', lambda address: True)
+	monkeypatch.setattr(networking, '_icmp_reachable', lambda address, timeout: False)
+	monkeypatch.setattr(networking, '_https_reachable', https_reachable)
+	monkeypatch.setattr(networking, '_resolve_host', lambda hostname: None)
+
+	try:
+		status = probe_connectivity([], deadline=0.2)
+	finally:
+		release.set()
+
+	assert status.https is None
+	assert status.timed_out == ['https']
+	assert status.unresolved == ['archlinux.org']
+	assert status.problem() == 'DNS resolution is not working'
+
+	status.dns = None
+	assert status.problem() is None
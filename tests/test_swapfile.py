@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.disk.utils import get_physical_offset
+from archinstall.lib.exceptions import DiskError
+from archinstall.lib.installer import Installer
+
+
+class _Output:
+	def __init__(self, output: str) -> None:
+		self._output = output
+
+	def decode(self) -> str:
+		return self._output
+
+
+@pytest.mark.parametrize(
+	('output', 'expected'),
+	[
+		('{"filesystems": [{"fstype": "ext4", "uuid": "0a1b2c3d"}]}', ('ext4', '0a1b2c3d')),
+		# filesystems such as tmpfs have no UUID
+		('{"filesystems": [{"fstype": "tmpfs", "uuid": null}]}', ('tmpfs', None)),
+	],
+)
+def test_swap_filesystem(monkeypatch: pytest.MonkeyPatch, output: str, expected: tuple[str, str | None]) -> None:
+	monkeypatch.setattr('archinstall.lib.installer.SysCommand', lambda cmd: _Output(output))
+
+	assert Installer._swap_filesystem(Path('/mnt')) == expected
+
+
+def test_parse_swap_size() -> None:
+	assert Installer._parse_swap_size('512M') == 512 * 1024**2
+	assert Installer._parse_swap_size('4G') == 4 * 1024**3
+	assert Installer._parse_swap_size('4GiB') == 4 * 1024**3
+	assert Installer._parse_swap_size('1024') == 1024
+
+	with pytest.raises(ValueError):
+		Installer._parse_swap_size('4 potatoes')
+
+
+def test_physical_offset(tmp_path: Path) -> None:
+	path = tmp_path / 'swapfile'
+	Installer._allocate_file(path, 1024 * 1024)
+
+	assert path.stat().st_size == 1024 * 1024
+	assert path.stat().st_mode & 0o777 == 0o600
+
+	try:
+		offset = get_physical_offset(path)
+	except DiskError as err:
+		pytest.skip(f'FIEMAP is not supported here: {err}')
+
+	assert offset > 0
+	assert offset % os.sysconf('SC_PAGE_SIZE') == 0
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.sync import USER_HOME, ArchiveWriter, CopyEngine, extract_archive
+from archinstall.lib.sync.archive import _contained
+
+
+def _member(name: str, **kwargs: object) -> tarfile.TarInfo:
+	member = tarfile.TarInfo(name)
+
+	for key, value in kwargs.items():
+		setattr(member, key, value)
+
+	return member
+
+
+def test_contained(tmp_path: Path) -> None:
+	setuid = _member('usr/bin/tool', mode=0o6775)
+	assert _contained(setuid, str(tmp_path)).mode == 0o6775
+
+	# absolute symlinks are valid on the installed system
+	symlink = _member('etc/link', type=tarfile.SYMTYPE, linkname='/usr/share/x')
+	assert _contained(symlink, str(tmp_path)) is symlink
+
+	with pytest.raises(tarfile.AbsolutePathError):
+		_contained(_member('/etc/passwd'), str(tmp_path))
+
+	with pytest.raises(tarfile.OutsideDestinationError):
+		_contained(_member('../outside'), str(tmp_path))
+
+	with pytest.raises(tarfile.LinkOutsideDestinationError):
+		_contained(_member('etc/hard', type=tarfile.LNKTYPE, linkname='../outside'), str(tmp_path))
+
+	with pytest.raises(tarfile.SpecialFileError):
+		_contained(_member('dev/null', type=tarfile.CHRTYPE, devmajor=1, devminor=3), str(tmp_path))
+
+	with pytest.raises(tarfile.SpecialFileError):
+		_contained(_member('run/fifo', type=tarfile.FIFOTYPE), str(tmp_path))
+
+	# writing through a symlink which leads out of the destination
+	(tmp_path / 'escape').symlink_to('/tmp')
+	with pytest.raises(tarfile.OutsideDestinationError):
+		_contained(_member('escape/file'), str(tmp_path))
+
+
+@pytest.mark.skipif(shutil.which('zstd') is None, reason='zstd is not installed')
+def test_archive_roundtrip(tmp_path: Path) -> None:
+	live = tmp_path / 'live'
+	(live / 'opt' / 'tool').mkdir(parents=True)
+	(live / 'opt' / 'tool' / 'bin').write_text('#!/bin/sh')
+	(live / 'opt' / 'tool' / 'bin').chmod(0o6775)
+	(live / 'opt' / 'tool' / 'link').symlink_to('/usr/share/x')
+
+	(live / 'home').mkdir()
+	(live / 'home' / '.bashrc').write_text('bashrc')
+	os.link(live / 'home' / '.bashrc', live / 'home' / '.bashrc.bak')
+
+	staging = tmp_path / 'staging'
+	archive = tmp_path / 'live.tar.zst'
+
+	with ArchiveWriter(archive) as writer:
+		engine = CopyEngine()
+		engine.add(live / 'opt' / 'tool', staging / 'opt' / 'tool')
+		writer.add(engine.entries, staging, '')
+
+		engine = CopyEngine()
+		engine.add(live / 'home', staging / 'home' / 'live')
+		writer.add(engine.entries, staging / 'home' / 'live', USER_HOME)
+
+	target = tmp_path / 'target'
+	target.mkdir()
+	owner = (os.getuid(), os.getgid())
+
+	extract_archive(archive, target, 'home/user', owner)
+
+	assert (target / 'opt' / 'tool' / 'bin').stat().st_mode & 0o7777 == 0o6775
+	assert os.readlink(target / 'opt' / 'tool' / 'link') == '/usr/share/x'
+	assert (target / 'home' / 'user' / '.bashrc').read_text() == 'bashrc'
+	# the hardlink is remapped to the user home along with the file it links to
+	assert (target / 'home' / 'user' / '.bashrc.bak').stat().st_ino == (target / 'home' / 'user' / '.bashrc').stat().st_ino
+	assert (target / 'home' / 'user' / '.bashrc').stat().st_uid == owner[0]
+
+	# without a user the live user home is skipped
+	skipped = tmp_path / 'skipped'
+	skipped.mkdir()
+	extract_archive(archive, skipped, None, None)
+
+	assert (skipped / 'opt' / 'tool' / 'bin').exists()
+	assert not (skipped / 'home').exists()
@@ -0,0 +1,252 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.exceptions import SysCallError
+from archinstall.lib.sync import CopyEngine, Deduplicator, EntryType, ScanEntry, SeedStore, SyncManifest, scan_tree, shared_sources
+
+
+def _tree(root: Path) -> None:
+	(root / 'dir' / 'sub').mkdir(parents=True)
+	(root / 'dir' / 'file').write_text('file')
+	(root / 'dir' / 'sub' / 'script').write_text('#!/bin/sh')
+	(root / 'dir' / 'sub' / 'script').chmod(0o750)
+	(root / 'dir' / 'link').symlink_to('file')
+	os.utime(root / 'dir' / 'sub', ns=(0, 1_000_000_000))
+
+
+def test_copy_tree(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	_tree(source)
+
+	engine = CopyEngine()
+	engine.add(source / 'dir', target / 'dir', exclude=lambda rel, is_dir: rel == 'dir/file' and not is_dir, rel='dir')
+
+	roots = engine.plan()
+	assert [(root.files, root.bytes) for root in roots] == [(1, len('#!/bin/sh'))]
+
+	stats = engine.run()
+
+	assert (stats.files, stats.failed) == (2, 0)
+	assert not (target / 'dir' / 'file').exists()
+	assert os.readlink(target / 'dir' / 'link') == 'file'
+	assert (target / 'dir' / 'sub' / 'script').read_text() == '#!/bin/sh'
+	assert (target / 'dir' / 'sub' / 'script').stat().st_mode & 0o777 == 0o750
+	# directory timestamps are applied after copying into them
+	assert (target / 'dir' / 'sub').stat().st_mtime_ns == 1_000_000_000
+
+
+def test_copy_replaces_entries_in_the_way(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	_tree(source)
+	(target / 'dir' / 'file').mkdir(parents=True)
+	(target / 'dir' / 'link').symlink_to('/nonexistent')
+
+	engine = CopyEngine()
+	engine.add(source / 'dir', target / 'dir')
+	engine.run()
+
+	assert (target / 'dir' / 'file').read_text() == 'file'
+	assert os.readlink(target / 'dir' / 'link') == 'file'
+
+
+def test_copy_continues_when_parent_cannot_be_created(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	_tree(source)
+	target.mkdir()
+	(target / 'blocker').write_text('not a directory')
+
+	engine = CopyEngine()
+	engine.add(source / 'dir' / 'file', target / 'blocker' / 'sub' / 'file')
+	engine.add(source / 'dir' / 'file', target / 'other' / 'file')
+	stats = engine.run()
+
+	assert stats.failed == 2
+	assert (target / 'blocker').read_text() == 'not a directory'
+	assert (target / 'other' / 'file').read_text() == 'file'
+
+
+def test_scan_tree(tmp_path: Path) -> None:
+	source = tmp_path / 'source'
+	_tree(source)
+	(source / 'cache').mkdir()
+	(source / 'cache' / 'blob').write_text('')
+	os.mkfifo(source / 'dir' / 'fifo')
+
+	seen: list[tuple[str, bool]] = []
+
+	def exclude(rel: str, is_dir: bool) -> bool:
+		seen.append((rel, is_dir))
+		return rel == 'home/cache'
+
+	entries = scan_tree(source, exclude, rel='home')
+	rels = [entry.rel for entry in entries]
+
+	assert sorted(rels) == ['dir', 'dir/file', 'dir/link', 'dir/sub', 'dir/sub/script']
+	# parents are listed before their children
+	assert all(rels.index(rel.rsplit('/', 1)[0]) < rels.index(rel) for rel in rels if '/' in rel)
+	assert {entry.rel: entry.type for entry in entries}['dir/link'] == EntryType.Symlink
+	# excluded directories are not descended into, special files are skipped
+	assert ('home/cache', True) in seen
+	assert ('home/cache/blob', False) not in seen
+	assert ('home/dir/fifo', False) not in seen
+
+
+def test_missing_entries(tmp_path: Path) -> None:
+	(tmp_path / 'home' / '.config').mkdir(parents=True)
+	(tmp_path / 'home' / '.bashrc').write_text('')
+
+	def entry(rel: str, entry_type: EntryType = EntryType.File) -> ScanEntry:
+		return ScanEntry(rel, entry_type, os.stat(tmp_path))
+
+	entries = [
+		entry('.bashrc'),
+		entry('.profile'),
+		entry('.config', EntryType.Directory),
+		entry('.config/app', EntryType.Directory),
+		entry('.config/app/settings'),
+		entry('.local', EntryType.Directory),
+		entry('.local/share'),
+	]
+
+	missing = CopyEngine._missing(entries, tmp_path / 'home')
+
+	assert [entry.rel for entry in missing] == ['.profile', '.config/app', '.config/app/settings', '.local', '.local/share']
+
+
+def test_add_scanned_skip_existing(tmp_path: Path) -> None:
+	skel = tmp_path / 'skel'
+	(skel / '.config').mkdir(parents=True)
+	(skel / '.bashrc').write_text('skel')
+	(skel / '.config' / 'app').write_text('skel')
+
+	home = tmp_path / 'home'
+	home.mkdir()
+	(home / '.bashrc').write_text('user')
+
+	engine = CopyEngine()
+	engine.add_scanned(skel, scan_tree(skel), home, skip_existing=True)
+	engine.run()
+
+	assert (home / '.bashrc').read_text() == 'user'
+	assert (home / '.config' / 'app').read_text() == 'skel'
+
+
+def test_dedup_links_identical_files(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	source.mkdir()
+	content = os.urandom(64 * 1024)
+
+	for name in ('a', 'b'):
+		(source / name).write_bytes(content)
+		os.utime(source / name, ns=(0, 1_000_000_000))
+	(source / 'c').write_bytes(os.urandom(64 * 1024))
+
+	dedup = Deduplicator()
+	engine = CopyEngine(dedup=dedup)
+	engine.add(source, target)
+	stats = engine.run()
+
+	assert (stats.files, stats.deduplicated) == (3, 1)
+	assert dedup.saved == len(content)
+	assert (target / 'a').read_bytes() == (target / 'b').read_bytes() == content
+
+
+def test_dedup_hashes_without_lock(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	content = os.urandom(64 * 1024)
+	first, second = tmp_path / 'first', tmp_path / 'second'
+	first.write_bytes(content)
+	second.write_bytes(content)
+
+	dedup = Deduplicator()
+	dedup.plan([len(content), len(content)])
+	dedup.register(0, first.stat(), first, None, None)
+
+	def file_digest(path: Path) -> str:
+		assert not dedup._lock.locked()
+		return path.read_bytes().hex()
+
+	monkeypatch.setattr('archinstall.lib.sync.dedup.file_digest', file_digest)
+
+	original = dedup.find(0, len(content), content.hex())
+
+	assert original is not None and original.target == first
+
+
+def test_dedup_rerun_does_not_write_through_hardlinks(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	source.mkdir()
+	content = os.urandom(64 * 1024)
+
+	for name in ('a', 'b'):
+		(source / name).write_bytes(content)
+		os.utime(source / name, ns=(0, 1_000_000_000))
+
+	manifest_path = tmp_path / 'manifest.json'
+
+	def run() -> None:
+		manifest = SyncManifest(manifest_path)
+		engine = CopyEngine(manifest=manifest, dedup=Deduplicator())
+		engine.add(source, target)
+		engine.run()
+
+	run()
+
+	# the same size, so only the mtime tells the manifest it changed
+	changed = os.urandom(64 * 1024)
+	(source / 'a').write_bytes(changed)
+
+	run()
+
+	assert (target / 'a').read_bytes() == changed
+	assert (target / 'b').read_bytes() == content
+	assert SyncManifest(manifest_path).is_current(source / 'b', target / 'b', os.stat(source / 'b'))
+
+
+def test_seed_store_stage(tmp_path: Path) -> None:
+	source = tmp_path / 'source'
+	_tree(source)
+	other = tmp_path / 'other'
+	other.mkdir()
+	(other / 'file').write_text('other')
+
+	assert shared_sources([source, other, source, source]) == [source]
+
+	# without entering, the store is a plain directory rather than a subvolume
+	store = SeedStore(tmp_path / 'seed')
+	staged = store.stage([source])
+
+	assert staged == {source: tmp_path / 'seed' / source.relative_to('/')}
+	assert (staged[source] / 'dir' / 'sub' / 'script').read_text() == '#!/bin/sh'
+
+	(source / 'dir' / 'file').write_text('changed')
+	staged = store.stage([source, other])
+
+	# sources staged before are not copied again
+	assert (staged[source] / 'dir' / 'file').read_text() == 'file'
+	assert (staged[other] / 'file').read_text() == 'other'
+
+
+def test_seed_store_falls_back_without_subvolume(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	source = tmp_path / 'source'
+	_tree(source)
+	# left behind by an interrupted run
+	(tmp_path / 'seed').mkdir()
+	calls: list[list[str]] = []
+
+	def sys_command(cmd: list[str]) -> None:
+		calls.append(cmd)
+
+		if cmd[2] == 'create':
+			raise SysCallError('create failed', 1)
+
+	monkeypatch.setattr('archinstall.lib.sync.seed.SysCommand', sys_command)
+
+	with SeedStore(tmp_path / 'seed') as store:
+		assert store.stage([source]) == {source: source}
+
+	assert calls == [
+		['btrfs', 'subvolume', 'delete', str(tmp_path / 'seed')],
+		['btrfs', 'subvolume', 'create', str(tmp_path / 'seed')],
+	]
@@ -0,0 +1,62 @@
+import json
+import os
+from pathlib import Path
+
+from archinstall.lib.sync import SyncManifest, file_digest
+
+
+def _copy(source: Path, target: Path, content: bytes) -> os.stat_result:
+	source.write_bytes(content)
+	target.write_bytes(content)
+	return os.stat(source)
+
+
+def test_manifest_is_current(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	st = _copy(source, target, b'archinstall')
+
+	manifest = SyncManifest(tmp_path / 'sync' / 'home.json')
+	assert not manifest.is_current(source, target, st)
+
+	manifest.record(source, target, st)
+	manifest.save()
+
+	reloaded = SyncManifest(tmp_path / 'sync' / 'home.json')
+	assert reloaded.recorded_bytes == len(b'archinstall')
+	assert reloaded.is_current(source, target, st)
+
+	# a different source for the same target
+	assert not reloaded.is_current(tmp_path / 'other', target, st)
+
+	# the source changed since
+	os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+	assert not reloaded.is_current(source, target, os.stat(source))
+
+	# the target was removed since
+	os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns))
+	target.unlink()
+	assert not reloaded.is_current(source, target, os.stat(source))
+
+
+def test_manifest_checksum(tmp_path: Path) -> None:
+	source, target = tmp_path / 'source', tmp_path / 'target'
+	st = _copy(source, target, b'archinstall')
+
+	manifest = SyncManifest(tmp_path / 'manifest.json', checksum=True)
+	manifest.record(source, target, st, file_digest(source))
+
+	# only the mtime changed, the content is compared instead
+	os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+	assert manifest.is_current(source, target, os.stat(source))
+
+	source.write_bytes(b'archinst4ll')
+	assert not manifest.is_current(source, target, os.stat(source))
+
+
+def test_manifest_ignores_other_versions(tmp_path: Path) -> None:
+	path = tmp_path / 'manifest.json'
+	path.write_text(json.dumps({'version': 0, 'entries': {'/x': {'source': '/y', 'size': 1, 'mtime_ns': 1}}}))
+	assert SyncManifest(path).recorded_bytes == 0
+
+	path.write_text('not json')
+	assert SyncManifest(path).recorded_bytes == 0
@@ -0,0 +1,147 @@
+import fnmatch
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.sync import PathMatcher, expand_includes
+
+BASE = Path('/home/live')
+
+PATTERNS = [
+	'.cache/**',
+	'.local/state/**',
+	'.local/share/recently-used*',
+	'.zcompdump*',
+	'.config/*/Cache/**',
+	'*.log',
+	'/home/live/.mozilla/**',
+	'/home/live/.ssh',
+	'/home/live/.gnupg/*.lock',
+]
+
+PATHS = [
+	('.cache', True),
+	('.cache/fontconfig/x', False),
+	('.cachefile', False),
+	('.local/state/wireplumber', True),
+	('.local/share/recently-used.xbel', False),
+	('.local/share/applications', True),
+	('.zcompdump-live-5.9', False),
+	('.config/chromium/Cache', True),
+	('.config/chromium/Cache/data_0', False),
+	('.config/chromium/Preferences', False),
+	('notes.log', False),
+	('logs/today.log', False),
+	('.mozilla', True),
+	('.mozilla/firefox/profiles.ini', False),
+	('.ssh', True),
+	('.ssh/id_ed25519', False),
+	('.gnupg/pubring.kbx.lock', False),
+	('.gnupg/pubring.kbx', False),
+	('.bashrc', False),
+]
+
+
+def _should_exclude(rel_path: str, abs_path: Path, exclude_patterns: list[str]) -> bool:
+	# the per pattern matching PathMatcher replaced
+	for pattern in exclude_patterns:
+		if pattern.startswith('/'):
+			base_pat = pattern[:-3] if pattern.endswith('/**') else pattern
+			if fnmatch.fnmatch(str(abs_path), pattern) or str(abs_path).startswith(base_pat.rstrip('/') + '/'):
+				return True
+			continue
+
+		pat = pattern.lstrip('/')
+		if pat.endswith('/**'):
+			base_pat = pat[:-3]
+			if rel_path == base_pat or rel_path.startswith(base_pat.rstrip('/') + '/'):
+				return True
+		if fnmatch.fnmatch(rel_path, pat):
+			return True
+
+	return False
+
+
+@pytest.mark.parametrize(('rel', 'is_dir'), PATHS)
+def test_matcher_equivalence(rel: str, is_dir: bool) -> None:
+	matcher = PathMatcher(PATTERNS, BASE)
+	expected = _should_exclude(rel, BASE / rel, PATTERNS)
+
+	# the bases of absolute and glob 'dir/**' patterns now match the
+	# directory itself as well, so its walk is pruned
+	if rel in ('.mozilla', '.config/chromium/Cache'):
+		expected = True
+
+	assert matcher(rel, is_dir) == expected
+
+
+def test_matcher_dir_patterns_only_match_directories() -> None:
+	matcher = PathMatcher(['.cache/**', '.config/*/Cache/**', '/home/live/.mozilla/**'], BASE)
+
+	assert matcher('.cache', is_dir=True)
+	assert not matcher('.cache', is_dir=False)
+	assert matcher('.cache/file', is_dir=False)
+
+	assert matcher('.config/app/Cache', is_dir=True)
+	assert not matcher('.config/app/Cache', is_dir=False)
+
+	assert matcher('.mozilla', is_dir=True)
+	assert not matcher('.mozilla', is_dir=False)
+	assert matcher('.mozilla/profile', is_dir=False)
+
+
+def test_matcher_absolute_base() -> None:
+	assert PathMatcher(['/home'], BASE)('anything')
+	assert not PathMatcher(['/home/other'], BASE)('other')
+
+
+def _glob_includes(source: Path, patterns: list[str]) -> list[Path]:
+	# the Path.glob() based expansion expand_includes() replaced
+	paths: set[Path] = set()
+
+	for pattern in patterns:
+		paths.update(source.glob(pattern.removeprefix('./')))
+
+	minimized: list[Path] = []
+
+	for path in sorted(paths, key=lambda p: (len(p.parts), p.as_posix())):
+		if not any(parent in path.parents for parent in minimized):
+			minimized.append(path)
+
+	return minimized
+
+
+@pytest.fixture
+def home(tmp_path: Path) -> Path:
+	for directory in ('.config/app/Cache', '.local/share/fonts', '.local/share/themes/dark', 'real/b/c', 'd'):
+		(tmp_path / directory).mkdir(parents=True)
+
+	for file in ('.bashrc', '.profile', '.config/app/settings', '.local/share/fonts/a.ttf', 'real/b/c/f', 'notes.txt'):
+		(tmp_path / file).write_text('')
+
+	(tmp_path / 'lnk').symlink_to('real')
+	(tmp_path / 'd' / 'l2').symlink_to('../real')
+	(tmp_path / '.local' / 'share' / 'link.txt').symlink_to('../../notes.txt')
+
+	return tmp_path
+
+
+@pytest.mark.parametrize(
+	'patterns',
+	[
+		['*'],
+		['.bashrc', '.profile', '.config/**'],
+		['.config/*/settings', '.local/share/*'],
+		['.local/share/fonts/**', '.local/share/themes/**'],
+		['**/c'],
+		['**/f'],
+		['*/b'],
+		['*/*/b'],
+		['lnk/**'],
+		['lnk/*/c'],
+		['./.bashrc', '.config'],
+		['*.txt', '.local/**/*.txt'],
+	],
+)
+def test_expand_includes_equivalence(home: Path, patterns: list[str]) -> None:
+	assert expand_includes(home, patterns) == _glob_includes(home, patterns)
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.disk.tuning import queue_limits, tuned_mkfs_options, tuned_mount_options
+from archinstall.lib.models.device import FilesystemType
+
+MiB = 1024 * 1024
+
+
+def _sys_block(
+	tmp_path: Path,
+	monkeypatch: pytest.MonkeyPatch,
+	rotational: int = 0,
+	minimum_io_size: int = 512,
+	optimal_io_size: int = 0,
+	discard_granularity: int = 512,
+	nr_requests: int = 64,
+) -> None:
+	"""
+	A sysfs tree with a disk sda and its partition sda1, which has no queue of its own
+	"""
+	disk = tmp_path / 'devices/sda'
+	queue = disk / 'queue'
+	queue.mkdir(parents=True)
+	(disk / 'sda1').mkdir()
+	(disk / 'sda1/partition').write_text('1\n')
+	(disk / 'sda1/alignment_offset').write_text('4096\n')
+
+	limits = {
+		'rotational': rotational,
+		'logical_block_size': 512,
+		'physical_block_size': 512,
+		'minimum_io_size': minimum_io_size,
+		'optimal_io_size': optimal_io_size,
+		'discard_granularity': discard_granularity,
+		'nr_requests': nr_requests,
+	}
+
+	for name, value in limits.items():
+		(queue / name).write_text(f'{value}\n')
+
+	class_block = tmp_path / 'class/block'
+	class_block.mkdir(parents=True)
+	(class_block / 'sda').symlink_to('../../devices/sda')
+	(class_block / 'sda1').symlink_to('../../devices/sda/sda1')
+
+	monkeypatch.setattr('archinstall.lib.disk.tuning._SYS_BLOCK', class_block)
+
+
+def test_queue_limits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+	_sys_block(tmp_path, monkeypatch, rotational=1, discard_granularity=0)
+
+	disk = queue_limits(Path('/dev/sda'))
+	partition = queue_limits(Path('/dev/sda1'))
+
+	assert disk is not None and partition is not None
+	assert disk.rotational and not disk.supports_discard
+	assert disk.alignment_offset == 0
+	assert partition.alignment_offset == 4096
+	assert partition.physical_block_size == 512
+	assert queue_limits(Path('/dev/sdb')) is None
+
+
+@pytest.mark.parametrize(
+	('fs_type', 'minimum_io_size', 'optimal_io_size', 'expected'),
+	[
+		(FilesystemType.Ext4, 512, 0, ['-E', 'lazy_itable_init=0,lazy_journal_init=0']),
+		(
+			FilesystemType.Ext4,
+			512 * 1024,
+			2 * MiB,
+			['-b', '4096', '-E', 'stride=128,stripe_width=512,lazy_itable_init=0,lazy_journal_init=0'],
+		),
+		(FilesystemType.Xfs, 512, 0, []),
+		(FilesystemType.Xfs, 512 * 1024, 2 * MiB, ['-d', f'su={512 * 1024},sw=4']),
+		(FilesystemType.F2fs, 512, 8 * MiB, ['-s', '4']),
+		(FilesystemType.F2fs, 512, 3 * MiB, []),
+		(FilesystemType.Btrfs, 512 * 1024, 2 * MiB, []),
+	],
+)
+def test_tuned_mkfs_options(
+	tmp_path: Path,
+	monkeypatch: pytest.MonkeyPatch,
+	fs_type: FilesystemType,
+	minimum_io_size: int,
+	optimal_io_size: int,
+	expected: list[str],
+) -> None:
+	_sys_block(tmp_path, monkeypatch, minimum_io_size=minimum_io_size, optimal_io_size=optimal_io_size)
+
+	assert tuned_mkfs_options(fs_type, Path('/dev/sda1')) == expected
+
+
+@pytest.mark.parametrize(
+	('rotational', 'nr_requests', 'options', 'expected'),
+	[
+		(0, 1023, ['compress=zstd'], ['compress=zstd:1', 'ssd', 'discard=async']),
+		(0, 64, ['compress=zstd'], ['compress=zstd:2', 'ssd', 'discard=async']),
+		(1, 64, ['compress=zstd'], ['compress=zstd:3']),
+		(0, 64, ['nossd', 'nodiscard'], ['nossd', 'nodiscard']),
+		(0, 64, ['compress=zstd:9', 'discard=sync'], ['compress=zstd:9', 'discard=sync', 'ssd']),
+	],
+)
+def test_tuned_mount_options(
+	tmp_path: Path,
+	monkeypatch: pytest.MonkeyPatch,
+	rotational: int,
+	nr_requests: int,
+	options: list[str],
+	expected: list[str],
+) -> None:
+	_sys_block(tmp_path, monkeypatch, rotational=rotational, nr_requests=nr_requests)
+
+	assert tuned_mount_options(FilesystemType.Btrfs.value, Path('/dev/sda1'), options) == expected
+	assert tuned_mount_options(FilesystemType.Ext4.value, Path('/dev/sda1'), options) == options
@@ -0,0 +1,41 @@
+import socket
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.disk import udev
+from archinstall.lib.disk.udev import UdevMonitor
+
+
+def _udev_event(**properties: str) -> bytes:
+	payload = b''.join(f'{key}={value}'.encode() + b'\0' for key, value in properties.items())
+	header = udev._UDEV_HEADER.pack(b'libudev\0', socket.htonl(udev._UDEV_MAGIC), udev._UDEV_HEADER.size, udev._UDEV_HEADER.size, len(payload))
+	return header + payload
+
+
+def test_parse_event() -> None:
+	event = UdevMonitor._parse_event(_udev_event(ACTION='add', DEVNAME='/dev/sda1'))
+
+	assert event == {'ACTION': 'add', 'DEVNAME': '/dev/sda1'}
+	assert UdevMonitor._parse_event(b'garbage') is None
+
+
+def test_wait_matches_devlinks(monkeypatch: pytest.MonkeyPatch) -> None:
+	settled: list[bool] = []
+	monkeypatch.setattr(udev, 'udev_settle', lambda: settled.append(True))
+
+	receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+	receiver.setblocking(False)
+
+	monitor = UdevMonitor()
+	monitor._sock = receiver
+
+	# the add event of a logical volume only carries the dm node
+	sender.send(_udev_event(ACTION='add', SUBSYSTEM='block', DEVNAME='/dev/dm-0'))
+	sender.send(_udev_event(ACTION='change', SUBSYSTEM='block', DEVNAME='/dev/dm-0', DEVLINKS='/dev/mapper/vg-root /dev/vg/root'))
+
+	monitor.wait([Path('/dev/vg/root')], timeout=1)
+	monitor.__exit__(None, None, None)
+	sender.close()
+
+	assert not settled
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from archinstall.lib.disk.wipe import _signature_ranges, wipe_signatures
+
+MiB = 1024 * 1024
+GiB = 1024 * MiB
+
+
+@pytest.mark.parametrize(
+	('size', 'expected'),
+	[
+		# the head and tail overlap on tiny devices
+		(2 * MiB, [(0, 2 * MiB)]),
+		(5 * MiB, [(0, 5 * MiB)]),
+		(64 * MiB, [(0, 4 * MiB), (63 * MiB, 64 * MiB)]),
+		(
+			128 * MiB,
+			[(0, 4 * MiB), (64 * MiB, 64 * MiB + 4096), (127 * MiB, 128 * MiB)],
+		),
+		(
+			512 * GiB,
+			[(0, 4 * MiB), (64 * MiB, 64 * MiB + 4096), (256 * GiB, 256 * GiB + 4096), (512 * GiB - MiB, 512 * GiB)],
+		),
+	],
+)
+def test_signature_ranges(size: int, expected: list[tuple[int, int]]) -> None:
+	assert _signature_ranges(size) == expected
+
+
+def test_wipe_signatures(tmp_path: Path) -> None:
+	# a sparse image, BLKZEROOUT isn't supported on regular files so the
+	# ranges are overwritten with zeroes instead
+	image = tmp_path / 'image'
+	size = 128 * MiB
+	marker = b'\xff' * 16
+	offsets = (0, 4 * MiB - 16, 4 * MiB, 64 * MiB, 100 * MiB, size - 16)
+
+	with image.open('wb') as f:
+		f.truncate(size)
+
+		for offset in offsets:
+			f.seek(offset)
+			f.write(marker)
+
+	wipe_signatures(image)
+
+	data = image.read_bytes()
+
+	assert len(data) == size
+	assert {offset: data[offset : offset + 16] for offset in offsets} == {
+		0: bytes(16),
+		4 * MiB - 16: bytes(16),
+		4 * MiB: marker,
+		64 * MiB: bytes(16),
+		100 * MiB: marker,
+		size - 16: bytes(16),
+	}